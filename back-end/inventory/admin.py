@@ -1,6 +1,5 @@
 from django.contrib import admin
-from django.db.models import F
-from .models import Stock, StockTransaction
+from .models import Stock, StockCheckpoint, StockTransaction
 
 class NeedsReorderFilter(admin.SimpleListFilter):
     title = 'needs reorder'
@@ -14,14 +13,14 @@ class NeedsReorderFilter(admin.SimpleListFilter):
 
     def queryset(self, request, queryset):
         if self.value() == 'yes':
-            return queryset.filter(quantity__lte=F('reorder_threshold'))
+            return queryset.needs_reorder(True)
         elif self.value() == 'no':
-            return queryset.filter(quantity__gt=F('reorder_threshold'))
+            return queryset.needs_reorder(False)
         return queryset
 
 @admin.register(Stock)
 class StockAdmin(admin.ModelAdmin):
-    list_display = ('ingredient', 'quantity', 'reorder_threshold', 'needs_reorder')
+    list_display = ('ingredient', 'quantity', 'reorder_threshold', 'needs_reorder', 'reorder_triggered_at')
     search_fields = ('ingredient__name',)
     list_filter = (NeedsReorderFilter,)
 
@@ -29,4 +28,11 @@ class StockAdmin(admin.ModelAdmin):
 class StockTransactionAdmin(admin.ModelAdmin):
     list_display = ('ingredient', 'type', 'quantity', 'timestamp', 'user')
     list_filter = ('type', 'timestamp')
-    search_fields = ('ingredient__name', 'notes')
\ No newline at end of file
+    search_fields = ('ingredient__name', 'notes')
+
+@admin.register(StockCheckpoint)
+class StockCheckpointAdmin(admin.ModelAdmin):
+    list_display = ('ingredient', 'date', 'closing_quantity', 'quantity_in', 'quantity_out', 'adjustments',
+                    'transaction_count', 'compacted')
+    list_filter = ('compacted', 'date')
+    search_fields = ('ingredient__name',)
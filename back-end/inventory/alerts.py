@@ -0,0 +1,48 @@
+from datetime import timedelta
+
+from django.conf import settings
+from .models import Stock
+
+ALERT_FIELDS = ('ingredient', 'ingredient__name', 'quantity', 'reorder_threshold', 'shortfall', 'reorder_triggered_at')
+
+
+def grace_period():
+    return timedelta(seconds=getattr(settings, 'REORDER_ALERT_GRACE_SECONDS', 60))
+
+
+def reorder_alerts(since=None):
+    """
+    Stock rows that fell to or below their reorder threshold after ``since``
+    and are still there, oldest first, read from the reorder_triggered_at
+    index. Returns ``{'watermark', 'alerts'}``; pass ``watermark`` back as
+    ``since`` to poll for newer crossings.
+
+    Trigger times are stamped before the writing transaction commits, so a
+    slow transaction can become visible with a stamp older than a watermark
+    already handed out. Polls therefore reach back REORDER_ALERT_GRACE_SECONDS
+    before ``since``; an alert is identified by its ingredient and
+    ``triggered_at``, and clients drop the ones they have already seen.
+    """
+    stock = Stock.objects.with_shortfall().filter(reorder_triggered_at__isnull=False)
+    if since is not None:
+        stock = stock.filter(reorder_triggered_at__gt=since - grace_period())
+    alerts = [
+        {
+            'ingredient': ingredient_id,
+            'ingredient_name': name,
+            'quantity': quantity,
+            'reorder_threshold': threshold,
+            'shortfall': shortfall,
+            'triggered_at': triggered_at,
+        }
+        for ingredient_id, name, quantity, threshold, shortfall, triggered_at in stock.order_by(
+            'reorder_triggered_at', 'ingredient_id'
+        ).values_list(*ALERT_FIELDS)
+    ]
+    watermark = since
+    if alerts and (since is None or alerts[-1]['triggered_at'] > since):
+        watermark = alerts[-1]['triggered_at']
+    return {
+        'watermark': watermark,
+        'alerts': alerts,
+    }
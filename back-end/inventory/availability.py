@@ -0,0 +1,20 @@
+from django.db.models import Exists, F, OuterRef
+from menu.models import Dish, DishIngredient
+
+
+def dish_in_stock_expression():
+    """
+    True unless some recipe line of the outer dish needs more than its
+    ingredient's stock on hand. Ingredients without a Stock row are not
+    tracked and never make a dish unavailable.
+    """
+    return ~Exists(DishIngredient.objects.filter(dish=OuterRef('pk'), ingredient__stock__quantity__lt=F('quantity')))
+
+
+def refresh_dish_stock(dishes):
+    """
+    Recompute ``in_stock`` for a Dish queryset, writing only the rows whose
+    value flips. Returns the number of dishes that changed.
+    """
+    changed = dishes.annotate(now_in_stock=dish_in_stock_expression()).exclude(in_stock=F('now_in_stock'))
+    return Dish.objects.filter(pk__in=changed.values('pk')).update(in_stock=dish_in_stock_expression())
@@ -0,0 +1,126 @@
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from django.db import transaction
+from django.db.models import Count, Max, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+from menu.models import Ingredient
+from .ledger import signed_quantity, signed_quantity_expression
+from .models import StockCheckpoint, StockTransaction
+
+MOVEMENT_FIELDS = {'in': 'quantity_in', 'out': 'quantity_out', 'adjustment': 'adjustments'}
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def closing_time(date):
+    """The instant a day's ledger closes: midnight after ``date`` in the current time zone."""
+    return timezone.make_aware(datetime.combine(date + timedelta(days=1), time.min))
+
+
+def build_checkpoints(through):
+    """
+    Write closing balances for every day after the last checkpoint up to and
+    including ``through``, from one aggregate over the unsettled ledger rows.
+    Returns the number of checkpoints created.
+    """
+    with transaction.atomic():
+        last = StockCheckpoint.objects.aggregate(last=Max('date'))['last']
+        if last is not None and last >= through:
+            return 0
+        balances = dict(
+            StockCheckpoint.objects.filter(date=last).values_list('ingredient_id', 'closing_quantity')
+        ) if last else {}
+
+        ledger = StockTransaction.objects.filter(timestamp__lt=closing_time(through))
+        if last:
+            ledger = ledger.filter(timestamp__gte=closing_time(last))
+        days = {}
+        for row in ledger.annotate(day=TruncDate('timestamp')).values('ingredient_id', 'day', 'type').annotate(
+            total=Sum('quantity'), count=Count('id')
+        ).order_by('ingredient_id', 'day'):
+            checkpoint = days.setdefault((row['ingredient_id'], row['day']), StockCheckpoint(
+                ingredient_id=row['ingredient_id'], date=row['day'], closing_at=closing_time(row['day']),
+            ))
+            setattr(checkpoint, MOVEMENT_FIELDS[row['type']], row['total'])
+            checkpoint.transaction_count += row['count']
+
+        checkpoints = []
+        for (ingredient_id, _), checkpoint in sorted(days.items()):
+            balances[ingredient_id] = (
+                balances.get(ingredient_id, 0)
+                + signed_quantity('in', checkpoint.quantity_in)
+                + signed_quantity('out', checkpoint.quantity_out)
+                + signed_quantity('adjustment', checkpoint.adjustments)
+            )
+            checkpoint.closing_quantity = balances[ingredient_id]
+            checkpoints.append(checkpoint)
+        # Every ingredient gets a row on the last day so the latest date marks progress for all
+        closed = {ingredient_id for ingredient_id, day in days if day == through}
+        checkpoints.extend(
+            StockCheckpoint(
+                ingredient_id=ingredient_id, date=through, closing_at=closing_time(through),
+                closing_quantity=quantity,
+            )
+            for ingredient_id, quantity in balances.items() if ingredient_id not in closed
+        )
+        StockCheckpoint.objects.bulk_create(checkpoints)
+    return len(checkpoints)
+
+
+def balances_at(at, ingredients=None):
+    """
+    Ledger balance of each ingredient at instant ``at``: its latest checkpoint
+    closing at or before ``at`` plus the signed ledger rows since. Returns
+    ``{ingredient_id: {'quantity', 'checkpoint', 'exact'}}``; ``exact`` is
+    False when ``at`` falls inside a compacted day, where only closing
+    balances survive.
+    """
+    ingredients = Ingredient.objects.all() if ingredients is None else ingredients
+    latest = StockCheckpoint.objects.filter(ingredient=OuterRef('pk'), closing_at__lte=at).order_by('-closing_at')
+    since = StockTransaction.objects.filter(
+        ingredient=OuterRef('pk'),
+        timestamp__gte=Coalesce(OuterRef('checkpoint_at'), Value(EPOCH)),
+        timestamp__lt=at,
+    ).order_by().values('ingredient').annotate(total=Sum(signed_quantity_expression())).values('total')
+    rows = ingredients.annotate(
+        checkpoint_date=Subquery(latest.values('date')[:1]),
+        checkpoint_quantity=Subquery(latest.values('closing_quantity')[:1]),
+        checkpoint_at=Subquery(latest.values('closing_at')[:1]),
+    ).annotate(
+        delta=Coalesce(Subquery(since), Value(0.0)),
+    ).values_list('pk', 'checkpoint_date', 'checkpoint_quantity', 'delta')
+
+    compacted_through = StockCheckpoint.objects.filter(compacted=True).aggregate(last=Max('closing_at'))['last']
+    exact = compacted_through is None or at >= compacted_through or at == closing_time(
+        timezone.localtime(at).date() - timedelta(days=1)
+    )
+    return {
+        pk: {
+            'quantity': (checkpoint_quantity or 0) + delta,
+            'checkpoint': checkpoint_date,
+            'exact': exact,
+        }
+        for pk, checkpoint_date, checkpoint_quantity, delta in rows
+    }
+
+
+def compact_ledger(before, batch_size=5000):
+    """
+    Checkpoint every day before ``before`` and delete the StockTransaction
+    rows of those days; their per-day totals and closing balances remain on
+    the checkpoints. Returns the number of ledger rows removed.
+    """
+    through = before - timedelta(days=1)
+    build_checkpoints(through)
+    cutoff = closing_time(through)
+    StockCheckpoint.objects.filter(date__lte=through, compacted=False).update(compacted=True)
+    removed = 0
+    while True:
+        with transaction.atomic():
+            batch = list(
+                StockTransaction.objects.filter(timestamp__lt=cutoff).values_list('pk', flat=True)[:batch_size]
+            )
+            if not batch:
+                break
+            removed += StockTransaction.objects.filter(pk__in=batch).delete()[0]
+    return removed
@@ -0,0 +1,87 @@
+from django.db import transaction
+from django.db.models import F, Sum
+from orders.models import OrderItem
+from .ledger import apply_stock_deltas, signed_quantity_expression
+from .models import StockTransaction
+
+# Order statuses in which sold items have been taken out of stock
+DEPLETING_STATUSES = ('confirmed', 'preparing', 'ready', 'served', 'paid')
+# Order statuses in which deleting items puts their stock back; later the food has been made or sold
+RESTORING_STATUSES = ('confirmed', 'preparing')
+
+
+def recipe_usage(items):
+    """``{(order_id, item_id, ingredient_id): quantity}`` for an OrderItem queryset, exploded through the recipes."""
+    rows = items.filter(dish__dishingredient__isnull=False).order_by().values(
+        'order_id', 'pk', 'dish__dishingredient__ingredient_id'
+    ).annotate(used=Sum(F('quantity') * F('dish__dishingredient__quantity')))
+    return {
+        (row['order_id'], row['pk'], row['dish__dishingredient__ingredient_id']): row['used'] for row in rows
+    }
+
+
+def recorded_usage(item_ids):
+    """
+    ``{(order_id, item_id, ingredient_id): quantity}`` still out of stock for
+    the items according to their own ledger rows, whatever the recipe or
+    item quantity say now.
+    """
+    rows = StockTransaction.objects.filter(order_item__in=item_ids).order_by().values(
+        'order_item__order_id', 'order_item_id', 'ingredient_id'
+    ).annotate(net=Sum(signed_quantity_expression()))
+    return {(row['order_item__order_id'], row['order_item_id'], row['ingredient_id']): -row['net'] for row in rows}
+
+
+def _lock_items(items, depleted):
+    return list(
+        items.select_for_update(of=('self',)).filter(stock_depleted=not depleted).values_list('pk', flat=True)
+    )
+
+
+def deplete_orders(order_ids):
+    """
+    Take the recipe ingredients of not-yet-depleted items on confirmed (or
+    later) orders out of stock, one ledger row per item and ingredient.
+    Returns the number of items depleted; items of pending orders are left
+    for their confirmation.
+    """
+    with transaction.atomic():
+        item_ids = _lock_items(
+            OrderItem.objects.filter(order_id__in=order_ids, order__status__in=DEPLETING_STATUSES), True
+        )
+        if not item_ids:
+            return 0
+        usage = recipe_usage(OrderItem.objects.filter(pk__in=item_ids))
+        apply_stock_deltas(
+            (ingredient_id, 'out', quantity, f'Order #{order_id}', item_id)
+            for (order_id, item_id, ingredient_id), quantity in sorted(usage.items())
+        )
+        OrderItem.objects.filter(pk__in=item_ids).update(stock_depleted=True)
+    return len(item_ids)
+
+
+def restore_items(items):
+    """
+    Put back the stock taken for the depleted items of an OrderItem queryset
+    by reversing their recorded ledger rows. Items depleted before rows were
+    linked to them fall back to their current recipe.
+    """
+    with transaction.atomic():
+        item_ids = _lock_items(items, False)
+        if not item_ids:
+            return 0
+        usage = recorded_usage(item_ids)
+        unrecorded = set(item_ids) - {item_id for _, item_id, _ in usage}
+        if unrecorded:
+            usage.update(recipe_usage(OrderItem.objects.filter(pk__in=unrecorded)))
+        apply_stock_deltas(
+            (ingredient_id, 'in', quantity, f'Order #{order_id} cancelled', item_id)
+            for (order_id, item_id, ingredient_id), quantity in sorted(usage.items()) if quantity > 0
+        )
+        OrderItem.objects.filter(pk__in=item_ids).update(stock_depleted=False)
+    return len(item_ids)
+
+
+def restore_orders(order_ids):
+    """Put back the stock taken for the orders' depleted items, e.g. on cancellation."""
+    return restore_items(OrderItem.objects.filter(order_id__in=order_ids))
@@ -0,0 +1,13 @@
+import django_filters
+from .models import Stock
+
+class StockFilter(django_filters.FilterSet):
+    # Pushed into SQL on the indexed shortfall expression instead of the Python property
+    needs_reorder = django_filters.BooleanFilter(method='filter_needs_reorder')
+
+    class Meta:
+        model = Stock
+        fields = ['ingredient']
+
+    def filter_needs_reorder(self, queryset, name, value):
+        return queryset.needs_reorder(value)
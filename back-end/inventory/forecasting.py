@@ -0,0 +1,156 @@
+from datetime import timedelta
+
+import numpy as np
+from django.db import connection
+from django.db.models import Q, Sum
+from django.utils import timezone
+from .checkpoints import closing_time
+from .models import Stock, StockCheckpoint, StockTransaction
+
+
+# Aggregated rows are read straight into structured arrays
+LEDGER_ROW = np.dtype([('ingredient', np.int64), ('total', np.float64)])
+CHECKPOINT_ROW = np.dtype([('ingredient', np.int64), ('day', np.int64), ('total', np.float64)])
+
+
+def ingredient_filter(sorted_ids):
+    """
+    Restrict rows to ``sorted_ids`` in SQL: an ``IN`` list when it fits in
+    the backend's query parameters, else the id range, narrowed to exact
+    members once loaded.
+    """
+    limit = connection.features.max_query_params
+    if limit is None or len(sorted_ids) <= limit - 10:
+        return Q(ingredient_id__in=sorted_ids.tolist())
+    return Q(ingredient_id__gte=int(sorted_ids[0]), ingredient_id__lte=int(sorted_ids[-1]))
+
+
+def load_consumption(ingredient_ids, start, end):
+    """
+    Daily consumption matrix of shape ``(len(ingredient_ids), days)`` for the
+    days ``start`` up to but excluding ``end``: 'out' ledger rows summed per
+    ingredient in the database, plus the day totals kept on checkpoints for
+    days whose rows were compacted away. Rows are read into structured
+    arrays and placed on the matrix with array operations.
+
+    The ledger is summed with one query per day over that day's timestamp
+    range, served by the (type, timestamp) index: grouping by a truncated
+    timestamp instead costs a date conversion per row (a Python function on
+    SQLite), which dominated the whole job.
+    """
+    ids = np.fromiter(ingredient_ids, dtype=np.int64)
+    days = (end - start).days
+    consumption = np.zeros((len(ids), days))
+    if not len(ids):
+        return consumption
+    order = np.argsort(ids, kind='stable')
+    sorted_ids = ids[order]
+    ingredients = ingredient_filter(sorted_ids)
+
+    def add(ingredient, day, total):
+        positions = np.minimum(np.searchsorted(sorted_ids, ingredient), len(ids) - 1)
+        known = sorted_ids[positions] == ingredient
+        np.add.at(consumption, (order[positions[known]], day[known]), total[known])
+
+    ledger = StockTransaction.objects.filter(ingredients, type='out').order_by()
+    for day in range(days):
+        date = start + timedelta(days=day)
+        rows = np.fromiter(
+            ledger.filter(
+                timestamp__gte=closing_time(date - timedelta(days=1)), timestamp__lt=closing_time(date),
+            ).values_list('ingredient_id').annotate(total=Sum('quantity')),
+            dtype=LEDGER_ROW,
+        )
+        add(rows['ingredient'], np.full(len(rows), day), rows['total'])
+
+    first = start.toordinal()
+    checkpoints = StockCheckpoint.objects.filter(
+        ingredients, compacted=True, date__gte=start, date__lt=end, quantity_out__gt=0,
+    ).values_list('ingredient_id', 'date', 'quantity_out')
+    rows = np.fromiter(
+        ((ingredient_id, date.toordinal() - first, total) for ingredient_id, date, total in checkpoints.iterator()),
+        dtype=CHECKPOINT_ROW,
+    )
+    add(rows['ingredient'], rows['day'], rows['total'])
+    return consumption
+
+
+def history_used(window=28, seasonality_weeks=12):
+    """Trailing days of consumption that ``forecast`` reads with these options; older days do not change it."""
+    return max(window, seasonality_weeks * 7)
+
+
+def forecast(consumption, start, on_hand, lead_time=2, cover=7, window=28, seasonality_weeks=12, service_z=1.65):
+    """
+    Reorder points and quantities for every row of ``consumption`` at once.
+
+    The base rate is the mean daily consumption over the last ``window``
+    days. Day-of-week factors are each weekday's mean over the last
+    ``seasonality_weeks`` weeks relative to the overall mean, so the demand
+    forecast for the next ``lead_time`` days follows the weekly pattern.
+    The reorder point is that demand plus ``service_z`` standard deviations
+    of the seasonally adjusted daily demand over the lead time; the
+    suggested quantity tops stock up to cover ``lead_time + cover`` days.
+    """
+    rows, days = consumption.shape
+    window = min(window, days) or 1
+    recent = consumption[:, -window:]
+    rate = recent.mean(axis=1)
+
+    season_days = min(days - days % 7, seasonality_weeks * 7)
+    weekdays = (start.weekday() + np.arange(days)) % 7
+    if season_days:
+        # Fold whole weeks on top of each other, then rotate columns to Monday-first
+        weekly = consumption[:, -season_days:].reshape(rows, -1, 7).mean(axis=1)
+        by_weekday = np.roll(weekly, weekdays[-season_days], axis=1)
+        overall = by_weekday.mean(axis=1, keepdims=True)
+        factors = np.divide(by_weekday, overall, out=np.ones_like(by_weekday), where=overall > 0)
+    else:
+        factors = np.ones((rows, 7))
+
+    # Residual spread once the weekly pattern is taken out
+    recent_factors = factors[:, weekdays[-window:]]
+    spread = (recent - rate[:, None] * recent_factors).std(axis=1)
+
+    upcoming = (start.weekday() + days + np.arange(lead_time + cover)) % 7
+    daily_demand = rate[:, None] * factors[:, upcoming]
+    lead_demand = daily_demand[:, :lead_time].sum(axis=1)
+    reorder_point = lead_demand + service_z * spread * np.sqrt(lead_time)
+    order_up_to = daily_demand.sum(axis=1) + service_z * spread * np.sqrt(lead_time)
+    suggested = np.where(on_hand <= reorder_point, np.maximum(order_up_to - on_hand, 0), 0)
+    return {
+        'daily_rate': rate,
+        'weekday_factors': factors,
+        'reorder_point': reorder_point,
+        'suggested_quantity': suggested,
+    }
+
+
+def reorder_suggestions(history_days=365, window=28, seasonality_weeks=12, **options):
+    """
+    Forecast every stocked ingredient from the last ``history_days`` complete
+    days of the ledger, reading only the days the forecast uses.
+    """
+    stock = list(Stock.objects.order_by('ingredient_id').values_list('ingredient_id', 'quantity'))
+    if not stock:
+        return []
+    ingredient_ids, on_hand = zip(*stock)
+    on_hand = np.array(on_hand, dtype=float)
+    end = timezone.localdate()
+    start = end - timedelta(days=min(history_days, history_used(window, seasonality_weeks)))
+    result = forecast(
+        load_consumption(ingredient_ids, start, end), start, on_hand,
+        window=window, seasonality_weeks=seasonality_weeks, **options,
+    )
+    return [
+        {
+            'ingredient': ingredient_id,
+            'on_hand': float(on_hand[row]),
+            'daily_rate': round(float(result['daily_rate'][row]), 3),
+            'weekday_factors': [round(float(f), 3) for f in result['weekday_factors'][row]],
+            'reorder_point': round(float(result['reorder_point'][row]), 3),
+            'suggested_quantity': round(float(result['suggested_quantity'][row]), 3),
+            'needs_reorder': bool(on_hand[row] <= result['reorder_point'][row]),
+        }
+        for row, ingredient_id in enumerate(ingredient_ids)
+    ]
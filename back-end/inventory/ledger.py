@@ -0,0 +1,97 @@
+from django.db import models, transaction
+from django.db.models import Case, F, Value, When
+from django.db.models.lookups import GreaterThan
+from django.utils import timezone
+from .models import Stock, StockTransaction
+from .signals import stock_changed
+
+# How each ledger row type moves the balance: 'in' and 'out' rows carry a
+# positive quantity, 'adjustment' rows carry the signed change
+DIRECTION = {'in': 1, 'out': -1, 'adjustment': 1}
+
+
+def signed_quantity(type, quantity):
+    return DIRECTION[type] * quantity
+
+
+def signed_quantity_expression():
+    """The balance change of a StockTransaction row, for use in aggregates."""
+    return Case(
+        When(type='out', then=-F('quantity')),
+        default=F('quantity'),
+        output_field=models.FloatField(),
+    )
+
+
+def apply_stock_deltas(entries, user=None):
+    """
+    Apply ledger entries ``(ingredient_id, type, quantity, notes)``, or
+    ``(ingredient_id, type, quantity, notes, order_item_id)`` for rows taken
+    for an order item, in one transaction: a single UPDATE moves every affected Stock row with an
+    F() expression, the matching StockTransaction rows are bulk-inserted,
+    and ``stock_changed`` is sent once. The same UPDATE stamps or clears
+    ``reorder_triggered_at`` on rows crossing their threshold. Ingredients without a Stock row are
+    recorded in the ledger only. Returns the created transactions.
+    """
+    entries = [entry for entry in entries if entry[2]]
+    if not entries:
+        return []
+
+    deltas = {}
+    for ingredient_id, type, quantity, *_ in entries:
+        deltas[ingredient_id] = deltas.get(ingredient_id, 0) + signed_quantity(type, quantity)
+
+    now = timezone.now()
+    # SET expressions see the old row, so the threshold checks repeat the new quantity
+    quantity = F('quantity') + Case(
+        *(When(ingredient_id=ingredient_id, then=Value(delta)) for ingredient_id, delta in deltas.items()),
+        output_field=models.FloatField(),
+    )
+    with transaction.atomic():
+        Stock.objects.filter(ingredient_id__in=deltas).update(
+            quantity=quantity,
+            last_updated=now,
+            reorder_triggered_at=Case(
+                When(GreaterThan(quantity, F('reorder_threshold')), then=Value(None)),
+                When(reorder_triggered_at__isnull=True, then=Value(now)),
+                default=F('reorder_triggered_at'),
+                output_field=models.DateTimeField(),
+            ),
+        )
+        created = StockTransaction.objects.bulk_create(
+            StockTransaction(
+                ingredient_id=ingredient_id, type=type, quantity=quantity, notes=notes, user=user,
+                order_item_id=order_item[0] if order_item else None,
+            )
+            for ingredient_id, type, quantity, notes, *order_item in entries
+        )
+        stock_changed.send(sender=StockTransaction, ingredient_ids=list(deltas))
+    return created
+
+
+class StockAdjustmentError(ValueError):
+    pass
+
+
+def adjust_stock(adjustments, user=None):
+    """
+    Apply signed ``(ingredient_id, delta, notes)`` corrections to existing
+    Stock rows as 'adjustment' ledger entries. The deltas are added to the
+    stored quantity in SQL, so concurrent counts never overwrite each other.
+    Returns ``{ingredient_id: quantity}`` as read back inside the same
+    transaction.
+    """
+    adjustments = list(adjustments)
+    ingredient_ids = {ingredient_id for ingredient_id, _, _ in adjustments}
+    with transaction.atomic():
+        apply_stock_deltas(
+            ((ingredient_id, 'adjustment', delta, notes) for ingredient_id, delta, notes in adjustments), user=user
+        )
+        balances = dict(
+            Stock.objects.filter(ingredient_id__in=ingredient_ids).values_list('ingredient_id', 'quantity')
+        )
+        missing = ingredient_ids - balances.keys()
+        if missing:
+            # Rolls back the ledger rows written for the other lines
+            raise StockAdjustmentError(f'No stock for ingredient ids: {sorted(missing)}')
+    return balances
@@ -0,0 +1,114 @@
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from inventory.checkpoints import closing_time
+from inventory.forecasting import forecast, load_consumption, reorder_suggestions
+from inventory.models import Stock, StockCheckpoint, StockTransaction
+from menu.models import Ingredient
+
+
+class Command(BaseCommand):
+    help = 'Time the reorder forecast job over generated years of ledger history (rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ingredients', type=int, default=2000)
+        parser.add_argument('--days', type=int, default=2 * 365)
+        parser.add_argument('--sales-per-day', type=int, default=3,
+                            help='ledger rows per ingredient and day within the retention window')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options['seed'])
+        rows, days = options['ingredients'], options['days']
+        end = timezone.localdate()
+        start = end - timedelta(days=days)
+
+        # Per-ingredient base demand with a weekend peak, slow trend and noise
+        base = rng.gamma(2.0, 3.0, size=(rows, 1))
+        weekday = (start.weekday() + np.arange(days)) % 7
+        weekly = np.where(weekday >= 4, 1.4, 0.85)
+        trend = np.linspace(0.9, 1.1, days)
+        consumption = np.round(np.maximum(base * weekly * trend * rng.normal(1, 0.2, size=(rows, days)), 0), 2)
+        on_hand = rng.uniform(0, 200, size=rows)
+
+        started = time.perf_counter()
+        result = forecast(consumption, start, on_hand)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f'{rows} ingredients x {days} days ({consumption.size:,} daily values)')
+        self.stdout.write(f'Forecast core in {elapsed * 1e3:.1f} ms')
+
+        with transaction.atomic():
+            started = time.perf_counter()
+            ingredient_ids, ledger_rows, checkpoints = self.seed(consumption, start, on_hand, options['sales_per_day'])
+            self.stdout.write(
+                f'Seeded {ledger_rows:,} ledger rows and {checkpoints:,} compacted checkpoints '
+                f'in {time.perf_counter() - started:.1f} s'
+            )
+
+            started = time.perf_counter()
+            loaded = load_consumption(ingredient_ids, start, end)
+            elapsed = time.perf_counter() - started
+            drift = np.abs(loaded - consumption).max()
+            self.stdout.write(
+                f'Loading all {days} days: {elapsed * 1e3:.1f} ms; largest difference from generated {drift:.2e}'
+            )
+
+            started = time.perf_counter()
+            suggestions = reorder_suggestions(history_days=days)
+            elapsed = time.perf_counter() - started
+            flagged = sum(suggestion['needs_reorder'] for suggestion in suggestions)
+            self.stdout.write(
+                f'Full job ({len(suggestions)} stocked ingredients) in {elapsed * 1e3:.1f} ms; '
+                f'{flagged} at or below their reorder point'
+            )
+            # The job reads only the trailing days the forecast uses; it must agree with the full history
+            points = {suggestion['ingredient']: suggestion['reorder_point'] for suggestion in suggestions}
+            drift = np.abs(np.array([points[pk] for pk in ingredient_ids]) - result['reorder_point']).max()
+            self.stdout.write(f'Largest reorder point difference from the full-history forecast {drift:.2e}')
+            transaction.set_rollback(True)
+
+    def seed(self, consumption, start, on_hand, sales_per_day):
+        """
+        Write the generated consumption as the ledger would hold it: sales rows
+        for the days inside STOCK_LEDGER_RETENTION_DAYS and compacted daily
+        checkpoints before that.
+        """
+        rows, days = consumption.shape
+        ingredients = Ingredient.objects.bulk_create(
+            Ingredient(name=f'Forecast ingredient {n}', unit='kg', cost_per_unit='1.00') for n in range(rows)
+        )
+        ingredient_ids = [ingredient.pk for ingredient in ingredients]
+        Stock.objects.bulk_create(
+            Stock(ingredient_id=ingredient_id, quantity=float(quantity), reorder_threshold=0)
+            for ingredient_id, quantity in zip(ingredient_ids, on_hand)
+        )
+        compacted_days = max(days - getattr(settings, 'STOCK_LEDGER_RETENTION_DAYS', 90), 0)
+        ledger_rows = checkpoints = 0
+        for offset in range(days):
+            day = start + timedelta(days=offset)
+            totals = consumption[:, offset]
+            if offset < compacted_days:
+                checkpoints += len(StockCheckpoint.objects.bulk_create(
+                    StockCheckpoint(
+                        ingredient_id=ingredient_id, date=day, closing_at=closing_time(day), closing_quantity=0,
+                        quantity_out=float(total), transaction_count=sales_per_day, compacted=True,
+                    )
+                    for ingredient_id, total in zip(ingredient_ids, totals) if total > 0
+                ))
+                continue
+            created = StockTransaction.objects.bulk_create(
+                StockTransaction(ingredient_id=ingredient_id, type='out', quantity=float(total) / sales_per_day)
+                for ingredient_id, total in zip(ingredient_ids, totals) if total > 0
+                for _ in range(sales_per_day)
+            )
+            ledger_rows += len(created)
+            if created:
+                # Timestamps are set on insert; move the day's rows to its lunch service
+                noon = timezone.make_aware(datetime.combine(day, datetime.min.time())) + timedelta(hours=12)
+                StockTransaction.objects.filter(pk__gte=created[0].pk, pk__lte=created[-1].pk).update(timestamp=noon)
+        return ingredient_ids, ledger_rows, checkpoints
@@ -0,0 +1,78 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from inventory.models import Stock, StockTransaction
+from menu.models import Category, Dish, DishIngredient, Ingredient
+from orders.models import Order, OrderItem
+from orders.transitions import transition_orders
+
+
+class Command(BaseCommand):
+    help = 'Confirm and cancel a generated dinner rush to time recipe-based stock depletion (rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=200)
+        parser.add_argument('--dishes', type=int, default=60)
+        parser.add_argument('--ingredients', type=int, default=150)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        with transaction.atomic():
+            category = Category.objects.create(name='Benchmark')
+            ingredients = Ingredient.objects.bulk_create(
+                Ingredient(name=f'Ingredient {n}', unit='kg', cost_per_unit='1.00')
+                for n in range(options['ingredients'])
+            )
+            Stock.objects.bulk_create(
+                Stock(ingredient=ingredient, quantity=10 ** 6, reorder_threshold=0) for ingredient in ingredients
+            )
+            dishes = Dish.objects.bulk_create(
+                Dish(name=f'Dish {n}', description='', price='10.00', category=category, preparation_time=10)
+                for n in range(options['dishes'])
+            )
+            DishIngredient.objects.bulk_create(
+                DishIngredient(dish=dish, ingredient=ingredient, quantity=rng.uniform(0.01, 0.5))
+                for dish in dishes for ingredient in rng.sample(ingredients, rng.randint(3, 8))
+            )
+            orders = Order.objects.bulk_create(Order() for _ in range(options['orders']))
+            OrderItem.objects.bulk_create(
+                OrderItem(order=order, dish=rng.choice(dishes), quantity=rng.randint(1, 3))
+                for order in orders for _ in range(rng.randint(1, 6))
+            )
+            before = dict(Stock.objects.values_list('ingredient_id', 'quantity'))
+            order_ids = [order.pk for order in orders]
+            half = len(order_ids) // 2
+
+            # Half the rush confirmed ticket by ticket as it arrives, half in one batch
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                for order_id in order_ids[:half]:
+                    transition_orders([order_id], 'confirmed')
+                one_by_one = time.perf_counter() - started
+            self.report(f'{half} orders confirmed one at a time', one_by_one, len(queries), half)
+
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                transition_orders(order_ids[half:], 'confirmed')
+                batch = time.perf_counter() - started
+            self.report(f'{len(order_ids) - half} orders confirmed in one batch', batch, len(queries), 1)
+
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                transition_orders(order_ids, 'cancelled')
+                cancel = time.perf_counter() - started
+            self.report(f'{len(order_ids)} orders cancelled in one batch', cancel, len(queries), 1)
+
+            after = dict(Stock.objects.values_list('ingredient_id', 'quantity'))
+            drift = max(abs(after[pk] - before[pk]) for pk in before)
+            self.stdout.write(
+                f'{StockTransaction.objects.count()} ledger rows written; largest drift after reversal {drift:.2e}'
+            )
+            transaction.set_rollback(True)
+
+    def report(self, label, seconds, queries, calls):
+        self.stdout.write(f'{label}: {seconds * 1e3:8.1f} ms, {queries} queries ({queries / calls:.1f} per call)')
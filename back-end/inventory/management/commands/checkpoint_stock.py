@@ -0,0 +1,19 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from inventory.checkpoints import build_checkpoints
+
+
+class Command(BaseCommand):
+    help = 'Write daily closing stock balances from the ledger, up to yesterday by default'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--through', type=date.fromisoformat,
+                            help='Last day to close (YYYY-MM-DD); must already be over')
+
+    def handle(self, *args, **options):
+        yesterday = timezone.localdate() - timedelta(days=1)
+        through = min(options['through'] or yesterday, yesterday)
+        created = build_checkpoints(through)
+        self.stdout.write(self.style.SUCCESS(f'Wrote {created} checkpoint(s) through {through}'))
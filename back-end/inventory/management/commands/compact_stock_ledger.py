@@ -0,0 +1,21 @@
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from inventory.checkpoints import compact_ledger
+
+
+class Command(BaseCommand):
+    help = 'Roll stock ledger rows older than the retention window into daily checkpoints and delete them'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--before', type=date.fromisoformat,
+                            help='Compact days before this date (YYYY-MM-DD); defaults to the retention window')
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        before = options['before'] or timezone.localdate() - timedelta(days=settings.STOCK_LEDGER_RETENTION_DAYS)
+        before = min(before, timezone.localdate())
+        removed = compact_ledger(before, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Compacted {removed} ledger row(s) before {before}'))
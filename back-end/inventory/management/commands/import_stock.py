@@ -0,0 +1,35 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from inventory.transfer import ImportFormatError, detect_format, import_stock, iter_records
+
+
+class Command(BaseCommand):
+    help = 'Stream a CSV or JSON-lines file of stock movements (ingredient, quantity, type, notes) into stock and the ledger'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--file-format', choices=('csv', 'jsonl'),
+                            help='Defaults to the file extension')
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--user', help='Username recorded on the ledger rows')
+
+    def handle(self, *args, **options):
+        try:
+            file_format = detect_format(options['path'], options['file_format'])
+        except ImportFormatError as e:
+            raise CommandError(str(e))
+        user = None
+        if options['user']:
+            try:
+                user = get_user_model().objects.get(username=options['user'])
+            except get_user_model().DoesNotExist:
+                raise CommandError(f"Unknown user '{options['user']}'")
+
+        with open(options['path'], 'rb') as stream:
+            result = import_stock(iter_records(stream, file_format), user=user, chunk_size=options['chunk_size'])
+
+        for error in result['errors']:
+            self.stderr.write(f"line {error['line']}: {error['error']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {result['imported']} row(s); rejected {result['rejected']}"
+        ))
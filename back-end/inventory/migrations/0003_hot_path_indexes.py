@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-18 17:02
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0002_initial'),
+        ('menu', '0002_hot_path_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='stocktransaction',
+            index=models.Index(fields=['-timestamp', '-id'], name='stocktx_timestamp_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stocktransaction',
+            index=models.Index(fields=['ingredient', '-timestamp', '-id'], name='stocktx_ingredient_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stocktransaction',
+            index=models.Index(fields=['type', '-timestamp', '-id'], name='stocktx_type_ts_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.6 on 2026-10-18 17:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0003_hot_path_indexes'),
+        ('menu', '0005_dish_in_stock'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('closing_at', models.DateTimeField()),
+                ('closing_quantity', models.FloatField()),
+                ('quantity_in', models.FloatField(default=0)),
+                ('quantity_out', models.FloatField(default=0)),
+                ('adjustments', models.FloatField(default=0)),
+                ('transaction_count', models.PositiveIntegerField(default=0)),
+                ('compacted', models.BooleanField(default=False)),
+                ('ingredient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_checkpoints', to='menu.ingredient')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['ingredient', '-closing_at'], name='stockcp_ingredient_close_idx')],
+                'constraints': [models.UniqueConstraint(fields=('ingredient', 'date'), name='unique_stock_checkpoint')],
+            },
+        ),
+    ]
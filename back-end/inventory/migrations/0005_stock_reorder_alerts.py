@@ -0,0 +1,36 @@
+# Generated by Django 5.2.6 on 2026-10-18 17:27
+
+import django.db.models.expressions
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_reorder_triggered_at(apps, schema_editor):
+    # Rows already at or below their threshold count as triggered at their last update
+    Stock = apps.get_model('inventory', 'Stock')
+    Stock.objects.filter(quantity__lte=F('reorder_threshold')).update(reorder_triggered_at=F('last_updated'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0004_stock_checkpoint'),
+        ('menu', '0005_dish_in_stock'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='stock',
+            name='reorder_triggered_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='stock',
+            index=models.Index(django.db.models.expressions.CombinedExpression(models.F('reorder_threshold'), '-', models.F('quantity')), name='stock_shortfall_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stock',
+            index=models.Index(fields=['reorder_triggered_at', 'ingredient'], name='stock_reorder_trigger_idx'),
+        ),
+        migrations.RunPython(backfill_reorder_triggered_at, migrations.RunPython.noop),
+    ]
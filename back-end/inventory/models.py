@@ -1,12 +1,38 @@
 from django.db import models
+from django.db.models import F
 from django.conf import settings
 from django.utils import timezone
 
+def shortfall_expression():
+    # Matches the stock_shortfall_idx expression so filters and ordering on it can use the index
+    return F('reorder_threshold') - F('quantity')
+
+class StockQuerySet(models.QuerySet):
+    def with_shortfall(self):
+        return self.annotate(shortfall=shortfall_expression())
+    
+    def needs_reorder(self, value=True):
+        # quantity <= reorder_threshold, phrased on the indexed shortfall
+        if value:
+            return self.with_shortfall().filter(shortfall__gte=0)
+        return self.with_shortfall().filter(shortfall__lt=0)
+
 class Stock(models.Model):
     ingredient = models.OneToOneField('menu.Ingredient', on_delete=models.CASCADE)
     quantity = models.FloatField()
     last_updated = models.DateTimeField(auto_now=True)
     reorder_threshold = models.FloatField()
+    # When quantity last fell to or below reorder_threshold; cleared once it is above again.
+    # Maintained by Stock.save and inventory.ledger.apply_stock_deltas
+    reorder_triggered_at = models.DateTimeField(null=True, blank=True, editable=False)
+    
+    objects = StockQuerySet.as_manager()
+    
+    class Meta:
+        indexes = [
+            models.Index(shortfall_expression(), name='stock_shortfall_idx'),
+            models.Index(fields=['reorder_triggered_at', 'ingredient'], name='stock_reorder_trigger_idx'),
+        ]
     
     def __str__(self):
         return f"{self.ingredient.name} - {self.quantity} {self.ingredient.unit}"
@@ -14,6 +40,16 @@ class Stock(models.Model):
     @property
     def needs_reorder(self):
         return self.quantity <= self.reorder_threshold
+    
+    def save(self, *args, **kwargs):
+        if not self.needs_reorder:
+            self.reorder_triggered_at = None
+        elif self.reorder_triggered_at is None:
+            self.reorder_triggered_at = timezone.now()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'reorder_triggered_at'}
+        super().save(*args, **kwargs)
 
 class StockTransaction(models.Model):
     TYPE_CHOICES = (
@@ -28,6 +64,44 @@ class StockTransaction(models.Model):
     timestamp = models.DateTimeField(auto_now_add=True)
     notes = models.TextField(blank=True)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True)
+    # The order item whose recipe this row took out of (or put back into) stock
+    order_item = models.ForeignKey('orders.OrderItem', on_delete=models.SET_NULL, null=True, blank=True,
+                                   related_name='stock_transactions')
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['-timestamp', '-id'], name='stocktx_timestamp_idx'),
+            models.Index(fields=['ingredient', '-timestamp', '-id'], name='stocktx_ingredient_ts_idx'),
+            models.Index(fields=['type', '-timestamp', '-id'], name='stocktx_type_ts_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.type} {self.quantity} {self.ingredient.unit} of {self.ingredient.name}"
+
+class StockCheckpoint(models.Model):
+    """
+    Closing ledger balance of an ingredient at the end of a day, with that
+    day's movements. Written for days with activity plus, for every known
+    ingredient, the last day checkpointed, which marks how far checkpoints go.
+    """
+    ingredient = models.ForeignKey('menu.Ingredient', on_delete=models.CASCADE, related_name='stock_checkpoints')
+    date = models.DateField()
+    closing_at = models.DateTimeField()
+    closing_quantity = models.FloatField()
+    quantity_in = models.FloatField(default=0)
+    quantity_out = models.FloatField(default=0)
+    adjustments = models.FloatField(default=0)
+    transaction_count = models.PositiveIntegerField(default=0)
+    # True once the day's StockTransaction rows were rolled into this checkpoint and removed
+    compacted = models.BooleanField(default=False)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['ingredient', 'date'], name='unique_stock_checkpoint'),
+        ]
+        indexes = [
+            models.Index(fields=['ingredient', '-closing_at'], name='stockcp_ingredient_close_idx'),
+        ]
     
     def __str__(self):
-        return f"{self.type} {self.quantity} {self.ingredient.unit} of {self.ingredient.name}"
\ No newline at end of file
+        return f"{self.ingredient} closing {self.date}: {self.closing_quantity}"
@@ -1,20 +1,45 @@
 from rest_framework import serializers
+from menu.serializers import IngredientSerializer
+from restaurant_management.serializers import FlexFieldsMixin
+from users.serializers import UserSerializer
 from .models import Stock, StockTransaction
 
-class StockSerializer(serializers.ModelSerializer):
+class StockSerializer(FlexFieldsMixin, serializers.ModelSerializer):
+    needs_reorder = serializers.BooleanField(read_only=True)
+    shortfall = serializers.SerializerMethodField()
+    
     class Meta:
         model = Stock
         fields = '__all__'
+        expandable_fields = {
+            'ingredient': (IngredientSerializer, {}),
+        }
+    
+    def get_fields(self):
+        fields = super().get_fields()
+        # Updates keep the current ingredient unless a new one is sent
+        if self.instance is not None and 'ingredient' in fields:
+            fields['ingredient'].required = False
+        return fields
     
-    def validate(self, attrs):
-        # If we're updating, get the current instance
-        if self.instance is not None:
-            # If ingredient is not provided in the update, use the current one
-            if 'ingredient' not in attrs:
-                attrs['ingredient'] = self.instance.ingredient
-        return super().validate(attrs)
+    def get_shortfall(self, obj):
+        return obj.reorder_threshold - obj.quantity
 
-class StockTransactionSerializer(serializers.ModelSerializer):
+class StockTransactionSerializer(FlexFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = StockTransaction
-        fields = '__all__'
\ No newline at end of file
+        fields = '__all__'
+        expandable_fields = {
+            'ingredient': (IngredientSerializer, {}),
+            'user': (UserSerializer, {}),
+        }
+
+class StockAdjustmentSerializer(serializers.Serializer):
+    ingredient = serializers.IntegerField(required=False)
+    delta = serializers.FloatField()
+    notes = serializers.CharField(required=False, allow_blank=True, default='')
+    
+    def validate_delta(self, value):
+        if not value:
+            raise serializers.ValidationError('delta must not be zero')
+        return value
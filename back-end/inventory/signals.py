@@ -0,0 +1,65 @@
+from django.db.models.signals import post_delete, post_init, post_save, pre_delete
+from django.dispatch import Signal, receiver
+from menu.cache import bump_menu_version
+from menu.costing import dishes_using
+from menu.models import Dish
+from menu.signals import recipe_changed
+from orders.models import Order, OrderItem
+from orders.signals import order_items_created, order_status_changed
+from .availability import refresh_dish_stock
+from .models import Stock
+
+# Sent with ``ingredient_ids`` whenever stock quantities change, including
+# bulk updates that bypass model signals
+stock_changed = Signal()
+
+@receiver(post_init, sender=Stock)
+def remember_loaded_quantity(sender, instance=None, **kwargs):
+    instance._loaded_quantity = instance.__dict__.get('quantity')
+
+@receiver(post_save, sender=Stock)
+def announce_stock_save(sender, instance=None, created=False, **kwargs):
+    if created or instance.quantity != instance._loaded_quantity:
+        stock_changed.send(sender=Stock, ingredient_ids=[instance.ingredient_id])
+    instance._loaded_quantity = instance.quantity
+
+@receiver(post_delete, sender=Stock)
+def announce_stock_delete(sender, instance=None, **kwargs):
+    stock_changed.send(sender=Stock, ingredient_ids=[instance.ingredient_id])
+
+@receiver(stock_changed)
+def refresh_availability_for_stock(sender, ingredient_ids=(), **kwargs):
+    if refresh_dish_stock(dishes_using(ingredient_ids)):
+        bump_menu_version()
+
+@receiver(recipe_changed)
+def refresh_availability_for_recipe(sender, dish_ids=(), **kwargs):
+    if refresh_dish_stock(Dish.objects.filter(pk__in=dish_ids)):
+        bump_menu_version()
+
+@receiver(order_status_changed)
+def move_stock_for_orders(sender, ids=(), status=None, **kwargs):
+    from .depletion import DEPLETING_STATUSES, deplete_orders, restore_orders
+    if status in DEPLETING_STATUSES:
+        deplete_orders(ids)
+    elif status == 'cancelled':
+        restore_orders(ids)
+
+@receiver(order_items_created)
+def deplete_added_items(sender, order_ids=(), **kwargs):
+    from .depletion import deplete_orders
+    deplete_orders(order_ids)
+
+@receiver(pre_delete, sender=OrderItem)
+def restore_deleted_item(sender, instance=None, origin=None, **kwargs):
+    # Items deleted with their order are restored together by restore_deleted_order
+    if isinstance(origin, Order) or getattr(origin, 'model', None) is Order:
+        return
+    if instance.stock_depleted:
+        from .depletion import RESTORING_STATUSES, restore_items
+        restore_items(OrderItem.objects.filter(pk=instance.pk, order__status__in=RESTORING_STATUSES))
+
+@receiver(pre_delete, sender=Order)
+def restore_deleted_order(sender, instance=None, **kwargs):
+    from .depletion import RESTORING_STATUSES, restore_items
+    restore_items(OrderItem.objects.filter(order=instance, order__status__in=RESTORING_STATUSES))
@@ -1,3 +1,523 @@
-from django.test import TestCase
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone as dt_timezone
+from io import StringIO
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from menu.models import Category, Dish, DishIngredient, Ingredient
+from orders.models import Order, OrderItem
+from orders.transitions import transition_orders
+from restaurant_management.testing import IndexUsageMixin
+from .checkpoints import balances_at, build_checkpoints, closing_time
+from .forecasting import load_consumption
+from .ledger import adjust_stock, apply_stock_deltas
+from .models import Stock, StockCheckpoint, StockTransaction
+
+User = get_user_model()
+
+
+@contextmanager
+def before_stock_update(sql, params):
+    """Run ``sql`` just before the next UPDATE of inventory_stock, as a concurrent writer would."""
+    pending = [True]
+
+    def interleave(execute, statement, statement_params, many, context):
+        if pending and statement.startswith('UPDATE "inventory_stock"'):
+            pending.clear()
+            execute(sql, params, False, context)
+        return execute(statement, statement_params, many, context)
+
+    with connection.execute_wrapper(interleave):
+        yield
+
+
+class StockTransactionIndexTests(IndexUsageMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        ingredients = Ingredient.objects.bulk_create(
+            Ingredient(name=f'Ingredient {n}', unit='kg', cost_per_unit='1.00') for n in range(50)
+        )
+        types = [choice for choice, _ in StockTransaction.TYPE_CHOICES]
+        StockTransaction.objects.bulk_create(
+            StockTransaction(ingredient=ingredients[n % 50], type=types[n % 3], quantity=1)
+            for n in range(3000)
+        )
+        cls.ingredient = ingredients[0]
+
+    def test_ledger_list_paths(self):
+        ordering = ('-timestamp', '-id')
+        self.assertUsesIndex(StockTransaction.objects.order_by(*ordering)[:20])
+        self.assertUsesIndex(StockTransaction.objects.filter(ingredient=self.ingredient).order_by(*ordering)[:20])
+        self.assertUsesIndex(StockTransaction.objects.filter(type='in').order_by(*ordering)[:20])
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class DishAvailabilityTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='pos', password='secret')
+        category = Category.objects.create(name='Mains')
+        cls.rice, cls.egg, cls.salt = (
+            Ingredient.objects.create(name=name, unit='kg', cost_per_unit='1.00') for name in ('Rice', 'Egg', 'Salt')
+        )
+        cls.rice_stock = Stock.objects.create(ingredient=cls.rice, quantity=10, reorder_threshold=2)
+        Stock.objects.create(ingredient=cls.egg, quantity=5, reorder_threshold=1)
+        cls.fried_rice, cls.omelette = (
+            Dish.objects.create(name=name, description='', price='9.00', category=category, preparation_time=10)
+            for name in ('Fried Rice', 'Omelette')
+        )
+        for dish, ingredient, quantity in (
+            (cls.fried_rice, cls.rice, 0.3), (cls.fried_rice, cls.egg, 1), (cls.fried_rice, cls.salt, 0.01),
+            (cls.omelette, cls.egg, 3),
+        ):
+            DishIngredient.objects.create(dish=dish, ingredient=ingredient, quantity=quantity)
+
+    def in_stock(self):
+        return dict(Dish.objects.values_list('name', 'in_stock'))
+
+    def test_untracked_ingredients_do_not_limit(self):
+        self.assertEqual(self.in_stock(), {'Fried Rice': True, 'Omelette': True})
+
+    def test_stock_change_touches_only_dishes_using_the_ingredient(self):
+        self.rice_stock.quantity = 0.2
+        with CaptureQueriesContext(connection) as queries:
+            self.rice_stock.save()
+        self.assertEqual(self.in_stock(), {'Fried Rice': False, 'Omelette': True})
+        refresh = next(q['sql'] for q in queries if q['sql'].startswith('UPDATE "menu_dish"'))
+        self.assertIn(f'"ingredient_id" IN ({self.rice.pk})', refresh)
+
+        self.rice_stock.quantity = 4
+        self.rice_stock.save()
+        self.assertTrue(Dish.objects.get(pk=self.fried_rice.pk).in_stock)
+
+    def test_stale_dish_save_keeps_in_stock(self):
+        dish = Dish.objects.get(pk=self.omelette.pk)
+        apply_stock_deltas([(self.egg.pk, 'out', 4, '')])
+        self.assertFalse(Dish.objects.get(pk=self.omelette.pk).in_stock)
+        dish.preparation_time = 12
+        dish.save()
+        self.assertFalse(Dish.objects.get(pk=self.omelette.pk).in_stock)
+
+    def test_recipe_change_and_filter(self):
+        line = DishIngredient.objects.get(dish=self.omelette, ingredient=self.egg)
+        line.quantity = 6
+        line.save()
+        self.client.force_authenticate(self.user)
+        response = self.client.get('/api/menu/dishes/', {'available': 'true', 'in_stock': 'true'})
+        self.assertEqual([dish['name'] for dish in response.data['results']], ['Fried Rice'])
+
+
+class StockDepletionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Mains')
+        cls.rice, cls.egg = (
+            Ingredient.objects.create(name=name, unit='kg', cost_per_unit='1.00') for name in ('Rice', 'Egg')
+        )
+        for ingredient in (cls.rice, cls.egg):
+            Stock.objects.create(ingredient=ingredient, quantity=100, reorder_threshold=0)
+        cls.fried_rice, cls.omelette = (
+            Dish.objects.create(name=name, description='', price='9.00', category=category, preparation_time=10)
+            for name in ('Fried Rice', 'Omelette')
+        )
+        for dish, ingredient, quantity in (
+            (cls.fried_rice, cls.rice, 0.25), (cls.fried_rice, cls.egg, 1), (cls.omelette, cls.egg, 3),
+        ):
+            DishIngredient.objects.create(dish=dish, ingredient=ingredient, quantity=quantity)
+
+    def setUp(self):
+        self.order = Order.objects.create()
+        OrderItem.objects.create(order=self.order, dish=self.fried_rice, quantity=2)
+        OrderItem.objects.create(order=self.order, dish=self.omelette, quantity=1)
+
+    def on_hand(self):
+        return dict(Stock.objects.values_list('ingredient__name', 'quantity'))
+
+    def test_confirmation_depletes_once_and_cancellation_restores(self):
+        self.assertEqual(self.on_hand(), {'Rice': 100, 'Egg': 100})
+        transition_orders([self.order.pk], 'confirmed')
+        self.assertEqual(self.on_hand(), {'Rice': 99.5, 'Egg': 95})
+        self.assertEqual(
+            sorted(StockTransaction.objects.values_list('order_item__dish__name', 'ingredient__name', 'quantity')),
+            [('Fried Rice', 'Egg', 2), ('Fried Rice', 'Rice', 0.5), ('Omelette', 'Egg', 3)],
+        )
+
+        transition_orders([self.order.pk], 'preparing')
+        self.assertEqual(self.on_hand(), {'Rice': 99.5, 'Egg': 95})
+
+        transition_orders([self.order.pk], 'cancelled')
+        self.assertEqual(self.on_hand(), {'Rice': 100, 'Egg': 100})
+        self.assertEqual(StockTransaction.objects.filter(type='in').count(), 3)
+
+    def test_cancellation_reverses_recorded_rows_after_edits(self):
+        transition_orders([self.order.pk], 'confirmed')
+        # Neither a recipe change nor an item quantity change alters what was taken
+        DishIngredient.objects.filter(dish=self.omelette).update(quantity=10)
+        OrderItem.objects.filter(dish=self.fried_rice).update(quantity=5)
+        transition_orders([self.order.pk], 'cancelled')
+        self.assertEqual(self.on_hand(), {'Rice': 100, 'Egg': 100})
+
+    def test_deleting_a_depleted_item_gives_its_stock_back(self):
+        transition_orders([self.order.pk], 'confirmed')
+        OrderItem.objects.get(dish=self.omelette).delete()
+        self.assertEqual(self.on_hand(), {'Rice': 99.5, 'Egg': 98})
+        self.order.delete()
+        self.assertEqual(self.on_hand(), {'Rice': 100, 'Egg': 100})
+        self.assertFalse(StockTransaction.objects.filter(order_item__isnull=False).exists())
+
+    def test_deleting_a_paid_order_keeps_its_stock_out(self):
+        transition_orders([self.order.pk], 'confirmed')
+        transition_orders([self.order.pk], 'paid')
+        with CaptureQueriesContext(connection) as queries:
+            self.order.delete()
+        self.assertEqual(self.on_hand(), {'Rice': 99.5, 'Egg': 95})
+        self.assertFalse(any(q['sql'].startswith('UPDATE "inventory_stock"') for q in queries))
+
+    def test_deleting_an_open_order_restores_its_items_together(self):
+        transition_orders([self.order.pk], 'confirmed')
+        with CaptureQueriesContext(connection) as queries:
+            self.order.delete()
+        self.assertEqual(self.on_hand(), {'Rice': 100, 'Egg': 100})
+        self.assertEqual(sum(q['sql'].startswith('UPDATE "inventory_stock"') for q in queries), 1)
+
+    def test_items_added_after_confirmation_are_depleted(self):
+        transition_orders([self.order.pk], 'confirmed')
+        OrderItem.objects.create(order=self.order, dish=self.omelette, quantity=2)
+        self.assertEqual(self.on_hand()['Egg'], 89)
+
+    def test_batch_confirmation_query_count_is_flat(self):
+        orders = [self.order]
+        for _ in range(20):
+            order = Order.objects.create()
+            OrderItem.objects.create(order=order, dish=self.fried_rice, quantity=1)
+            orders.append(order)
+        with CaptureQueriesContext(connection) as queries:
+            transition_orders([order.pk for order in orders], 'confirmed')
+        stock_updates = [q for q in queries if q['sql'].startswith('UPDATE "inventory_stock"')]
+        ledger_inserts = [q for q in queries if q['sql'].startswith('INSERT INTO "inventory_stocktransaction"')]
+        self.assertEqual((len(stock_updates), len(ledger_inserts)), (1, 1))
+        self.assertEqual(self.on_hand(), {'Rice': 94.5, 'Egg': 75})
+
+
+class StockCheckpointTests(TestCase):
+    start = datetime(2026, 3, 1, tzinfo=dt_timezone.utc)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.flour, cls.sugar = (
+            Ingredient.objects.create(name=name, unit='kg', cost_per_unit='1.00') for name in ('Flour', 'Sugar')
+        )
+        # Four days of movements, every six hours
+        for n, (ingredient, type, quantity) in enumerate([
+            (cls.flour, 'in', 50), (cls.flour, 'out', 4), (cls.sugar, 'in', 20), (cls.flour, 'out', 6),
+            (cls.flour, 'adjustment', -1.5), (cls.sugar, 'out', 2), (cls.flour, 'out', 3), (cls.sugar, 'out', 1),
+            (cls.flour, 'in', 10), (cls.sugar, 'adjustment', 0.5), (cls.flour, 'out', 2), (cls.sugar, 'out', 4),
+            (cls.flour, 'out', 7), (cls.sugar, 'in', 5), (cls.flour, 'out', 1), (cls.sugar, 'out', 3),
+        ]):
+            row = StockTransaction.objects.create(ingredient=ingredient, type=type, quantity=quantity)
+            StockTransaction.objects.filter(pk=row.pk).update(timestamp=cls.start + timedelta(hours=6 * n + 1))
+
+    def replay(self, at):
+        balances = {self.flour.pk: 0, self.sugar.pk: 0}
+        sign = {'in': 1, 'out': -1, 'adjustment': 1}
+        for ingredient_id, type, quantity in StockTransaction.objects.filter(timestamp__lt=at).values_list(
+            'ingredient_id', 'type', 'quantity'
+        ):
+            balances[ingredient_id] += sign[type] * quantity
+        return balances
+
+    def balances(self, at):
+        return {pk: balance['quantity'] for pk, balance in balances_at(at).items()}
+
+    def test_checkpoint_plus_delta_matches_full_replay(self):
+        instants = [self.start + timedelta(hours=hours) for hours in range(0, 100, 7)]
+        expected = {at: self.replay(at) for at in instants}
+        self.assertEqual(build_checkpoints(self.start.date() + timedelta(days=1)), 4)
+        for at in instants:
+            self.assertEqual(self.balances(at), expected[at])
+
+    def test_compaction_keeps_totals_and_closing_balances(self):
+        midnights = [self.start + timedelta(days=days) for days in range(5)]
+        expected = {at: self.replay(at) for at in midnights}
+        call_command('compact_stock_ledger', '--before', '2026-03-03', stdout=StringIO())
+
+        self.assertEqual(StockTransaction.objects.count(), 8)
+        flour = StockCheckpoint.objects.filter(ingredient=self.flour)
+        self.assertEqual(
+            sum(flour.values_list('transaction_count', flat=True)) + StockTransaction.objects.filter(
+                ingredient=self.flour
+            ).count(),
+            9,
+        )
+        self.assertEqual(flour.get(date='2026-03-02').closing_quantity, expected[midnights[2]][self.flour.pk])
+        for at in midnights:
+            self.assertEqual(self.balances(at), expected[at])
+            self.assertTrue(balances_at(at)[self.flour.pk]['exact'])
+        self.assertFalse(balances_at(self.start + timedelta(hours=30))[self.flour.pk]['exact'])
+        self.assertTrue(balances_at(self.start + timedelta(hours=60))[self.flour.pk]['exact'])
+
+    def test_balance_endpoint(self):
+        user = User.objects.create_user(username='auditor', password='secret')
+        self.client.force_login(user)
+        response = self.client.get('/api/inventory/stocks/balance/', {
+            'at': '2026-03-02T00:00:00Z', 'ingredient': self.sugar.pk,
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['balances'], [
+            {'ingredient': self.sugar.pk, 'quantity': 20.0, 'checkpoint': None, 'exact': True},
+        ])
+        self.assertEqual(self.client.get('/api/inventory/stocks/balance/', {'at': 'yesterday'}).status_code, 400)
+
+
+class ReorderForecastTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='buyer', password='secret')
+        cls.fish, cls.salt = (
+            Ingredient.objects.create(name=name, unit='kg', cost_per_unit='1.00') for name in ('Fish', 'Salt')
+        )
+        Stock.objects.create(ingredient=cls.fish, quantity=10, reorder_threshold=0)
+        Stock.objects.create(ingredient=cls.salt, quantity=100, reorder_threshold=0)
+        # Eight weeks of sales: fish doubles on Saturdays, salt is flat
+        today = timezone.localdate()
+        for days_ago in range(1, 57):
+            day = today - timedelta(days=days_ago)
+            noon = timezone.make_aware(datetime.combine(day, datetime.min.time())) + timedelta(hours=12)
+            for ingredient, quantity in ((cls.fish, 8 if day.weekday() == 5 else 4), (cls.salt, 1)):
+                row = StockTransaction.objects.create(ingredient=ingredient, type='out', quantity=quantity)
+                StockTransaction.objects.filter(pk=row.pk).update(timestamp=noon)
+
+    def test_suggestions_follow_rate_and_weekday_pattern(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.get('/api/inventory/stocks/reorder_suggestions/', {'lead_time': 3, 'cover': 7})
+        self.assertEqual(response.status_code, 200)
+        fish, salt = response.data
+        self.assertEqual(fish['daily_rate'], round(32 / 7, 3))
+        self.assertEqual(fish['weekday_factors'][5], round(8 / (32 / 7), 3))
+        self.assertEqual(fish['weekday_factors'][0], round(4 / (32 / 7), 3))
+        self.assertTrue(fish['needs_reorder'])
+        self.assertGreater(fish['suggested_quantity'], 0)
+        self.assertEqual((salt['daily_rate'], salt['reorder_point'], salt['needs_reorder']), (1.0, 3.0, False))
+        self.assertEqual(salt['suggested_quantity'], 0)
+
+        response = self.client.get('/api/inventory/stocks/reorder_suggestions/', {'needs_reorder': 'true', 'lead_time': 3})
+        self.assertEqual([s['ingredient'] for s in response.data], [self.fish.pk])
+        self.assertEqual(
+            self.client.get('/api/inventory/stocks/reorder_suggestions/', {'lead_time': 0}).status_code, 400
+        )
+
+    def test_load_consumption_reads_only_requested_ingredients(self):
+        end = timezone.localdate()
+        start = end - timedelta(days=70)
+        StockCheckpoint.objects.create(
+            ingredient=self.salt, date=start, closing_at=closing_time(start), closing_quantity=0,
+            quantity_out=5, compacted=True,
+        )
+        consumption = load_consumption([self.salt.pk], start, end)
+        self.assertEqual(consumption.shape, (1, 70))
+        self.assertEqual(consumption[0, 0], 5)
+        self.assertEqual(consumption[0, 1:14].sum(), 0)
+        self.assertEqual(consumption[0, -56:].tolist(), [1.0] * 56)
+        # One ledger query per day plus one for checkpoints
+        with self.assertNumQueries(3):
+            load_consumption([self.fish.pk, self.salt.pk], end - timedelta(days=2), end)
+
+
+class StockTransferTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='receiver', password='secret')
+        cls.flour, cls.yeast = (
+            Ingredient.objects.create(name=name, unit='kg', cost_per_unit='1.00') for name in ('Flour', 'Yeast')
+        )
+        cls.stock = Stock.objects.create(ingredient=cls.flour, quantity=5, reorder_threshold=1)
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def upload(self, name, content, **data):
+        return self.client.post('/api/inventory/stocks/import/', {
+            'file': SimpleUploadedFile(name, content.encode()), **data,
+        }, format='multipart')
+
+    def test_csv_delivery_moves_stock_and_ledger_in_bulk(self):
+        rows = [f'{self.flour.pk},2.5,in,Delivery 42'] * 5 + [f'{self.yeast.pk},1,,', '999,1,in,', 'x,1,in,']
+        with CaptureQueriesContext(connection) as queries:
+            response = self.upload('delivery.csv', 'ingredient,quantity,type,notes\n' + '\n'.join(rows) + '\n')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['imported'], response.data['rejected']), (6, 2))
+        self.assertEqual([error['line'] for error in response.data['errors']], [8, 9])
+        self.assertEqual(dict(Stock.objects.values_list('ingredient', 'quantity')), {
+            self.flour.pk: 17.5, self.yeast.pk: 1,
+        })
+        self.assertEqual(StockTransaction.objects.filter(user=self.user, type='in').count(), 6)
+        ledger_inserts = [q for q in queries if q['sql'].startswith('INSERT INTO "inventory_stocktransaction"')]
+        self.assertEqual(len(ledger_inserts), 1)
+
+    def test_non_finite_quantities_are_rejected(self):
+        rows = [f'{self.flour.pk},{quantity},adjustment,' for quantity in ('nan', 'inf', '-Infinity')]
+        response = self.upload('counts.csv', 'ingredient,quantity,type,notes\n' + '\n'.join(rows) + '\n')
+        self.assertEqual((response.data['imported'], response.data['rejected']), (0, 3))
+        self.assertEqual({error['error'] for error in response.data['errors']}, {'quantity must be a finite number'})
+        self.stock.refresh_from_db()
+        self.assertEqual(self.stock.quantity, 5)
+
+    def test_jsonl_import_and_command(self):
+        lines = f'{{"ingredient": {self.flour.pk}, "quantity": 2, "type": "out"}}\nnot json\n'
+        response = self.upload('counts.jsonl', lines)
+        self.assertEqual((response.data['imported'], response.data['errors']), (1, [{'line': 2, 'error': 'Not a record'}]))
+        self.assertEqual(self.upload('counts.txt', lines).status_code, 400)
+
+        path = tempfile.mktemp(suffix='.csv')
+        with open(path, 'w') as f:
+            f.write(f'ingredient,quantity,type\n{self.flour.pk},-0.5,adjustment\n')
+        call_command('import_stock', path, '--user', 'receiver', stdout=StringIO())
+        os.remove(path)
+        self.stock.refresh_from_db()
+        self.assertEqual(self.stock.quantity, 2.5)
+
+    def test_streaming_exports(self):
+        self.upload('delivery.csv', f'ingredient,quantity\n{self.flour.pk},1\n')
+        response = self.client.get('/api/inventory/stock-transactions/export/')
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'id,timestamp,ingredient,type,quantity,notes,user')
+        self.assertEqual(len(lines), 2)
+
+        response = self.client.get('/api/inventory/stocks/export/', {'file_format': 'jsonl'})
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        record = json.loads(b''.join(response.streaming_content))
+        self.assertEqual((record['ingredient_name'], record['quantity']), ('Flour', 6.0))
+
+    def test_update_keeps_ingredient_without_lookup(self):
+        response = self.client.put(f'/api/inventory/stocks/{self.stock.pk}/', {
+            'quantity': 9, 'reorder_threshold': 2,
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['ingredient'], self.flour.pk)
+
+
+class ReorderAlertTests(IndexUsageMixin, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='purchasing', password='secret')
+        cls.milk, cls.rice, cls.oil = (
+            Ingredient.objects.create(name=name, unit='l', cost_per_unit='1.00') for name in ('Milk', 'Rice', 'Oil')
+        )
+        cls.milk_stock = Stock.objects.create(ingredient=cls.milk, quantity=1, reorder_threshold=4)
+        Stock.objects.create(ingredient=cls.rice, quantity=2, reorder_threshold=3)
+        Stock.objects.create(ingredient=cls.oil, quantity=9, reorder_threshold=2)
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def test_filter_and_shortfall_ordering(self):
+        response = self.client.get('/api/inventory/stocks/', {'needs_reorder': 'true', 'ordering': '-shortfall'})
+        self.assertEqual([(s['ingredient'], s['shortfall']) for s in response.data['results']],
+                         [(self.milk.pk, 3.0), (self.rice.pk, 1.0)])
+        response = self.client.get('/api/inventory/stocks/', {'needs_reorder': 'false'})
+        self.assertEqual([s['ingredient'] for s in response.data['results']], [self.oil.pk])
+        self.assertUsesIndex(Stock.objects.needs_reorder().order_by('-shortfall'))
+
+    def test_alert_feed_reports_crossings_after_watermark(self):
+        response = self.client.get('/api/inventory/stocks/alerts/')
+        self.assertEqual([a['ingredient'] for a in response.data['alerts']], [self.milk.pk, self.rice.pk])
+        watermark = response.data['watermark']
+
+        # Oil crosses through the bulk ledger path, milk recovers through a model save
+        apply_stock_deltas([(self.oil.pk, 'out', 8, ''), (self.rice.pk, 'out', 1, '')])
+        self.milk_stock.quantity = 10
+        self.milk_stock.save()
+        response = self.client.get('/api/inventory/stocks/alerts/', {'since': watermark.isoformat()})
+        # Rice stayed below its threshold, keeps its original trigger time and repeats within the grace period
+        alerts = response.data['alerts']
+        self.assertEqual([a['ingredient'] for a in alerts], [self.rice.pk, self.oil.pk])
+        self.assertEqual(alerts[0]['triggered_at'], watermark)
+        self.assertIsNone(Stock.objects.get(ingredient=self.milk).reorder_triggered_at)
+        watermark = response.data['watermark']
+
+        # A transaction stamped before that watermark but committed after it is still reported
+        Stock.objects.filter(pk=self.milk_stock.pk).update(
+            quantity=0, reorder_triggered_at=watermark - timedelta(seconds=5),
+        )
+        response = self.client.get('/api/inventory/stocks/alerts/', {'since': watermark.isoformat()})
+        self.assertIn(self.milk.pk, [a['ingredient'] for a in response.data['alerts']])
+        self.assertEqual(response.data['watermark'], watermark)
+        with self.settings(REORDER_ALERT_GRACE_SECONDS=0):
+            response = self.client.get('/api/inventory/stocks/alerts/', {'since': watermark.isoformat()})
+            self.assertEqual(response.data['alerts'], [])
+        self.assertEqual(self.client.get('/api/inventory/stocks/alerts/', {'since': 'soon'}).status_code, 400)
+        self.assertUsesIndex(
+            Stock.objects.filter(reorder_triggered_at__gt=watermark).order_by('reorder_triggered_at', 'ingredient_id')
+        )
+
+
+class StockAdjustmentTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='counter', password='secret')
+        cls.milk, cls.rice = (
+            Ingredient.objects.create(name=name, unit='l', cost_per_unit='1.00') for name in ('Milk', 'Rice')
+        )
+        cls.milk_stock = Stock.objects.create(ingredient=cls.milk, quantity=10, reorder_threshold=1)
+        Stock.objects.create(ingredient=cls.rice, quantity=4, reorder_threshold=1)
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def test_adjust_applies_delta_and_writes_ledger(self):
+        response = self.client.post(f'/api/inventory/stocks/{self.milk_stock.pk}/adjust/', {
+            'delta': -1.5, 'notes': 'Spilled',
+        }, format='json')
+        self.assertEqual(response.data, {'ingredient': self.milk.pk, 'quantity': 8.5})
+        row = StockTransaction.objects.get()
+        self.assertEqual((row.type, row.quantity, row.notes, row.user), ('adjustment', -1.5, 'Spilled', self.user))
+        self.assertEqual(self.client.post(
+            f'/api/inventory/stocks/{self.milk_stock.pk}/adjust/', {'delta': 0}, format='json'
+        ).status_code, 400)
+
+    def test_bulk_adjust_is_all_or_nothing(self):
+        response = self.client.post('/api/inventory/stocks/bulk_adjust/', [
+            {'ingredient': self.milk.pk, 'delta': 2}, {'ingredient': self.rice.pk, 'delta': -1},
+        ], format='json')
+        self.assertEqual(response.data, [
+            {'ingredient': self.milk.pk, 'quantity': 12.0}, {'ingredient': self.rice.pk, 'quantity': 3.0},
+        ])
+        response = self.client.post('/api/inventory/stocks/bulk_adjust/', [
+            {'ingredient': self.milk.pk, 'delta': 2}, {'ingredient': 999, 'delta': 1},
+        ], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Stock.objects.get(ingredient=self.milk).quantity, 12)
+        self.assertEqual(StockTransaction.objects.count(), 2)
+
+    def test_adjust_reports_stock_deleted_mid_request(self):
+        with before_stock_update('DELETE FROM "inventory_stock" WHERE "id" = %s', [self.milk_stock.pk]):
+            response = self.client.post(
+                f'/api/inventory/stocks/{self.milk_stock.pk}/adjust/', {'delta': 1}, format='json'
+            )
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(StockTransaction.objects.exists())
+
+
+class StockAdjustmentConcurrencyTests(TestCase):
+    def test_adjustment_keeps_a_count_committed_after_it_started(self):
+        # Another till's count lands between the start of the adjustment and
+        # its write: adding in SQL keeps it, read-then-save would overwrite it
+        flour = Ingredient.objects.create(name='Flour', unit='kg', cost_per_unit='1.00')
+        stock = Stock.objects.create(ingredient=flour, quantity=100, reorder_threshold=0)
+        competing = 'UPDATE "inventory_stock" SET "quantity" = "quantity" + 10 WHERE "ingredient_id" = %s'
+        with before_stock_update(competing, [flour.pk]):
+            balances = adjust_stock([(flour.pk, -1, 'Recount')])
+        stock.refresh_from_db()
+        self.assertEqual(stock.quantity, 109)
+        self.assertEqual(balances, {flour.pk: 109})
@@ -0,0 +1,173 @@
+import csv
+import io
+import json
+import math
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from menu.models import Ingredient
+from .ledger import apply_stock_deltas
+from .models import Stock
+
+FORMATS = ('csv', 'jsonl')
+IMPORT_TYPES = ('in', 'out', 'adjustment')
+MAX_REPORTED_ERRORS = 100
+
+
+class ImportFormatError(ValueError):
+    pass
+
+
+def detect_format(filename, requested=None):
+    """The file format asked for, or the one implied by the file extension."""
+    if requested:
+        if requested not in FORMATS:
+            raise ImportFormatError(f"Unknown file_format '{requested}', expected one of {', '.join(FORMATS)}")
+        return requested
+    extension = (filename or '').rsplit('.', 1)[-1].lower()
+    if extension == 'csv':
+        return 'csv'
+    if extension in ('jsonl', 'ndjson'):
+        return 'jsonl'
+    raise ImportFormatError('Cannot tell the file format; pass file_format=csv or file_format=jsonl')
+
+
+def iter_records(stream, file_format):
+    """
+    Yield ``(line_number, record)`` from a binary stream one line at a time,
+    so files of any size are parsed in constant memory.
+    """
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if file_format == 'csv':
+        reader = csv.DictReader(text)
+        for record in reader:
+            yield reader.line_num, record
+    else:
+        for line_number, line in enumerate(text, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                record = None
+            yield line_number, record
+
+
+def _parse(record):
+    if not isinstance(record, dict):
+        raise ValueError('Not a record')
+    try:
+        ingredient_id = int(record.get('ingredient'))
+    except (TypeError, ValueError):
+        raise ValueError('ingredient must be an ingredient id')
+    try:
+        quantity = float(record.get('quantity'))
+    except (TypeError, ValueError):
+        raise ValueError('quantity must be a number')
+    if not math.isfinite(quantity):
+        raise ValueError('quantity must be a finite number')
+    type = record.get('type') or 'in'
+    if type not in IMPORT_TYPES:
+        raise ValueError(f"type must be one of {', '.join(IMPORT_TYPES)}")
+    if quantity <= 0 and type != 'adjustment':
+        raise ValueError('quantity must be positive')
+    return ingredient_id, type, quantity, record.get('notes') or ''
+
+
+def import_stock(records, user=None, chunk_size=1000):
+    """
+    Apply ``(line_number, record)`` pairs of ``ingredient``, ``quantity``,
+    optional ``type`` (default 'in') and ``notes`` in chunks. Each chunk
+    checks its ingredient ids with one query, creates missing Stock rows for
+    deliveries, and moves stock plus ledger rows through one UPDATE and one
+    bulk insert in its own transaction. Invalid lines are skipped and
+    reported. Returns ``{'imported', 'rejected', 'errors'}``.
+    """
+    imported = rejected = 0
+    errors = []
+    records = iter(records)
+    while True:
+        chunk = list(islice(records, chunk_size))
+        if not chunk:
+            break
+        entries, ingredient_ids = [], set()
+        for line_number, record in chunk:
+            try:
+                entry = _parse(record)
+            except ValueError as e:
+                rejected += 1
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    errors.append({'line': line_number, 'error': str(e)})
+                continue
+            entries.append((line_number, entry))
+            ingredient_ids.add(entry[0])
+
+        known = set(Ingredient.objects.filter(pk__in=ingredient_ids).values_list('pk', flat=True))
+        valid = []
+        for line_number, entry in entries:
+            if entry[0] in known:
+                valid.append(entry)
+            else:
+                rejected += 1
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    errors.append({'line': line_number, 'error': f'Unknown ingredient {entry[0]}'})
+
+        with transaction.atomic():
+            delivered = {ingredient_id for ingredient_id, type, _, _ in valid if type == 'in'}
+            Stock.objects.bulk_create(
+                (Stock(ingredient_id=ingredient_id, quantity=0, reorder_threshold=0) for ingredient_id in delivered),
+                ignore_conflicts=True,
+            )
+            imported += len(apply_stock_deltas(valid, user=user))
+    return {'imported': imported, 'rejected': rejected, 'errors': sorted(errors, key=lambda e: e['line'])}
+
+
+class _Echo:
+    # File-like object handing back what csv.writer writes instead of buffering it
+    def write(self, value):
+        return value
+
+
+def stream_rows(columns, rows, file_format):
+    """Encode an iterable of row tuples as CSV or JSON-lines text, one chunk per row."""
+    if file_format == 'csv':
+        writer = csv.writer(_Echo())
+        yield writer.writerow(columns)
+        for row in rows:
+            yield writer.writerow(row)
+    else:
+        for row in rows:
+            yield json.dumps(dict(zip(columns, row)), default=str) + '\n'
+
+
+async def stream_async(chunks, batch_size=500):
+    """
+    Serve a synchronous export generator from an ASGI response without first
+    collecting it into a list: batches are pulled on the sync thread that
+    owns the database connection.
+    """
+    pull = sync_to_async(lambda: ''.join(islice(chunks, batch_size)), thread_sensitive=True)
+    while True:
+        batch = await pull()
+        if not batch:
+            break
+        yield batch
+
+
+def export_rows(queryset, columns, chunk_size=2000):
+    """Rows of ``columns`` read with a server-side cursor where supported, never the whole table at once."""
+    return queryset.values_list(*columns).iterator(chunk_size=chunk_size)
+
+
+STOCK_EXPORT_COLUMNS = ('ingredient', 'ingredient__name', 'quantity', 'reorder_threshold', 'last_updated')
+LEDGER_EXPORT_COLUMNS = ('id', 'timestamp', 'ingredient', 'type', 'quantity', 'notes', 'user')
+
+
+def export_stock(queryset, file_format):
+    headers = [column.replace('__', '_') for column in STOCK_EXPORT_COLUMNS]
+    return stream_rows(headers, export_rows(queryset, STOCK_EXPORT_COLUMNS), file_format)
+
+
+def export_ledger(queryset, file_format):
+    return stream_rows(LEDGER_EXPORT_COLUMNS, export_rows(queryset, LEDGER_EXPORT_COLUMNS), file_format)
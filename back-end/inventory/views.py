@@ -1,16 +1,51 @@
 from rest_framework import viewsets, status
 from rest_framework.response import Response
+from rest_framework.decorators import action
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from menu.models import Ingredient
+from .alerts import reorder_alerts
+from .checkpoints import balances_at
+from .filters import StockFilter
+from .ledger import StockAdjustmentError, adjust_stock
+from .forecasting import reorder_suggestions
+from .transfer import (
+    ImportFormatError, detect_format, export_ledger, export_stock, import_stock, iter_records, stream_async,
+)
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters
 from .models import Stock, StockTransaction
-from .serializers import StockSerializer, StockTransactionSerializer
+from .serializers import StockAdjustmentSerializer, StockSerializer, StockTransactionSerializer
+from restaurant_management.pagination import LedgerCursorPagination
+from restaurant_management.prefetch import PrefetchPlanMixin
 
-class StockViewSet(viewsets.ModelViewSet):
+def export_response(exporter, queryset, request, name):
+    try:
+        file_format = detect_format(None, request.query_params.get('file_format', 'csv'))
+    except ImportFormatError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    content_type = 'text/csv' if file_format == 'csv' else 'application/x-ndjson'
+    chunks = exporter(queryset, file_format)
+    if isinstance(request._request, ASGIRequest):
+        # A sync iterator would be read into memory in full before an ASGI server sends it
+        chunks = stream_async(chunks)
+    response = StreamingHttpResponse(chunks, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{name}.{file_format}"'
+    return response
+
+class StockViewSet(PrefetchPlanMixin, viewsets.ModelViewSet):
     queryset = Stock.objects.all()
     serializer_class = StockSerializer
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter]
-    filterset_fields = ['ingredient']
+    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filterset_class = StockFilter
     search_fields = ['ingredient__name']
+    # Purchasing lists the worst shortages first with ?needs_reorder=true&ordering=-shortfall
+    ordering_fields = ['shortfall', 'quantity', 'last_updated']
+    
+    def get_queryset(self):
+        return super().get_queryset().with_shortfall()
     
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -19,33 +54,137 @@ class StockViewSet(viewsets.ModelViewSet):
         headers = self.get_success_headers(serializer.data)
         return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
     
-    def update(self, request, *args, **kwargs):
-        partial = kwargs.pop('partial', False)
-        instance = self.get_object()
-        
-        # Get the current ingredient ID
-        current_ingredient_id = instance.ingredient.id
-        
-        # Create a mutable copy of request data
-        data = request.data.copy()
+    @action(detail=True, methods=['post'])
+    def adjust(self, request, pk=None):
+        # Adds the signed delta to the stored quantity and writes the ledger row, instead of overwriting a stale count
+        stock = self.get_object()
+        serializer = StockAdjustmentSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        try:
+            balances = adjust_stock([(stock.ingredient_id, data['delta'], data['notes'])], user=request.user)
+        except StockAdjustmentError as e:
+            # The stock row was deleted after it was looked up
+            return Response({'error': str(e)}, status=status.HTTP_404_NOT_FOUND)
+        return Response({'ingredient': stock.ingredient_id, 'quantity': balances[stock.ingredient_id]})
+    
+    @action(detail=False, methods=['post'])
+    def bulk_adjust(self, request):
+        # A list of {ingredient, delta, notes}, applied all-or-nothing in one UPDATE
+        serializer = StockAdjustmentSerializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        if not serializer.validated_data:
+            return Response({'error': 'At least one adjustment is required'},
+                           status=status.HTTP_400_BAD_REQUEST)
+        adjustments = []
+        for data in serializer.validated_data:
+            if 'ingredient' not in data:
+                return Response({'error': 'Each adjustment needs an ingredient'},
+                               status=status.HTTP_400_BAD_REQUEST)
+            adjustments.append((data['ingredient'], data['delta'], data['notes']))
+        try:
+            balances = adjust_stock(adjustments, user=request.user)
+        except StockAdjustmentError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response([
+            {'ingredient': ingredient_id, 'quantity': quantity} for ingredient_id, quantity in sorted(balances.items())
+        ])
+    
+    @action(detail=False, methods=['get'])
+    def balance(self, request):
+        # Ledger balance at ?at= (ISO 8601, default now): latest checkpoint plus the rows since
+        at = request.query_params.get('at')
+        if at:
+            at = parse_datetime(at)
+            if at is None:
+                return Response({'error': 'at must be an ISO 8601 datetime'},
+                               status=status.HTTP_400_BAD_REQUEST)
+            if timezone.is_naive(at):
+                at = timezone.make_aware(at)
+        else:
+            at = timezone.now()
         
-        # If ingredient is not provided in the update, use the current one
-        if 'ingredient' not in data:
-            data['ingredient'] = current_ingredient_id
+        ingredients = Ingredient.objects.order_by('pk')
+        ingredient_id = request.query_params.get('ingredient')
+        if ingredient_id:
+            if not ingredient_id.isdigit():
+                return Response({'error': 'ingredient must be an id'},
+                               status=status.HTTP_400_BAD_REQUEST)
+            ingredients = ingredients.filter(pk=ingredient_id)
         
-        serializer = self.get_serializer(instance, data=data, partial=partial)
-        serializer.is_valid(raise_exception=True)
-        self.perform_update(serializer)
+        balances = balances_at(at, ingredients)
+        return Response({
+            'at': at,
+            'balances': [{'ingredient': pk, **balance} for pk, balance in balances.items()],
+        })
+    
+    @action(detail=False, methods=['get'])
+    def alerts(self, request):
+        # Ingredients that fell to their reorder threshold after ?since= (ISO 8601); poll again with the returned watermark
+        # and skip alerts (ingredient, triggered_at) already seen, which repeat within the grace period
+        since = request.query_params.get('since')
+        if since:
+            since = parse_datetime(since)
+            if since is None:
+                return Response({'error': 'since must be an ISO 8601 datetime'},
+                               status=status.HTTP_400_BAD_REQUEST)
+            if timezone.is_naive(since):
+                since = timezone.make_aware(since)
+        return Response(reorder_alerts(since))
+    
+    @action(detail=False, methods=['get'])
+    def reorder_suggestions(self, request):
+        # Forecast from ledger history; ?needs_reorder=true keeps only ingredients at or below their reorder point
+        options = {}
+        for param, option, default, minimum in (
+            ('history', 'history_days', 365, 7),
+            ('lead_time', 'lead_time', 2, 1),
+            ('cover', 'cover', 7, 0),
+            ('window', 'window', 28, 1),
+        ):
+            try:
+                options[option] = int(request.query_params.get(param, default))
+            except ValueError:
+                return Response({'error': f'{param} must be an integer'},
+                               status=status.HTTP_400_BAD_REQUEST)
+            if options[option] < minimum:
+                return Response({'error': f'{param} must be at least {minimum}'},
+                               status=status.HTTP_400_BAD_REQUEST)
         
-        if getattr(instance, '_prefetched_objects_cache', None):
-            instance._prefetched_objects_cache = {}
+        suggestions = reorder_suggestions(**options)
+        if request.query_params.get('needs_reorder') == 'true':
+            suggestions = [s for s in suggestions if s['needs_reorder']]
+        return Response(suggestions)
+    
+    @action(detail=False, methods=['post'], url_path='import')
+    def import_file(self, request):
+        # Bulk deliveries and corrections from a CSV or JSON-lines upload under "file"
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'error': 'A file upload is required'},
+                           status=status.HTTP_400_BAD_REQUEST)
+        try:
+            file_format = detect_format(upload.name, request.data.get('file_format'))
+        except ImportFormatError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         
-        return Response(serializer.data)
+        result = import_stock(iter_records(upload, file_format), user=request.user)
+        return Response(result, status=status.HTTP_200_OK if result['imported'] else status.HTTP_400_BAD_REQUEST)
+    
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        return export_response(export_stock, self.filter_queryset(self.get_queryset()), request, 'stock')
 
-class StockTransactionViewSet(viewsets.ModelViewSet):
+class StockTransactionViewSet(PrefetchPlanMixin, viewsets.ModelViewSet):
     queryset = StockTransaction.objects.all()
     serializer_class = StockTransactionSerializer
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['ingredient', 'type', 'user']
     search_fields = ['notes']
-    ordering_fields = ['timestamp']
\ No newline at end of file
+    ordering_fields = ['timestamp']
+    ordering = ('-timestamp', '-id')
+    pagination_class = LedgerCursorPagination
+    
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        return export_response(export_ledger, self.filter_queryset(self.get_queryset()), request, 'stock-transactions')
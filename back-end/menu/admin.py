@@ -18,7 +18,7 @@ class DishIngredientInline(admin.TabularInline):
 
 @admin.register(Dish)
 class DishAdmin(admin.ModelAdmin):
-    list_display = ('name', 'category', 'price', 'available', 'preparation_time')
-    list_filter = ('category', 'available')
+    list_display = ('name', 'category', 'price', 'cost', 'margin', 'available', 'in_stock', 'preparation_time')
+    list_filter = ('category', 'available', 'in_stock')
     search_fields = ('name', 'description')
     inlines = [DishIngredientInline]
\ No newline at end of file
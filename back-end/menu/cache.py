@@ -0,0 +1,77 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework import status
+from rest_framework.response import Response
+
+MENU_VERSION_KEY = 'menu:version'
+
+
+def menu_cache():
+    return caches[getattr(settings, 'MENU_CACHE_ALIAS', 'default')]
+
+
+def get_menu_version():
+    cache = menu_cache()
+    version = cache.get(MENU_VERSION_KEY)
+    if version is None:
+        cache.add(MENU_VERSION_KEY, 1, timeout=None)
+        version = cache.get(MENU_VERSION_KEY, 1)
+    return version
+
+
+def bump_menu_version():
+    """Invalidate every cached menu response once the current transaction commits."""
+    def bump():
+        cache = menu_cache()
+        try:
+            cache.incr(MENU_VERSION_KEY)
+        except ValueError:
+            cache.add(MENU_VERSION_KEY, 1, timeout=None)
+            cache.incr(MENU_VERSION_KEY)
+    transaction.on_commit(bump)
+
+
+class MenuCacheMixin:
+    """
+    Cache list and retrieve responses under the current menu version.
+
+    Any menu write bumps the version, so cached bodies never need explicit
+    invalidation. Responses carry a strong ETag derived from the version and
+    the request, and a matching ``If-None-Match`` gets a bodiless 304 without
+    touching the database.
+    """
+
+    def list(self, request, *args, **kwargs):
+        return self._cached_response(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._cached_response(request, super().retrieve, *args, **kwargs)
+
+    def _cached_response(self, request, handler, *args, **kwargs):
+        version = get_menu_version()
+        variant = '|'.join([
+            request.get_host(), request.get_full_path(), request.accepted_media_type or '',
+        ])
+        digest = hashlib.sha256(f'{version}|{variant}'.encode()).hexdigest()
+        etag = f'"{digest[:32]}"'
+        headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+
+        if_none_match = request.headers.get('If-None-Match', '')
+        if etag in [tag.strip() for tag in if_none_match.split(',')] or if_none_match.strip() == '*':
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        cache = menu_cache()
+        cache_key = f'menu:response:{digest}'
+        data = cache.get(cache_key)
+        if data is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            cache.set(cache_key, response.data, getattr(settings, 'MENU_CACHE_TIMEOUT', 3600))
+            for name, value in headers.items():
+                response[name] = value
+            return response
+        return Response(data, headers=headers)
@@ -0,0 +1,31 @@
+from django.db import models
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.db.models.functions import Cast, Coalesce, Round
+from .models import Dish, DishIngredient
+
+
+def dish_cost_expression():
+    """Correlated subquery summing quantity x ingredient unit cost for the outer dish."""
+    line_cost = Cast('quantity', models.DecimalField(max_digits=14, decimal_places=4)) * F('ingredient__cost_per_unit')
+    total = DishIngredient.objects.filter(dish=OuterRef('pk')).order_by().values('dish').annotate(
+        total=Sum(line_cost, output_field=models.DecimalField())
+    ).values('total')
+    return Round(Coalesce(Subquery(total), 0, output_field=models.DecimalField()), 2)
+
+
+def refresh_dish_costs(dishes):
+    """Recompute stored cost and margin for a Dish queryset in one UPDATE."""
+    cost = dish_cost_expression()
+    return dishes.update(cost=cost, margin=F('price') - cost)
+
+
+def refresh_dish_margins(dishes):
+    """Recompute stored margin from the stored price and cost for a Dish queryset in one UPDATE."""
+    return dishes.update(margin=F('price') - F('cost'))
+
+
+def dishes_using(ingredient_ids):
+    """Dishes whose recipe uses any of ``ingredient_ids``, via the ingredient index on DishIngredient."""
+    return Dish.objects.filter(
+        pk__in=DishIngredient.objects.filter(ingredient_id__in=ingredient_ids).values('dish_id')
+    )
@@ -0,0 +1,64 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from menu.models import Category, Dish
+from menu.search import IContainsSearchBackend, get_search_backend
+
+WORDS = (
+    'grilled', 'smoked', 'roasted', 'crispy', 'spicy', 'chicken', 'beef', 'lamb', 'salmon', 'tofu',
+    'mushroom', 'truffle', 'garlic', 'lemon', 'basil', 'risotto', 'noodles', 'curry', 'burger', 'salad',
+    'soup', 'tart', 'pie', 'taco', 'dumplings', 'chili', 'ginger', 'sesame', 'coconut', 'mango',
+)
+COURSES = ('Starters', 'Mains', 'Desserts', 'Drinks', 'Specials')
+QUERIES = ('chicken', 'spicy curry', 'truffle risotto', 'mango', 'grilled salmon lemon', 'dumpl')
+
+
+class Command(BaseCommand):
+    help = 'Time ranked menu search against an unindexed icontains scan on a generated catalog (rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dishes', type=int, default=50000)
+        parser.add_argument('--branches', type=int, default=10,
+                            help='Branches sharing the catalog, each with its own set of categories')
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        # Long-tail vocabulary so common dish words stay selective, as on a real menu
+        filler = [''.join(rng.choices('abcdefghijklmnopqrstuvwxyz', k=rng.randint(4, 9))) for _ in range(5000)]
+        with transaction.atomic():
+            categories = Category.objects.bulk_create([
+                Category(name=f'Branch {branch} {course}', description=f'{course} served at branch {branch}')
+                for branch in range(1, options['branches'] + 1) for course in COURSES
+            ])
+            Dish.objects.bulk_create(
+                (Dish(
+                    name=' '.join(rng.sample(WORDS, 2) + rng.choices(filler, k=1)).title(),
+                    description=' '.join(rng.sample(WORDS, 2) + rng.choices(filler, k=10)),
+                    price=rng.randint(300, 4000) / 100,
+                    category=rng.choice(categories),
+                    preparation_time=rng.randint(2, 40),
+                ) for _ in range(options['dishes'])),
+                batch_size=2000,
+            )
+            self.stdout.write(f"Seeded {options['dishes']} dishes across {len(categories)} categories")
+
+            backends = {'icontains': IContainsSearchBackend(), 'indexed': get_search_backend()}
+            for query in QUERIES + (filler[0],):
+                line = [f'{query!r:>24}']
+                for label, backend in backends.items():
+                    samples = []
+                    for _ in range(options['repeat']):
+                        started = time.perf_counter()
+                        # What a paginated list response does: count, then fetch the first page
+                        results = backend.search(Dish.objects.all(), query)
+                        results.count()
+                        list(results.values_list('id', flat=True)[:20])
+                        samples.append(time.perf_counter() - started)
+                    samples.sort()
+                    line.append(f'{label} median {samples[len(samples) // 2] * 1e3:8.2f} ms')
+                self.stdout.write('  '.join(line))
+            transaction.set_rollback(True)
@@ -0,0 +1,41 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from menu.models import Category, Dish
+from restaurant_management.images import generate_variants
+
+
+class Command(BaseCommand):
+    help = 'Render missing image variants for existing dish, category and profile images in parallel'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4,
+                            help='Images rendered concurrently (Pillow releases the GIL while resizing)')
+        parser.add_argument('--overwrite', action='store_true',
+                            help='Re-render variants that already exist')
+
+    def handle(self, *args, **options):
+        sources = ((Dish, 'image'), (Category, 'image'), (get_user_model(), 'profile_image'))
+        files = {}
+        for model, field_name in sources:
+            for name in model.objects.exclude(**{field_name: ''}).exclude(
+                **{f'{field_name}__isnull': True}
+            ).values_list(field_name, flat=True).iterator():
+                files[name] = model._meta.get_field(field_name).storage
+        self.stdout.write(f'{len(files)} image(s) to check')
+
+        written = failed = 0
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            futures = {
+                pool.submit(generate_variants, name, storage, options['overwrite']): name
+                for name, storage in files.items()
+            }
+            for future in as_completed(futures):
+                try:
+                    written += len(future.result())
+                except Exception as e:
+                    failed += 1
+                    self.stderr.write(f'{futures[future]}: {e}')
+
+        self.stdout.write(self.style.SUCCESS(f'Wrote {written} variant(s); {failed} image(s) failed'))
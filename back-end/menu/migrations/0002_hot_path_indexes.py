@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-18 17:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='dish',
+            index=models.Index(fields=['category', 'available'], name='dish_category_available_idx'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.6 on 2026-10-18 17:07
+
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.db.models.functions import Cast, Coalesce, Round
+
+
+def backfill_dish_costs(apps, schema_editor):
+    Dish = apps.get_model('menu', 'Dish')
+    DishIngredient = apps.get_model('menu', 'DishIngredient')
+    line_cost = Cast('quantity', models.DecimalField(max_digits=14, decimal_places=4)) * F('ingredient__cost_per_unit')
+    total = DishIngredient.objects.filter(dish=OuterRef('pk')).order_by().values('dish').annotate(
+        total=Sum(line_cost, output_field=models.DecimalField())
+    ).values('total')
+    cost = Round(Coalesce(Subquery(total), 0, output_field=models.DecimalField()), 2)
+    Dish.objects.update(cost=cost, margin=F('price') - cost)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0002_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dish',
+            name='cost',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='dish',
+            name='margin',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=10),
+        ),
+        migrations.RunPython(backfill_dish_costs, migrations.RunPython.noop),
+    ]
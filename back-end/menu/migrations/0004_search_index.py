@@ -0,0 +1,92 @@
+from django.db import migrations
+
+# The DDL is inlined rather than generated by menu.search so this migration
+# keeps producing the same schema whatever the live search code becomes.
+
+
+def fts5_sql(table, columns):
+    fts = f'{table}_fts'
+    column_list = ', '.join(columns)
+    new_values = ', '.join(f'new.{column}' for column in columns)
+    old_values = ', '.join(f'old.{column}' for column in columns)
+    return [
+        f"CREATE VIRTUAL TABLE {fts} USING fts5({column_list}, content='{table}', content_rowid='id', "
+        f"tokenize='unicode61 remove_diacritics 2')",
+        f"CREATE TRIGGER {fts}_ai AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {fts}(rowid, {column_list}) VALUES (new.id, {new_values}); END",
+        f"CREATE TRIGGER {fts}_ad AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {column_list}) VALUES ('delete', old.id, {old_values}); END",
+        f"CREATE TRIGGER {fts}_au AFTER UPDATE OF {column_list} ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {column_list}) VALUES ('delete', old.id, {old_values}); "
+        f"INSERT INTO {fts}(rowid, {column_list}) VALUES (new.id, {new_values}); END",
+        f"INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+    ]
+
+
+def drop_fts5_sql(table):
+    fts = f'{table}_fts'
+    return [f'DROP TRIGGER IF EXISTS {fts}_{suffix}' for suffix in ('ai', 'ad', 'au')] + [
+        f'DROP TABLE IF EXISTS {fts}'
+    ]
+
+
+def tsvector_sql(table, columns):
+    # Same expression as PostgresSearchBackend.vector() compiles to, so the planner matches it
+    name, description = columns
+    return [
+        'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+        f"CREATE INDEX {table}_search_idx ON {table} USING gin (("
+        f"setweight(to_tsvector('english'::regconfig, COALESCE(({name})::text, '')), 'A') || "
+        f"setweight(to_tsvector('english'::regconfig, COALESCE(({description})::text, '')), 'B')))",
+        f'CREATE INDEX {table}_trgm_idx ON {table} USING gin ({name} gin_trgm_ops)',
+    ]
+
+
+def drop_tsvector_sql(table):
+    return [f'DROP INDEX IF EXISTS {table}_search_idx', f'DROP INDEX IF EXISTS {table}_trgm_idx']
+
+
+SEARCH_TABLES = {
+    'menu_dish': ('name', 'description'),
+    'menu_category': ('name', 'description'),
+}
+
+
+class VendorRunSQL(migrations.RunSQL):
+    """RunSQL applied only on one database vendor."""
+
+    def __init__(self, vendor, *args, **kwargs):
+        self.vendor = vendor
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, args, kwargs = super().deconstruct()
+        return name, [self.vendor, *args], kwargs
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == self.vendor:
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == self.vendor:
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0003_dish_cost_margin'),
+    ]
+
+    operations = [
+        VendorRunSQL(
+            'sqlite',
+            [statement for table, columns in SEARCH_TABLES.items() for statement in fts5_sql(table, columns)],
+            [statement for table in SEARCH_TABLES for statement in drop_fts5_sql(table)],
+        ),
+        VendorRunSQL(
+            'postgresql',
+            [statement for table, columns in SEARCH_TABLES.items() for statement in tsvector_sql(table, columns)],
+            [statement for table in SEARCH_TABLES for statement in drop_tsvector_sql(table)],
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.6 on 2026-10-18 17:16
+
+from django.db import migrations, models
+from django.db.models import Exists, F, OuterRef
+
+
+def backfill_in_stock(apps, schema_editor):
+    Dish = apps.get_model('menu', 'Dish')
+    DishIngredient = apps.get_model('menu', 'DishIngredient')
+    short = DishIngredient.objects.filter(dish=OuterRef('pk'), ingredient__stock__quantity__lt=F('quantity'))
+    Dish.objects.update(in_stock=~Exists(short))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0004_search_index'),
+        ('inventory', '0003_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='dish',
+            name='dish_category_available_idx',
+        ),
+        migrations.AddField(
+            model_name='dish',
+            name='in_stock',
+            field=models.BooleanField(default=True, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='dish',
+            index=models.Index(fields=['category', 'available', 'in_stock'], name='dish_category_sellable_idx'),
+        ),
+        migrations.RunPython(backfill_in_stock, migrations.RunPython.noop),
+    ]
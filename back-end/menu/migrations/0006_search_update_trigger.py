@@ -0,0 +1,44 @@
+from django.db import migrations
+
+# Re-create the FTS update triggers so they fire only when a searchable column
+# changes, not on every cost, margin or in_stock refresh of the row.
+
+SEARCH_TABLES = {
+    'menu_dish': ('name', 'description'),
+    'menu_category': ('name', 'description'),
+}
+
+
+def update_trigger_sql(table, columns, watched):
+    fts = f'{table}_fts'
+    column_list = ', '.join(columns)
+    new_values = ', '.join(f'new.{column}' for column in columns)
+    old_values = ', '.join(f'old.{column}' for column in columns)
+    return [
+        f'DROP TRIGGER IF EXISTS {fts}_au',
+        f"CREATE TRIGGER {fts}_au AFTER UPDATE{watched} ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {column_list}) VALUES ('delete', old.id, {old_values}); "
+        f"INSERT INTO {fts}(rowid, {column_list}) VALUES (new.id, {new_values}); END",
+    ]
+
+
+def replace_update_triggers(watch_columns):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for table, columns in SEARCH_TABLES.items():
+            watched = f" OF {', '.join(columns)}" if watch_columns else ''
+            for statement in update_trigger_sql(table, columns, watched):
+                schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0005_dish_in_stock'),
+    ]
+
+    operations = [
+        migrations.RunPython(replace_update_triggers(True), replace_update_triggers(False)),
+    ]
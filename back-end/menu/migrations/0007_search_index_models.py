@@ -0,0 +1,34 @@
+# Generated by Django 5.2.6 on 2026-10-18 18:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0006_search_update_trigger'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategorySearchIndex',
+            fields=[
+                ('category', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_index', serialize=False, to='menu.category')),
+            ],
+            options={
+                'db_table': 'menu_category_fts',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='DishSearchIndex',
+            fields=[
+                ('dish', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_index', serialize=False, to='menu.dish')),
+            ],
+            options={
+                'db_table': 'menu_dish_fts',
+                'managed': False,
+            },
+        ),
+    ]
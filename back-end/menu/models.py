@@ -26,9 +26,30 @@ class Dish(models.Model):
     available = models.BooleanField(default=True)
     preparation_time = models.PositiveIntegerField(help_text="in minutes")
     calories = models.PositiveIntegerField(blank=True, null=True)
+    # Plate cost from the recipe and price minus cost, maintained by menu.costing
+    cost = models.DecimalField(max_digits=10, decimal_places=2, default=0, editable=False)
+    margin = models.DecimalField(max_digits=10, decimal_places=2, default=0, editable=False)
+    # Whether stock covers one portion of every tracked recipe ingredient, maintained by inventory.availability
+    in_stock = models.BooleanField(default=True, editable=False)
+    
+    # Written only by UPDATEs in SQL; saves from an instance loaded earlier must not overwrite them
+    DERIVED_FIELDS = ('cost', 'margin', 'in_stock')
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['category', 'available', 'in_stock'], name='dish_category_sellable_idx'),
+        ]
     
     def __str__(self):
         return self.name
+    
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            update_fields = kwargs.get('update_fields')
+            if update_fields is None:
+                update_fields = [field.name for field in self._meta.concrete_fields if not field.primary_key]
+            kwargs['update_fields'] = [name for name in update_fields if name not in self.DERIVED_FIELDS]
+        super().save(*args, **kwargs)
 
 class DishIngredient(models.Model):
     dish = models.ForeignKey(Dish, on_delete=models.CASCADE)
@@ -36,4 +57,26 @@ class DishIngredient(models.Model):
     quantity = models.FloatField()
     
     class Meta:
-        unique_together = ('dish', 'ingredient')
\ No newline at end of file
+        unique_together = ('dish', 'ingredient')
+
+class CategorySearchIndex(models.Model):
+    """Row of the SQLite FTS5 index over categories (migration 0004); joined by menu.search."""
+    category = models.OneToOneField(
+        Category, primary_key=True, db_column='rowid', db_constraint=False,
+        on_delete=models.DO_NOTHING, related_name='search_index',
+    )
+    
+    class Meta:
+        managed = False
+        db_table = 'menu_category_fts'
+
+class DishSearchIndex(models.Model):
+    """Row of the SQLite FTS5 index over dishes (migration 0004); joined by menu.search."""
+    dish = models.OneToOneField(
+        Dish, primary_key=True, db_column='rowid', db_constraint=False,
+        on_delete=models.DO_NOTHING, related_name='search_index',
+    )
+    
+    class Meta:
+        managed = False
+        db_table = 'menu_dish_fts'
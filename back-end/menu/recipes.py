@@ -0,0 +1,88 @@
+import re
+
+from django.db import transaction
+from .cache import bump_menu_version
+from .models import DishIngredient, Ingredient
+from .signals import recipe_changed, recipe_sync
+
+# Multipart form key for one recipe line field, e.g. ingredients[0].quantity
+INGREDIENT_FIELD = re.compile(r'ingredients\[(\d+)\]\.(.+)')
+
+
+class RecipeError(ValueError):
+    pass
+
+
+def parse_recipe(data):
+    """
+    Extract recipe lines from request data as ``{ingredient_id: quantity}``.
+
+    Accepts a JSON list under ``ingredients`` or the bracketed multipart
+    fields (``ingredients[0].ingredient``, ``ingredients[0].quantity``).
+    Returns None when the request does not touch the recipe. Lines missing
+    an ingredient or quantity are skipped; a repeated ingredient keeps its
+    last quantity.
+    """
+    raw = data.get('ingredients')
+    if isinstance(raw, list):
+        lines = raw
+    else:
+        indexed = {}
+        for key, value in data.items():
+            match = INGREDIENT_FIELD.match(key)
+            if match:
+                indexed.setdefault(int(match.group(1)), {})[match.group(2)] = value
+        if not indexed:
+            return None
+        lines = [indexed[index] for index in sorted(indexed)]
+
+    recipe = {}
+    for line in lines:
+        if not isinstance(line, dict):
+            raise RecipeError('Each ingredient line must be an object')
+        ingredient_id, quantity = line.get('ingredient'), line.get('quantity')
+        if not ingredient_id or not quantity:
+            continue
+        try:
+            recipe[int(ingredient_id)] = float(quantity)
+        except (TypeError, ValueError):
+            raise RecipeError(f'Invalid ingredient line: {line}')
+    return recipe
+
+
+def sync_recipe(dish, recipe):
+    """
+    Make the dish's DishIngredient rows match ``recipe`` with at most one
+    bulk insert, one bulk update and one delete, leaving unchanged rows alone.
+    Returns ``(created, updated, deleted)`` counts.
+    """
+    known = set(Ingredient.objects.filter(pk__in=recipe).values_list('pk', flat=True))
+    missing = sorted(set(recipe) - known)
+    if missing:
+        raise RecipeError(f'Unknown ingredient ids: {missing}')
+
+    with transaction.atomic():
+        existing = {line.ingredient_id: line for line in DishIngredient.objects.filter(dish=dish)}
+        to_create = [
+            DishIngredient(dish=dish, ingredient_id=ingredient_id, quantity=quantity)
+            for ingredient_id, quantity in recipe.items() if ingredient_id not in existing
+        ]
+        to_update = []
+        for ingredient_id, line in existing.items():
+            if ingredient_id in recipe and line.quantity != recipe[ingredient_id]:
+                line.quantity = recipe[ingredient_id]
+                to_update.append(line)
+        to_delete = [line.pk for ingredient_id, line in existing.items() if ingredient_id not in recipe]
+
+        if to_create:
+            DishIngredient.objects.bulk_create(to_create)
+        if to_update:
+            DishIngredient.objects.bulk_update(to_update, ['quantity'])
+        if to_delete:
+            with recipe_sync():
+                DishIngredient.objects.filter(pk__in=to_delete).delete()
+
+        if to_create or to_update or to_delete:
+            recipe_changed.send(sender=DishIngredient, dish_ids=[dish.pk])
+            bump_menu_version()
+    return len(to_create), len(to_update), len(to_delete)
@@ -0,0 +1,159 @@
+import re
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramSimilarity
+from django.db import connections
+from django.db.models import BooleanField, FloatField, Q
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+from rest_framework import filters
+
+# Searchable columns per table, most significant first
+SEARCH_FIELDS = {
+    'menu_dish': ('name', 'description'),
+    'menu_category': ('name', 'description'),
+}
+
+TOKEN = re.compile(r'\w+', re.UNICODE)
+
+
+class IContainsSearchBackend:
+    """Unindexed fallback matching every term anywhere in the searchable fields."""
+
+    def search(self, queryset, term):
+        fields = SEARCH_FIELDS[queryset.model._meta.db_table]
+        for token in TOKEN.findall(term):
+            queryset = queryset.filter(
+                Q(**{f'{fields[0]}__icontains': token}) | Q(**{f'{fields[1]}__icontains': token})
+            )
+        return queryset
+
+
+class SQLiteFTSSearchBackend:
+    """
+    SQLite FTS5 external-content index (``<table>_fts``) kept in sync by
+    triggers and joined through the model's ``search_index`` relation; results
+    are ordered by bm25 with the name weighted above the description. Every
+    term must match, as a prefix.
+    """
+    weights = (10.0, 1.0)
+
+    @staticmethod
+    def fts_table(table):
+        return f'{table}_fts'
+
+    @staticmethod
+    def match_expression(term):
+        return ' '.join(f'"{token}"*' for token in TOKEN.findall(term))
+
+    def search(self, queryset, term):
+        match = self.match_expression(term)
+        if not match:
+            return queryset.none()
+        table = queryset.model._meta.db_table
+        fts = self.fts_table(table)
+        weights = ', '.join(str(weight) for weight in self.weights)
+        # Join the index so the match and bm25 are evaluated once per query, not per row
+        return queryset.filter(search_index__isnull=False).filter(
+            RawSQL(f'{fts} MATCH %s', [match], output_field=BooleanField())
+        ).annotate(
+            search_rank=RawSQL(f'-bm25({fts}, {weights})', [], output_field=FloatField())
+        ).order_by('-search_rank', 'pk')
+
+    def install(self, connection, table):
+        """
+        Create the index table and its sync triggers where missing, rebuilding
+        the index if anything had to be created. Safe to repeat: migrations
+        that rebuild ``table`` on SQLite drop its triggers, so this also runs
+        after every migrate.
+        """
+        fts = self.fts_table(table)
+        columns = ', '.join(SEARCH_FIELDS[table])
+        new_values = ', '.join(f'new.{column}' for column in SEARCH_FIELDS[table])
+        old_values = ', '.join(f'old.{column}' for column in SEARCH_FIELDS[table])
+        statements = {
+            fts: f"CREATE VIRTUAL TABLE {fts} USING fts5({columns}, content='{table}', content_rowid='id', "
+                 f"tokenize='unicode61 remove_diacritics 2')",
+            f'{fts}_ai': f"CREATE TRIGGER {fts}_ai AFTER INSERT ON {table} BEGIN "
+                         f"INSERT INTO {fts}(rowid, {columns}) VALUES (new.id, {new_values}); END",
+            f'{fts}_ad': f"CREATE TRIGGER {fts}_ad AFTER DELETE ON {table} BEGIN "
+                         f"INSERT INTO {fts}({fts}, rowid, {columns}) VALUES ('delete', old.id, {old_values}); END",
+            f'{fts}_au': f"CREATE TRIGGER {fts}_au AFTER UPDATE OF {columns} ON {table} BEGIN "
+                         f"INSERT INTO {fts}({fts}, rowid, {columns}) VALUES ('delete', old.id, {old_values}); "
+                         f"INSERT INTO {fts}(rowid, {columns}) VALUES (new.id, {new_values}); END",
+        }
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE name IN (%s)" % ', '.join(['%s'] * len(statements)),
+                list(statements),
+            )
+            existing = {name for name, in cursor.fetchall()}
+            missing = [statement for name, statement in statements.items() if name not in existing]
+            for statement in missing:
+                cursor.execute(statement)
+            if missing:
+                cursor.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+        return bool(missing)
+
+
+class PostgresSearchBackend:
+    """
+    Weighted tsvector match served by a GIN expression index, OR a substring
+    match on the name served by a pg_trgm index; ranked by ts_rank plus
+    trigram similarity of the name.
+    """
+    config = 'english'
+
+    def vector(self, fields):
+        return (
+            SearchVector(fields[0], weight='A', config=self.config)
+            + SearchVector(fields[1], weight='B', config=self.config)
+        )
+
+    def search(self, queryset, term):
+        fields = SEARCH_FIELDS[queryset.model._meta.db_table]
+        query = SearchQuery(term, search_type='websearch', config=self.config)
+        vector = self.vector(fields)
+        return queryset.annotate(search_vector=vector).filter(
+            Q(search_vector=query) | Q(**{f'{fields[0]}__icontains': term})
+        ).annotate(
+            search_rank=SearchRank(vector, query) + TrigramSimilarity(fields[0], term)
+        ).order_by('-search_rank', 'pk')
+
+
+def restore_search_index(sender, using='default', **kwargs):
+    """
+    post_migrate hook: re-create FTS sync triggers that a migration dropped
+    by rebuilding an indexed table on SQLite (e.g. AddField).
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    tables = set(connection.introspection.table_names())
+    backend = SQLiteFTSSearchBackend()
+    for table in SEARCH_FIELDS:
+        if backend.fts_table(table) in tables:
+            backend.install(connection, table)
+
+
+def get_search_backend(using='default'):
+    """The configured ``MENU_SEARCH_BACKEND``, or the indexed backend for the database vendor."""
+    path = getattr(settings, 'MENU_SEARCH_BACKEND', None)
+    if path:
+        return import_string(path)()
+    vendor = connections[using].vendor
+    if vendor == 'sqlite':
+        return SQLiteFTSSearchBackend()
+    if vendor == 'postgresql':
+        return PostgresSearchBackend()
+    return IContainsSearchBackend()
+
+
+class RankedSearchFilter(filters.SearchFilter):
+    """``?search=`` through the menu search backend, ordered by relevance."""
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms:
+            return queryset
+        return get_search_backend(queryset.db).search(queryset, ' '.join(terms))
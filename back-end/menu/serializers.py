@@ -1,34 +1,43 @@
 from rest_framework import serializers
+from restaurant_management.images import ImageVariantsField
+from restaurant_management.serializers import FlexFieldsMixin
 from .models import Category, Dish, Ingredient, DishIngredient
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(FlexFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Ingredient
         fields = '__all__'
 
-class DishIngredientSerializer(serializers.ModelSerializer):
-    ingredient = IngredientSerializer(read_only=True)
-    
+class DishIngredientSerializer(FlexFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = DishIngredient
         fields = ('ingredient', 'quantity')
+        read_only_fields = ('ingredient',)
+        expandable_fields = {
+            'ingredient': (IngredientSerializer, {}),
+        }
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(FlexFieldsMixin, serializers.ModelSerializer):
+    image_variants = ImageVariantsField(source='image')
+    
     class Meta:
         model = Category
         fields = '__all__'
 
-class DishSerializer(serializers.ModelSerializer):
-    category = CategorySerializer(read_only=True)
-    ingredients = DishIngredientSerializer(source='dishingredient_set', many=True, read_only=True)
-    
+class DishSerializer(FlexFieldsMixin, serializers.ModelSerializer):
     # Add write-only fields for updating
     category_id = serializers.IntegerField(write_only=True, required=False)
+    image_variants = ImageVariantsField(source='image')
     
     class Meta:
         model = Dish
         fields = '__all__'
-        read_only_fields = ('id', 'created_at', 'updated_at')
+        read_only_fields = ('id', 'created_at', 'updated_at', 'category', 'ingredients')
+        # Relations render as ids unless requested through ?expand=
+        expandable_fields = {
+            'category': (CategorySerializer, {}),
+            'ingredients': (DishIngredientSerializer, {'source': 'dishingredient_set', 'many': True}),
+        }
     
     def update(self, instance, validated_data):
         # Extract category_id if provided
@@ -42,4 +51,4 @@ class DishSerializer(serializers.ModelSerializer):
             instance.category_id = category_id
             instance.save()
         
-        return instance
\ No newline at end of file
+        return instance
@@ -0,0 +1,75 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import Signal, receiver
+from restaurant_management.images import track_image_field
+from .cache import bump_menu_version
+from .costing import dishes_using, refresh_dish_costs, refresh_dish_margins
+from .models import Category, Dish, DishIngredient, Ingredient
+
+# Sent with ``dish_ids`` whenever recipe lines are added, changed or removed,
+# including bulk recipe edits that bypass model signals
+recipe_changed = Signal()
+
+# Set while sync_recipe rewrites a dish's lines; it announces the whole edit once
+_syncing_recipe = ContextVar('syncing_recipe', default=False)
+
+@contextmanager
+def recipe_sync():
+    """Suppress the per-line recipe receivers for a bulk edit that signals itself."""
+    token = _syncing_recipe.set(True)
+    try:
+        yield
+    finally:
+        _syncing_recipe.reset(token)
+
+track_image_field(Category, 'image')
+track_image_field(Dish, 'image')
+
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Dish)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_save, sender=DishIngredient)
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Dish)
+@receiver(post_delete, sender=Ingredient)
+@receiver(post_delete, sender=DishIngredient)
+def invalidate_menu_cache(sender, **kwargs):
+    if sender is DishIngredient and _syncing_recipe.get():
+        return
+    bump_menu_version()
+
+@receiver(post_save, sender=DishIngredient)
+@receiver(post_delete, sender=DishIngredient)
+def announce_recipe_change(sender, instance=None, **kwargs):
+    if _syncing_recipe.get():
+        return
+    recipe_changed.send(sender=DishIngredient, dish_ids=[instance.dish_id])
+
+@receiver(recipe_changed)
+def refresh_recipe_costs(sender, dish_ids=(), **kwargs):
+    refresh_dish_costs(Dish.objects.filter(pk__in=dish_ids))
+
+@receiver(post_init, sender=Ingredient)
+def remember_loaded_cost(sender, instance=None, **kwargs):
+    instance._loaded_cost = instance.__dict__.get('cost_per_unit')
+
+@receiver(post_save, sender=Ingredient)
+def refresh_costs_for_ingredient(sender, instance=None, created=False, **kwargs):
+    if not created and instance.cost_per_unit != instance._loaded_cost:
+        refresh_dish_costs(dishes_using([instance.pk]))
+    instance._loaded_cost = instance.cost_per_unit
+
+@receiver(post_init, sender=Dish)
+def remember_loaded_price(sender, instance=None, **kwargs):
+    instance._loaded_price = instance.__dict__.get('price')
+
+@receiver(post_save, sender=Dish)
+def refresh_margin_for_dish(sender, instance=None, created=False, **kwargs):
+    # The stored cost may be newer than this instance's, so the margin is derived in SQL and read back
+    if created or instance.price != instance._loaded_price:
+        dish = Dish.objects.filter(pk=instance.pk)
+        refresh_dish_margins(dish)
+        instance.cost, instance.margin = dish.values_list('cost', 'margin').get()
+    instance._loaded_price = instance.price
@@ -1,3 +1,309 @@
-from django.test import TestCase
+import shutil
+import tempfile
+from decimal import Decimal
+from io import BytesIO
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+from rest_framework.test import APITestCase
+
+from restaurant_management.images import variant_name
+from restaurant_management.media import serve_media
+from restaurant_management.testing import IndexUsageMixin
+from .models import Category, Dish, DishIngredient, Ingredient
+
+User = get_user_model()
+
+
+class DishIndexTests(IndexUsageMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        categories = Category.objects.bulk_create(Category(name=f'Category {n}') for n in range(10))
+        Dish.objects.bulk_create(
+            Dish(
+                name=f'Dish {n}', description='', price='10.00', category=categories[n % 10],
+                available=n % 7 != 0, preparation_time=10,
+            )
+            for n in range(2000)
+        )
+        cls.category = categories[0]
+
+    def test_dish_filter_paths(self):
+        self.assertUsesIndex(Dish.objects.filter(category=self.category, available=True))
+        self.assertUsesIndex(Dish.objects.filter(category=self.category))
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class MenuCacheTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='pos', password='secret')
+        cls.category = Category.objects.create(name='Starters')
+        cls.dish = Dish.objects.create(
+            name='Soup', description='', price='6.00', category=cls.category, preparation_time=5,
+        )
+
+    def setUp(self):
+        caches['default'].clear()
+        self.client.force_authenticate(self.user)
+
+    def test_cached_reads_and_conditional_requests(self):
+        first = self.client.get('/api/menu/dishes/')
+        etag = first['ETag']
+        with self.assertNumQueries(0):
+            cached = self.client.get('/api/menu/dishes/')
+        self.assertEqual(cached.data, first.data)
+        with self.assertNumQueries(0):
+            not_modified = self.client.get('/api/menu/dishes/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified.content, b'')
+
+    def test_menu_writes_bump_the_version(self):
+        etag = self.client.get('/api/menu/dishes/')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            Ingredient.objects.create(name='Leek', unit='kg', cost_per_unit='2.00')
+        response = self.client.get('/api/menu/dishes/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+class DishCostTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Mains')
+        cls.rice = Ingredient.objects.create(name='Rice', unit='kg', cost_per_unit='2.00')
+        cls.stock = Ingredient.objects.create(name='Stock', unit='l', cost_per_unit='1.50')
+        cls.risotto = Dish.objects.create(
+            name='Risotto', description='', price='14.00', category=category, preparation_time=20,
+        )
+        cls.salad = Dish.objects.create(
+            name='Salad', description='', price='8.00', category=category, preparation_time=5,
+        )
+        DishIngredient.objects.create(dish=cls.risotto, ingredient=cls.rice, quantity=0.25)
+        DishIngredient.objects.create(dish=cls.risotto, ingredient=cls.stock, quantity=0.5)
+
+    def assertCost(self, dish, cost, margin):
+        dish.refresh_from_db()
+        self.assertEqual((dish.cost, dish.margin), (Decimal(cost), Decimal(margin)))
+
+    def test_recipe_lines_maintain_cost(self):
+        self.assertCost(self.risotto, '1.25', '12.75')
+        self.assertCost(self.salad, '0.00', '8.00')
+
+    def test_ingredient_price_change_only_touches_its_dishes(self):
+        self.rice.cost_per_unit = Decimal('4.00')
+        with CaptureQueriesContext(connection) as queries:
+            self.rice.save()
+        self.assertEqual(len(queries), 2)
+        self.assertCost(self.risotto, '1.75', '12.25')
+
+    def test_price_change_updates_margin(self):
+        self.risotto.refresh_from_db()
+        self.risotto.price = Decimal('15.00')
+        self.risotto.save()
+        self.assertEqual(self.risotto.margin, Decimal('13.75'))
+        self.assertCost(self.risotto, '1.25', '13.75')
+
+    def test_stale_instance_save_keeps_derived_fields(self):
+        dish = Dish.objects.get(pk=self.salad.pk)
+        DishIngredient.objects.create(dish=self.salad, ingredient=self.rice, quantity=1)
+        dish.name = 'Rice Salad'
+        dish.save()
+        self.assertCost(dish, '2.00', '6.00')
+        self.assertEqual(dish.name, 'Rice Salad')
+
+
+class RecipeSyncTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='chef', password='secret')
+        category = Category.objects.create(name='Mains')
+        cls.ingredients = [
+            Ingredient.objects.create(name=f'Ingredient {n}', unit='g', cost_per_unit='1.00') for n in range(4)
+        ]
+        cls.dish = Dish.objects.create(
+            name='Stew', description='', price='12.00', category=category, preparation_time=30,
+        )
+        for ingredient in cls.ingredients[:3]:
+            DishIngredient.objects.create(dish=cls.dish, ingredient=ingredient, quantity=1)
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def recipe(self):
+        return dict(DishIngredient.objects.filter(dish=self.dish).values_list('ingredient_id', 'quantity'))
+
+    def test_json_recipe_is_diffed(self):
+        a, b, c, d = self.ingredients
+        untouched = DishIngredient.objects.get(dish=self.dish, ingredient=a).pk
+        response = self.client.patch(f'/api/menu/dishes/{self.dish.pk}/', {'ingredients': [
+            {'ingredient': a.pk, 'quantity': 1},
+            {'ingredient': b.pk, 'quantity': 2.5},
+            {'ingredient': d.pk, 'quantity': 3},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.recipe(), {a.pk: 1, b.pk: 2.5, d.pk: 3})
+        self.assertTrue(DishIngredient.objects.filter(pk=untouched).exists())
+        self.assertEqual(response.data['cost'], '6.50')
+        self.assertEqual(sorted(response.data['ingredients']), sorted([a.pk, b.pk, d.pk]))
+
+    def test_removing_lines_refreshes_the_dish_once(self):
+        a = self.ingredients[0]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(f'/api/menu/dishes/{self.dish.pk}/', {
+                'ingredients': [{'ingredient': a.pk, 'quantity': 1}],
+            }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.recipe(), {a.pk: 1})
+        writes = [query['sql'] for query in queries if query['sql'].startswith(('INSERT', 'UPDATE', 'DELETE'))]
+        # The dish row itself, one DELETE, then a single cost and in_stock refresh
+        self.assertEqual(len(writes), 4)
+        self.assertEqual(sum(sql.startswith('DELETE') for sql in writes), 1)
+
+    def test_multipart_recipe(self):
+        a = self.ingredients[0]
+        response = self.client.patch(f'/api/menu/dishes/{self.dish.pk}/', {
+            'name': 'Beef stew',
+            'ingredients[0].ingredient': a.pk,
+            'ingredients[0].quantity': '4',
+        }, format='multipart')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.recipe(), {a.pk: 4})
+
+    def test_unknown_ingredient_is_rejected(self):
+        response = self.client.patch(f'/api/menu/dishes/{self.dish.pk}/', {
+            'name': 'Renamed', 'ingredients': [{'ingredient': 999999, 'quantity': 1}],
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.dish.refresh_from_db()
+        self.assertEqual(self.dish.name, 'Stew')
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class DishSearchTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='host', password='secret')
+        category = Category.objects.create(name='Mains', description='Hearty plates')
+        cls.curry = Dish.objects.create(
+            name='Green Curry', description='Coconut and basil', price='14.00', category=category, preparation_time=15,
+        )
+        cls.rice = Dish.objects.create(
+            name='Jasmine Rice', description='Goes well with any curry', price='4.00', category=category,
+            preparation_time=10,
+        )
+        Dish.objects.create(
+            name='Burger', description='Beef patty', price='12.00', category=category, preparation_time=12,
+        )
+
+    def setUp(self):
+        caches['default'].clear()
+        self.client.force_authenticate(self.user)
+
+    def search(self, term):
+        response = self.client.get('/api/menu/dishes/', {'search': term})
+        self.assertEqual(response.status_code, 200)
+        return [dish['name'] for dish in response.data['results']]
+
+    def test_name_matches_rank_above_description_matches(self):
+        self.assertEqual(self.search('curry'), ['Green Curry', 'Jasmine Rice'])
+
+    def test_every_term_must_match_as_a_prefix(self):
+        self.assertEqual(self.search('cur basil'), ['Green Curry'])
+        self.assertEqual(self.search('"; DROP'), [])
+
+    def test_index_follows_saves_and_deletes(self):
+        self.rice.name = 'Sticky Rice'
+        self.rice.description = 'Plain'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.rice.save()
+        self.assertEqual(self.search('curry'), ['Green Curry'])
+        self.assertEqual(self.search('sticky'), ['Sticky Rice'])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.curry.delete()
+        self.assertEqual(self.search('curry'), [])
+
+    def test_index_is_rewritten_only_when_searchable_columns_change(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name LIKE '%%_fts_au'")
+            triggers = [sql for sql, in cursor.fetchall()]
+        self.assertEqual(len(triggers), 2)
+        for sql in triggers:
+            self.assertIn('AFTER UPDATE OF name, description ON', sql)
+
+    def test_category_search(self):
+        response = self.client.get('/api/menu/categories/', {'search': 'hearty'})
+        self.assertEqual([c['name'] for c in response.data['results']], ['Mains'])
+
+
+@override_settings(IMAGE_VARIANTS_SYNC=True,
+                   CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class ImageVariantTests(APITestCase):
+    @classmethod
+    def setUpClass(cls):
+        media_root = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        cls.enterClassContext(override_settings(MEDIA_ROOT=media_root))
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='photo', password='secret')
+        cls.category = Category.objects.create(name='Desserts')
+        cls.dish = Dish.objects.create(
+            name='Tart', description='', price='6.00', category=cls.category, preparation_time=5,
+        )
+
+    def setUp(self):
+        caches['default'].clear()
+        self.client.force_authenticate(self.user)
+
+    def upload(self, name='tart.png', image_format='PNG', mode='RGBA'):
+        buffer = BytesIO()
+        Image.new(mode, (2400, 1600), (200, 80, 40, 255)[:len(mode)]).save(buffer, image_format)
+        image = SimpleUploadedFile(name, buffer.getvalue(), content_type=f'image/{image_format.lower()}')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(f'/api/menu/dishes/{self.dish.pk}/', {'image': image}, format='multipart')
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_upload_renders_variants_and_exposes_urls(self):
+        response = self.upload()
+        self.dish.refresh_from_db()
+        variants = response.data['image_variants']
+        self.assertEqual(set(variants), {'thumbnail', 'medium', 'webp'})
+        self.assertTrue(variants['webp'].startswith('http://testserver/media/variants/dish_images/'))
+
+        storage = self.dish.image.storage
+        with storage.open(variant_name(self.dish.image.name, 'thumbnail')) as thumbnail:
+            self.assertEqual(Image.open(thumbnail).size, (320, 213))
+        with storage.open(variant_name(self.dish.image.name, 'webp')) as webp:
+            self.assertEqual(Image.open(webp).format, 'WEBP')
+
+    def test_replaced_image_gets_its_own_variants_and_old_ones_are_removed(self):
+        self.upload()
+        self.dish.refresh_from_db()
+        first = self.dish.image.name
+        self.upload('tart.jpg', 'JPEG', 'RGB')
+        self.dish.refresh_from_db()
+        storage = self.dish.image.storage
+        self.assertNotEqual(variant_name(first, 'medium'), variant_name(self.dish.image.name, 'medium'))
+        self.assertTrue(storage.exists(variant_name(self.dish.image.name, 'medium')))
+        self.assertFalse(storage.exists(variant_name(first, 'medium')))
+
+    def test_media_is_served_with_long_lived_cache_headers(self):
+        self.upload()
+        self.dish.refresh_from_db()
+        request = RequestFactory().get('/media/')
+        response = serve_media(request, variant_name(self.dish.image.name, 'medium'))
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertIn('max-age=31536000', response['Cache-Control'])
+
+    def test_empty_image_has_no_variants(self):
+        response = self.client.get(f'/api/menu/categories/{self.category.pk}/')
+        self.assertIsNone(response.data['image_variants'])
@@ -2,62 +2,54 @@ from rest_framework import viewsets, filters, status
 from rest_framework.response import Response
 from rest_framework.decorators import action
 from django_filters.rest_framework import DjangoFilterBackend
-from .models import Category, Dish, Ingredient, DishIngredient
+from django.db import transaction
+from .models import Category, Dish, Ingredient
 from .serializers import CategorySerializer, DishSerializer, IngredientSerializer
+from restaurant_management.prefetch import PrefetchPlanMixin
+from .cache import MenuCacheMixin
+from .recipes import RecipeError, parse_recipe, sync_recipe
+from .search import RankedSearchFilter
 
-class CategoryViewSet(viewsets.ModelViewSet):
+class CategoryViewSet(MenuCacheMixin, viewsets.ModelViewSet):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter]
+    filter_backends = [DjangoFilterBackend, RankedSearchFilter]
     filterset_fields = ['name']
     search_fields = ['name', 'description']
 
-class DishViewSet(viewsets.ModelViewSet):
+class DishViewSet(MenuCacheMixin, PrefetchPlanMixin, viewsets.ModelViewSet):
     queryset = Dish.objects.all()
     serializer_class = DishSerializer
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = ['category', 'available']
+    filter_backends = [DjangoFilterBackend, RankedSearchFilter, filters.OrderingFilter]
+    filterset_fields = {
+        'category': ['exact'],
+        'available': ['exact'],
+        # POS terminals list what can be sold with ?available=true&in_stock=true
+        'in_stock': ['exact'],
+        'cost': ['exact', 'gte', 'lte'],
+        'margin': ['exact', 'gte', 'lte'],
+    }
     search_fields = ['name', 'description']
-    ordering_fields = ['price', 'name', 'preparation_time']
+    ordering_fields = ['price', 'name', 'preparation_time', 'cost', 'margin']
     
     def update(self, request, *args, **kwargs):
         instance = self.get_object()
         serializer = self.get_serializer(instance, data=request.data, partial=True)
         serializer.is_valid(raise_exception=True)
         
-        # Handle ingredients separately
-        ingredients_data = []
-        for key, value in request.data.items():
-            if key.startswith('ingredients['):
-                # Parse the key to get index and field name
-                # Example: ingredients[0].ingredient -> index=0, field=ingredient
-                import re
-                match = re.match(r'ingredients\[(\d+)\]\.(.+)', key)
-                if match:
-                    index = int(match.group(1))
-                    field = match.group(2)
-                    if len(ingredients_data) <= index:
-                        ingredients_data.extend([{}] * (index - len(ingredients_data) + 1))
-                    ingredients_data[index][field] = value
-        
-        # Update the dish
-        self.perform_update(serializer)
+        try:
+            recipe = parse_recipe(request.data)
+            # Update the dish and diff its ingredient lines in one transaction
+            with transaction.atomic():
+                self.perform_update(serializer)
+                if recipe is not None:
+                    sync_recipe(instance, recipe)
+        except RecipeError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Update ingredients if provided
-        if ingredients_data:
-            # Remove existing ingredients
-            DishIngredient.objects.filter(dish=instance).delete()
-            
-            # Create new ingredients
-            for data in ingredients_data:
-                ingredient_id = data.get('ingredient')
-                quantity = data.get('quantity')
-                if ingredient_id and quantity:
-                    DishIngredient.objects.create(
-                        dish=instance,
-                        ingredient_id=ingredient_id,
-                        quantity=quantity
-                    )
+        if recipe is not None:
+            instance._prefetched_objects_cache = {}
+            instance.refresh_from_db(fields=['cost', 'margin', 'in_stock'])
         
         return Response(serializer.data)
 
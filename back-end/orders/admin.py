@@ -7,7 +7,7 @@ class OrderItemInline(admin.TabularInline):
 
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
-    list_display = ('id', 'table', 'waiter', 'status', 'created_at')
+    list_display = ('id', 'table', 'waiter', 'status', 'subtotal', 'item_count', 'created_at')
     list_filter = ('status', 'created_at')
     search_fields = ('notes',)
     inlines = [OrderItemInline]
@@ -0,0 +1,105 @@
+import asyncio
+import itertools
+import threading
+from collections import deque
+
+from django.conf import settings
+from django.db import transaction
+
+
+class EventBroker:
+    """
+    In-process fan-out of order/item status deltas.
+
+    Events carry a monotonically increasing sequence number and the last
+    ``history`` events are kept so a reconnecting screen can resume from the
+    last sequence it saw. Publishing is thread-safe; subscribers wait on
+    asyncio events owned by their own loop, so one ASGI worker can serve many
+    screens without polling the database.
+    """
+
+    def __init__(self, history=1000):
+        self._lock = threading.Lock()
+        self._events = deque(maxlen=history)
+        self._sequence = itertools.count(1)
+        self._last_sequence = 0
+        self._waiters = set()
+
+    @property
+    def last_sequence(self):
+        return self._last_sequence
+
+    def publish(self, payload):
+        with self._lock:
+            event = dict(payload, seq=next(self._sequence))
+            self._events.append(event)
+            self._last_sequence = event['seq']
+            waiters = list(self._waiters)
+        for loop, waiter in waiters:
+            loop.call_soon_threadsafe(waiter.set)
+        return event
+
+    def events_since(self, sequence):
+        """
+        Return ``(events, complete)`` for everything after ``sequence``.
+        ``complete`` is False when older events were already evicted, or when
+        ``sequence`` is ahead of this broker (it was handed out before a
+        restart), and the client has to resynchronise from the REST API.
+        """
+        with self._lock:
+            if sequence > self._last_sequence:
+                return list(self._events), False
+            if sequence == self._last_sequence:
+                return [], True
+            oldest = self._events[0]['seq']
+            complete = sequence >= oldest - 1
+            skip = max(sequence - oldest + 1, 0)
+            return list(itertools.islice(self._events, skip, None)), complete
+
+    async def wait(self, sequence, timeout):
+        """Wait until an event newer than ``sequence`` is published or ``timeout`` elapses."""
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self._lock:
+            if self._last_sequence > sequence:
+                return True
+            self._waiters.add(waiter)
+        try:
+            await asyncio.wait_for(waiter[1].wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            with self._lock:
+                self._waiters.discard(waiter)
+
+
+broker = EventBroker(history=getattr(settings, 'ORDER_EVENTS_HISTORY', 1000))
+
+
+def order_delta(order):
+    return {
+        'type': 'order',
+        'id': order.pk,
+        'order': order.pk,
+        'status': order.status,
+        'table': order.table_id,
+    }
+
+
+def item_delta(item):
+    return {
+        'type': 'item',
+        'id': item.pk,
+        'order': item.order_id,
+        'status': item.status,
+        # Kitchen stations are keyed by dish category
+        'station': item.dish.category_id,
+    }
+
+
+def publish_on_commit(*deltas):
+    """Broadcast ``deltas`` once the surrounding transaction commits."""
+    def publish():
+        for delta in deltas:
+            broker.publish(delta)
+    transaction.on_commit(publish)
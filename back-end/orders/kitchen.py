@@ -0,0 +1,247 @@
+import heapq
+import itertools
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone as dt_timezone
+
+from django.db import transaction
+
+ACTIVE_ITEM_STATUSES = ('pending', 'preparing')
+OPEN_ORDER_STATUSES = ('pending', 'confirmed', 'preparing', 'ready', 'served')
+
+
+class _Entry:
+    __slots__ = ('id', 'order', 'station', 'dish', 'prep', 'status', 'fire_at', 'ready_at', 'version')
+
+    def __init__(self, item_id, order_id, station, dish_id, prep, status):
+        self.id = item_id
+        self.order = order_id
+        self.station = station
+        self.dish = dish_id
+        self.prep = prep
+        self.status = status
+        self.fire_at = None
+        self.ready_at = None
+        self.version = 0
+
+
+class _Ticket:
+    __slots__ = ('target', 'items')
+
+    def __init__(self):
+        self.target = 0.0
+        self.items = set()
+
+
+class KitchenScheduler:
+    """
+    Incrementally maintained fire schedule for open order items.
+
+    Every item of a ticket is timed to finish together: the ticket's target
+    ready time is the latest ``now + preparation_time`` among its items, and
+    each pending item fires at ``target - preparation_time``. Pending items
+    sit in one heap per station (dish category) keyed by fire time; changes
+    only touch the affected ticket and stale heap entries are skipped lazily,
+    so adding or bumping an item never recomputes the whole kitchen.
+
+    State lives in process memory and is rebuilt from the database on first
+    use, so each worker keeps its own copy.
+    """
+
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        self.loaded = False
+        self._lock = threading.RLock()
+        self._items = {}
+        self._tickets = {}
+        self._queues = defaultdict(list)
+        self._in_progress = defaultdict(set)
+        self._stale = 0
+
+    def load(self, rows):
+        """Replace the schedule with ``(item_id, order_id, station, dish_id, prep_minutes, status)`` rows."""
+        with self._lock:
+            self._items.clear()
+            self._tickets.clear()
+            self._queues.clear()
+            self._in_progress.clear()
+            self._stale = 0
+            for row in rows:
+                self.add(*row)
+            self.loaded = True
+
+    def add(self, item_id, order_id, station, dish_id, prep_minutes, status='pending'):
+        with self._lock:
+            if item_id in self._items or status not in ACTIVE_ITEM_STATUSES:
+                return
+            now = self.clock()
+            entry = _Entry(item_id, order_id, station, dish_id, (prep_minutes or 0) * 60, status)
+            self._items[item_id] = entry
+            ticket = self._tickets.setdefault(order_id, _Ticket())
+            ticket.items.add(item_id)
+            if status == 'preparing':
+                entry.fire_at, entry.ready_at = now, now + entry.prep
+                self._in_progress[station].add(item_id)
+            if max(now + entry.prep, entry.ready_at or 0) > ticket.target:
+                ticket.target = max(now + entry.prep, entry.ready_at or 0)
+                self._reschedule(ticket)
+            elif status == 'pending':
+                self._schedule(entry, ticket.target)
+
+    def set_status(self, item_id, status):
+        with self._lock:
+            entry = self._items.get(item_id)
+            if entry is None or entry.status == status:
+                return
+            if status not in ACTIVE_ITEM_STATUSES:
+                self.remove(item_id)
+                return
+            if status == 'preparing':
+                now = self.clock()
+                self._invalidate(entry)
+                entry.status = status
+                entry.fire_at, entry.ready_at = now, now + entry.prep
+                self._in_progress[entry.station].add(item_id)
+                ticket = self._tickets[entry.order]
+                if entry.ready_at > ticket.target:
+                    # Fired late: hold the rest of the ticket back so it still lands together
+                    ticket.target = entry.ready_at
+                    self._reschedule(ticket)
+
+    def remove(self, item_id):
+        with self._lock:
+            entry = self._items.pop(item_id, None)
+            if entry is None:
+                return
+            self._invalidate(entry)
+            self._in_progress[entry.station].discard(item_id)
+            ticket = self._tickets[entry.order]
+            ticket.items.discard(item_id)
+            if not ticket.items:
+                del self._tickets[entry.order]
+            elif entry.status == 'pending' and entry.fire_at + entry.prep >= ticket.target:
+                self._shrink(ticket)
+
+    def remove_order(self, order_id):
+        with self._lock:
+            ticket = self._tickets.get(order_id)
+            for item_id in list(ticket.items if ticket else ()):
+                self.remove(item_id)
+
+    def queue(self, station=None, limit=None):
+        """Pending items ordered by fire time plus in-progress items ordered by ready time."""
+        with self._lock:
+            if self._stale > 2 * len(self._items) + 64:
+                self._compact()
+            stations = [station] if station is not None else list(self._queues)
+            live = heapq.merge(*(self._walk(self._queues.get(s, [])) for s in stations))
+            queued = [
+                self._describe(self._items[item_id])
+                for _, item_id, _ in itertools.islice(live, limit)
+            ]
+            in_progress = sorted(
+                (self._describe(self._items[item_id])
+                 for s in (stations if station is not None else list(self._in_progress))
+                 for item_id in self._in_progress.get(s, ())),
+                key=lambda item: item['ready_at'],
+            )
+            return {'queued': queued, 'in_progress': in_progress}
+
+    def _schedule(self, entry, target):
+        entry.fire_at = target - entry.prep
+        entry.ready_at = target
+        entry.version += 1
+        heapq.heappush(self._queues[entry.station], (entry.fire_at, entry.id, entry.version))
+
+    def _reschedule(self, ticket):
+        for item_id in ticket.items:
+            entry = self._items[item_id]
+            if entry.status == 'pending':
+                self._stale += entry.version > 0
+                self._schedule(entry, ticket.target)
+
+    def _shrink(self, ticket):
+        now = self.clock()
+        target = max(
+            (self._items[i].ready_at if self._items[i].status == 'preparing'
+             else now + self._items[i].prep)
+            for i in ticket.items
+        )
+        if target < ticket.target:
+            ticket.target = target
+            self._reschedule(ticket)
+
+    def _invalidate(self, entry):
+        entry.version += 1
+        self._stale += 1
+
+    def _walk(self, heap):
+        # Yield live keys in order without popping: a best-first walk over the
+        # heap array costs O(k log k) for the first k results
+        if not heap:
+            return
+        frontier = [(heap[0], 0)]
+        while frontier:
+            key, index = heapq.heappop(frontier)
+            if self._is_live(key):
+                yield key
+            for child in (2 * index + 1, 2 * index + 2):
+                if child < len(heap):
+                    heapq.heappush(frontier, (heap[child], child))
+
+    def _is_live(self, key):
+        _, item_id, version = key
+        entry = self._items.get(item_id)
+        return entry is not None and entry.status == 'pending' and entry.version == version
+
+    def _compact(self):
+        for station, heap in list(self._queues.items()):
+            heap[:] = [key for key in heap if self._is_live(key)]
+            heapq.heapify(heap)
+            if not heap:
+                del self._queues[station]
+        self._stale = 0
+
+    @staticmethod
+    def _describe(entry):
+        return {
+            'item': entry.id,
+            'order': entry.order,
+            'dish': entry.dish,
+            'station': entry.station,
+            'status': entry.status,
+            'fire_at': datetime.fromtimestamp(entry.fire_at, tz=dt_timezone.utc),
+            'ready_at': datetime.fromtimestamp(entry.ready_at, tz=dt_timezone.utc),
+        }
+
+
+scheduler = KitchenScheduler()
+
+
+def get_scheduler():
+    """Return the process-wide scheduler, loading open items from the database on first use."""
+    if not scheduler.loaded:
+        from .models import OrderItem
+        with scheduler._lock:
+            if not scheduler.loaded:
+                scheduler.load(
+                    OrderItem.objects.filter(
+                        status__in=ACTIVE_ITEM_STATUSES, order__status__in=OPEN_ORDER_STATUSES
+                    ).order_by('order__created_at', 'id').values_list(
+                        'id', 'order_id', 'dish__category_id', 'dish_id',
+                        'dish__preparation_time', 'status',
+                    )
+                )
+    return scheduler
+
+
+def schedule_on_commit(items):
+    """Add newly created items to a loaded scheduler once their transaction commits."""
+    if not scheduler.loaded:
+        return
+    rows = [
+        (item.pk, item.order_id, item.dish.category_id, item.dish_id, item.dish.preparation_time, item.status)
+        for item in items
+    ]
+    transaction.on_commit(lambda: [scheduler.add(*row) for row in rows])
@@ -0,0 +1,69 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from orders.kitchen import KitchenScheduler
+
+
+class Command(BaseCommand):
+    help = 'Simulate a service against the in-memory kitchen scheduler and report per-operation cost'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--open-items', type=int, default=500,
+                            help='Items kept open in the kitchen during the simulation')
+        parser.add_argument('--operations', type=int, default=20000)
+        parser.add_argument('--stations', type=int, default=6)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        clock = [0.0]
+        kitchen = KitchenScheduler(clock=lambda: clock[0])
+        kitchen.load([])
+        stations = options['stations']
+        next_item = iter(range(1, 10 ** 9))
+        next_order = iter(range(1, 10 ** 9))
+        open_items = []
+
+        def add_ticket():
+            order_id = next(next_order)
+            for _ in range(rng.randint(1, 6)):
+                item_id = next(next_item)
+                kitchen.add(item_id, order_id, rng.randrange(stations), rng.randrange(200), rng.randint(2, 30))
+                open_items.append(item_id)
+
+        while len(open_items) < options['open_items']:
+            add_ticket()
+
+        timings = {'add': [], 'fire': [], 'bump': [], 'queue': []}
+        preparing = []
+        for _ in range(options['operations']):
+            clock[0] += rng.uniform(0, 5)
+            roll = rng.random()
+            started = time.perf_counter()
+            if len(open_items) + len(preparing) < options['open_items']:
+                kind = 'add'
+                add_ticket()
+            elif roll < 0.45 and open_items:
+                kind = 'fire'
+                item_id = open_items.pop(rng.randrange(len(open_items)))
+                kitchen.set_status(item_id, 'preparing')
+                preparing.append(item_id)
+            elif roll < 0.9 and preparing:
+                kind = 'bump'
+                kitchen.set_status(preparing.pop(rng.randrange(len(preparing))), 'ready')
+            else:
+                kind = 'queue'
+                kitchen.queue(station=rng.randrange(stations), limit=30)
+            timings[kind].append(time.perf_counter() - started)
+
+        self.stdout.write(f"Open items at end: {len(kitchen._items)}")
+        for kind, samples in timings.items():
+            if not samples:
+                continue
+            samples.sort()
+            mean = sum(samples) / len(samples)
+            p99 = samples[int(len(samples) * 0.99) - 1]
+            self.stdout.write(
+                f'{kind:>6}: {len(samples):>6} ops  mean {mean * 1e6:8.1f} us  p99 {p99 * 1e6:8.1f} us'
+            )
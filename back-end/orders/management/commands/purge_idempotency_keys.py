@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from orders.models import IdempotencyKey
+
+
+class Command(BaseCommand):
+    help = 'Delete stored idempotent responses older than IDEMPOTENCY_KEY_RETENTION_HOURS; run periodically'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        removed = IdempotencyKey.objects.purge_expired(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Purged {removed} expired idempotency key(s)'))
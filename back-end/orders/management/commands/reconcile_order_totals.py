@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from orders.models import Order
+
+
+class Command(BaseCommand):
+    help = 'Recompute stored order subtotals and item counts that drifted from their items'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report drifted orders without updating them')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        drifted_ids = list(Order.objects.drifted().values_list('id', flat=True))
+
+        if options['dry_run']:
+            self.stdout.write(f'{len(drifted_ids)} order(s) have drifted totals')
+            return
+
+        for start in range(0, len(drifted_ids), batch_size):
+            with transaction.atomic():
+                Order.objects.filter(pk__in=drifted_ids[start:start + batch_size]).refresh_totals()
+
+        self.stdout.write(self.style.SUCCESS(f'Reconciled totals for {len(drifted_ids)} order(s)'))
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.6 on 2026-10-18 16:57
+
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def backfill_order_totals(apps, schema_editor):
+    Order = apps.get_model('orders', 'Order')
+    OrderItem = apps.get_model('orders', 'OrderItem')
+    items = OrderItem.objects.filter(order=OuterRef('pk')).order_by().values('order')
+    subtotal = items.annotate(
+        total=Sum(F('quantity') * F('dish__price'), output_field=models.DecimalField())
+    ).values('total')
+    item_count = items.annotate(total=Sum('quantity')).values('total')
+    Order.objects.update(
+        subtotal=Coalesce(Subquery(subtotal), 0, output_field=models.DecimalField()),
+        item_count=Coalesce(Subquery(item_count), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='item_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='subtotal',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=10),
+        ),
+        migrations.RunPython(backfill_order_totals, migrations.RunPython.noop),
+    ]
@@ -1,8 +1,41 @@
-from django.db import models
+from datetime import timedelta
+
+from django.db import models, transaction
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
 from django.conf import settings
+from django.utils import timezone
 from menu.models import Dish
 from tables.models import Table
 
+class OrderQuerySet(models.QuerySet):
+    @staticmethod
+    def _computed_totals():
+        items = OrderItem.objects.filter(order=OuterRef('pk')).order_by().values('order')
+        subtotal = items.annotate(
+            total=Sum(F('quantity') * F('dish__price'), output_field=models.DecimalField())
+        ).values('total')
+        item_count = items.annotate(total=Sum('quantity')).values('total')
+        return {
+            'subtotal': Coalesce(Subquery(subtotal), 0, output_field=models.DecimalField()),
+            'item_count': Coalesce(Subquery(item_count), 0),
+        }
+    
+    def with_computed_totals(self):
+        totals = self._computed_totals()
+        return self.annotate(
+            computed_subtotal=totals['subtotal'],
+            computed_item_count=totals['item_count'],
+        )
+    
+    def drifted(self):
+        return self.with_computed_totals().exclude(
+            subtotal=F('computed_subtotal'), item_count=F('computed_item_count')
+        )
+    
+    def refresh_totals(self):
+        return self.update(**self._computed_totals())
+
 class Order(models.Model):
     STATUS_CHOICES = (
         ('pending', 'Pending'),
@@ -20,17 +53,42 @@ class Order(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     notes = models.TextField(blank=True)
+    # Maintained from OrderItem writes, see OrderItem.save and orders.signals
+    subtotal = models.DecimalField(max_digits=10, decimal_places=2, default=0, editable=False)
+    item_count = models.PositiveIntegerField(default=0, editable=False)
+    
+    # Written only by OrderQuerySet.refresh_totals(); saves from an instance loaded earlier must not overwrite them
+    DERIVED_FIELDS = ('subtotal', 'item_count')
+    
+    objects = OrderQuerySet.as_manager()
+    
+    class Meta:
+        # Match the OrderViewSet filters combined with its (-created_at, -id) cursor ordering
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='order_created_idx'),
+            models.Index(fields=['status', '-created_at', '-id'], name='order_status_created_idx'),
+            models.Index(fields=['table', '-created_at', '-id'], name='order_table_created_idx'),
+            models.Index(fields=['waiter', '-created_at', '-id'], name='order_waiter_created_idx'),
+        ]
     
     def __str__(self):
         return f"Order #{self.id} - {self.status}"
     
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            update_fields = kwargs.get('update_fields')
+            if update_fields is None:
+                update_fields = [field.name for field in self._meta.concrete_fields if not field.primary_key]
+            kwargs['update_fields'] = [name for name in update_fields if name not in self.DERIVED_FIELDS]
+        super().save(*args, **kwargs)
+    
     @property
     def total_amount(self):
-        return sum(item.total_price for item in self.items.all())
+        return self.subtotal
     
     @property
     def total_items(self):
-        return sum(item.quantity for item in self.items.all())
+        return self.item_count
 
 class OrderItem(models.Model):
     STATUS_CHOICES = (
@@ -45,10 +103,17 @@ class OrderItem(models.Model):
     quantity = models.PositiveIntegerField(default=1)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     notes = models.TextField(blank=True)
+    # Set while this item's recipe ingredients are taken out of stock, see inventory.depletion
+    stock_depleted = models.BooleanField(default=False, editable=False)
     
     def __str__(self):
         return f"{self.quantity}x {self.dish.name}"
     
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            Order.objects.filter(pk=self.order_id).refresh_totals()
+    
     @property
     def total_price(self):
         return self.dish.price * self.quantity
@@ -66,5 +131,56 @@ class Payment(models.Model):
     timestamp = models.DateTimeField(auto_now_add=True)
     transaction_id = models.CharField(max_length=100, blank=True)
     
+    class Meta:
+        indexes = [
+            models.Index(fields=['-timestamp', '-id'], name='payment_timestamp_idx'),
+            models.Index(fields=['method', '-timestamp', '-id'], name='payment_method_timestamp_idx'),
+        ]
+    
+    def __str__(self):
+        return f"Payment for Order #{self.order.id}"
+
+class IdempotencyKeyQuerySet(models.QuerySet):
+    @staticmethod
+    def cutoff(now=None):
+        return (now or timezone.now()) - timedelta(hours=getattr(settings, 'IDEMPOTENCY_KEY_RETENTION_HOURS', 24))
+    
+    def live(self, now=None):
+        return self.filter(created_at__gte=self.cutoff(now))
+    
+    def expired(self, now=None):
+        return self.filter(created_at__lt=self.cutoff(now))
+    
+    def purge_expired(self, now=None, batch_size=5000):
+        """Delete keys past IDEMPOTENCY_KEY_RETENTION_HOURS in batches, served by the created_at index."""
+        cutoff = self.cutoff(now)
+        removed = 0
+        while True:
+            with transaction.atomic():
+                batch = list(self.filter(created_at__lt=cutoff).values_list('pk', flat=True)[:batch_size])
+                if not batch:
+                    break
+                removed += self.filter(pk__in=batch).delete()[0]
+        return removed
+
+class IdempotencyKey(models.Model):
+    """Stored outcome of a completed request, replayed when a client retries with the same key."""
+    scope = models.CharField(max_length=50)
+    key = models.CharField(max_length=255)
+    request_fingerprint = models.CharField(max_length=64)
+    response_status = models.PositiveSmallIntegerField()
+    response_body = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    objects = IdempotencyKeyQuerySet.as_manager()
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['scope', 'key'], name='unique_idempotency_key'),
+        ]
+        indexes = [
+            models.Index(fields=['created_at'], name='idempotency_created_idx'),
+        ]
+    
     def __str__(self):
-        return f"Payment for Order #{self.order.id}"
\ No newline at end of file
+        return f"{self.scope} {self.key}"
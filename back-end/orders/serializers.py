@@ -1,26 +1,48 @@
 from rest_framework import serializers
+from restaurant_management.serializers import FlexFieldsMixin
 from .models import Order, OrderItem, Payment
+from .transitions import ITEM_TRANSITIONS, ORDER_TRANSITIONS, can_transition
 from menu.serializers import DishSerializer
 from tables.serializers import TableSerializer
 from users.serializers import UserSerializer
 
-class OrderItemSerializer(serializers.ModelSerializer):
-    dish = DishSerializer(read_only=True)
-    
+class OrderItemSerializer(FlexFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = OrderItem
         fields = '__all__'
+        read_only_fields = ('dish',)
+        expandable_fields = {
+            'dish': (DishSerializer, {}),
+        }
+    
+    def validate_status(self, value):
+        if self.instance is not None and not can_transition(ITEM_TRANSITIONS, self.instance.status, value):
+            raise serializers.ValidationError(f"Cannot move from '{self.instance.status}' to '{value}'")
+        return value
 
-class OrderSerializer(serializers.ModelSerializer):
-    table = TableSerializer(read_only=True)
-    waiter = UserSerializer(read_only=True)
-    items = OrderItemSerializer(many=True, read_only=True)
+class OrderSerializer(FlexFieldsMixin, serializers.ModelSerializer):
+    items = serializers.PrimaryKeyRelatedField(many=True, read_only=True)
     
     class Meta:
         model = Order
         fields = '__all__'
+        read_only_fields = ('table', 'waiter')
+        # Relations render as ids unless requested through ?expand=
+        expandable_fields = {
+            'table': (TableSerializer, {}),
+            'waiter': (UserSerializer, {}),
+            'items': (OrderItemSerializer, {'many': True}),
+        }
+    
+    def validate_status(self, value):
+        if self.instance is not None and not can_transition(ORDER_TRANSITIONS, self.instance.status, value):
+            raise serializers.ValidationError(f"Cannot move from '{self.instance.status}' to '{value}'")
+        return value
 
-class PaymentSerializer(serializers.ModelSerializer):
+class PaymentSerializer(FlexFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Payment
-        fields = '__all__'
\ No newline at end of file
+        fields = '__all__'
+        expandable_fields = {
+            'order': (OrderSerializer, {}),
+        }
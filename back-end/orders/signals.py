@@ -0,0 +1,63 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import Signal, receiver
+from .events import item_delta, order_delta, publish_on_commit
+from .kitchen import OPEN_ORDER_STATUSES, schedule_on_commit, scheduler
+from .models import Order, OrderItem
+
+# Sent right after orders or order items change status, from model saves and
+# from the bulk transitions in orders.transitions, with ``ids``, the new
+# ``status`` and a ``previous`` {id: status} map
+order_status_changed = Signal()
+order_item_status_changed = Signal()
+# Sent with ``order_ids`` after items are added to orders, including bulk inserts
+order_items_created = Signal()
+
+@receiver(post_delete, sender=OrderItem)
+def refresh_order_totals_on_delete(sender, instance=None, **kwargs):
+    # Runs inside the deletion's transaction; a no-op when the order itself is being deleted
+    Order.objects.filter(pk=instance.order_id).refresh_totals()
+    if scheduler.loaded:
+        transaction.on_commit(lambda: scheduler.remove(instance.pk))
+
+@receiver(post_init, sender=Order)
+@receiver(post_init, sender=OrderItem)
+def remember_loaded_status(sender, instance=None, **kwargs):
+    # Read from __dict__ so a deferred status field is not fetched
+    instance._loaded_status = instance.__dict__.get('status')
+
+@receiver(post_save, sender=Order)
+def publish_order_status(sender, instance=None, created=False, **kwargs):
+    previous = instance._loaded_status
+    if created or instance.status != previous:
+        publish_on_commit(order_delta(instance))
+    instance._loaded_status = instance.status
+    if not created and instance.status != previous:
+        order_status_changed.send(
+            sender=Order, ids=[instance.pk], status=instance.status, previous={instance.pk: previous}
+        )
+
+@receiver(post_save, sender=OrderItem)
+def publish_item_status(sender, instance=None, created=False, **kwargs):
+    previous = instance._loaded_status
+    if created or instance.status != previous:
+        publish_on_commit(item_delta(instance))
+    if created:
+        schedule_on_commit([instance])
+        order_items_created.send(sender=OrderItem, order_ids=[instance.order_id])
+    instance._loaded_status = instance.status
+    if not created and instance.status != previous:
+        order_item_status_changed.send(
+            sender=OrderItem, ids=[instance.pk], status=instance.status, previous={instance.pk: previous}
+        )
+
+@receiver(order_item_status_changed)
+def reschedule_kitchen_items(sender, ids=(), status=None, **kwargs):
+    if scheduler.loaded:
+        transaction.on_commit(lambda: [scheduler.set_status(pk, status) for pk in ids])
+
+@receiver(order_status_changed)
+def drop_closed_tickets(sender, ids=(), status=None, **kwargs):
+    # Paid and cancelled orders leave the kitchen, whatever their items' state
+    if scheduler.loaded and status not in OPEN_ORDER_STATUSES:
+        transaction.on_commit(lambda: [scheduler.remove_order(pk) for pk in ids])
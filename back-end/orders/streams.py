@@ -0,0 +1,97 @@
+import json
+
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework.authtoken.models import Token
+from .events import broker
+
+HEARTBEAT_SECONDS = getattr(settings, 'ORDER_EVENTS_HEARTBEAT', 15)
+
+
+class Subscription:
+    def __init__(self, types=None, statuses=None, stations=None):
+        self.types = types
+        self.statuses = statuses
+        self.stations = stations
+
+    @classmethod
+    def from_query(cls, params):
+        def split(name):
+            value = params.get(name)
+            return set(value.split(',')) if value else None
+        return cls(types=split('type'), statuses=split('status'), stations=split('station'))
+
+    def matches(self, event):
+        if self.types and event['type'] not in self.types:
+            return False
+        if self.statuses and event['status'] not in self.statuses:
+            return False
+        if self.stations and str(event.get('station')) not in self.stations:
+            return False
+        return True
+
+
+def format_event(event, name='status'):
+    return f"id: {event['seq']}\nevent: {name}\ndata: {json.dumps(event)}\n\n"
+
+
+async def event_stream(subscription, since):
+    yield 'retry: 3000\n\n'
+    last = since
+    while True:
+        events, complete = broker.events_since(last)
+        if not complete:
+            # The client missed evicted events and must reload state over REST
+            last = events[0]['seq'] - 1 if events else 0
+            yield format_event({'seq': last}, name='reset')
+        for event in events:
+            last = event['seq']
+            if subscription.matches(event):
+                yield format_event(event)
+        if not events and not await broker.wait(last, HEARTBEAT_SECONDS):
+            yield ': keepalive\n\n'
+
+
+async def authenticate(request):
+    user = await request.auser()
+    if user.is_authenticated:
+        return user
+    # EventSource cannot send headers, so the token may also come from the query string
+    key = request.GET.get('token')
+    header = request.headers.get('Authorization', '')
+    if header.startswith('Token '):
+        key = header[len('Token '):]
+    if not key:
+        return None
+    try:
+        token = await Token.objects.select_related('user').aget(key=key)
+    except Token.DoesNotExist:
+        return None
+    return token.user if token.user.is_active else None
+
+
+async def order_event_stream(request):
+    """
+    Server-sent event stream of order and order item status changes.
+
+    Filters: ``type`` (order/item), ``status`` and ``station`` (dish category
+    id), each a comma separated list. Reconnecting clients resume through the
+    ``Last-Event-ID`` header or a ``since`` parameter. Must be served through
+    the ASGI application so one worker can hold many open streams.
+    """
+    if await authenticate(request) is None:
+        return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=401)
+
+    since = request.headers.get('Last-Event-ID') or request.GET.get('since')
+    try:
+        since = int(since) if since else broker.last_sequence
+    except ValueError:
+        return JsonResponse({'error': 'Invalid sequence number'}, status=400)
+
+    response = StreamingHttpResponse(
+        event_stream(Subscription.from_query(request.GET), since),
+        content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
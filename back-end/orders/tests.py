@@ -1,3 +1,426 @@
-from django.test import TestCase
+import asyncio
+import json
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from menu.models import Category, Dish, Ingredient, DishIngredient
+from restaurant_management.testing import IndexUsageMixin, QueryBudgetMixin
+from tables.models import Table
+from .events import EventBroker, broker
+from .kitchen import KitchenScheduler, scheduler
+from .models import IdempotencyKey, Order, OrderItem, Payment
+from .streams import Subscription
+from .transitions import transition_items
+
+User = get_user_model()
+
+
+class OrderQueryBudgetTests(QueryBudgetMixin, APITestCase):
+    LIST_BUDGET = 7
+    DETAIL_BUDGET = 6
+    FULL_GRAPH = 'expand=table,waiter,items.dish.category,items.dish.ingredients.ingredient'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='waiter', password='secret')
+        ingredients = [
+            Ingredient.objects.create(name=f'Ingredient {i}', unit='g', cost_per_unit='0.50')
+            for i in range(4)
+        ]
+        dishes = []
+        for c in range(3):
+            category = Category.objects.create(name=f'Category {c}')
+            for d in range(3):
+                dish = Dish.objects.create(
+                    name=f'Dish {c}-{d}', description='', price='9.50',
+                    category=category, preparation_time=10,
+                )
+                for ingredient in ingredients:
+                    DishIngredient.objects.create(dish=dish, ingredient=ingredient, quantity=1)
+                dishes.append(dish)
+        for n in range(20):
+            table = Table.objects.create(number=n + 1, capacity=4)
+            order = Order.objects.create(table=table, waiter=cls.user)
+            for dish in dishes[n % 3::3]:
+                OrderItem.objects.create(order=order, dish=dish, quantity=2)
+        cls.order = order
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def test_list_within_budget(self):
+        with self.assertQueryBudget(self.LIST_BUDGET):
+            response = self.client.get(f'/api/orders/orders/?{self.FULL_GRAPH}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 20)
+
+    def test_retrieve_within_budget(self):
+        with self.assertQueryBudget(self.DETAIL_BUDGET):
+            response = self.client.get(f'/api/orders/orders/{self.order.pk}/?{self.FULL_GRAPH}')
+        self.assertEqual(response.status_code, 200)
+        ingredients = response.data['items'][0]['dish']['ingredients']
+        self.assertEqual(len(ingredients), 4)
+        self.assertEqual(ingredients[0]['ingredient']['cost_per_unit'], '0.50')
+
+    def test_relations_default_to_ids(self):
+        # Unexpanded relations are neither serialized nor loaded
+        with self.assertQueryBudget(2):
+            response = self.client.get('/api/orders/orders/')
+        order = response.data['results'][0]
+        self.assertIsInstance(order['table'], int)
+        self.assertTrue(all(isinstance(item, int) for item in order['items']))
+
+    def test_cursor_pages_are_stable_and_skip_count(self):
+        seen = []
+        url = '/api/orders/orders/?fields=id&include_total=true&page_size=7'
+        while url:
+            with self.assertQueryBudget(3):
+                response = self.client.get(url)
+            self.assertEqual(response.data['approximate_count'], 20)
+            seen.extend(order['id'] for order in response.data['results'])
+            url = response.data['next']
+        # Orders share created_at timestamps closely; the id tie-breaker keeps pages disjoint
+        self.assertEqual(seen, sorted(Order.objects.values_list('id', flat=True), reverse=True))
+
+    def test_sparse_fieldset(self):
+        response = self.client.get(
+            f'/api/orders/orders/{self.order.pk}/?fields=id,items.dish.name&expand=items.dish'
+        )
+        self.assertEqual(set(response.data), {'id', 'items'})
+        self.assertEqual(set(response.data['items'][0]), {'dish'})
+        self.assertEqual(set(response.data['items'][0]['dish']), {'name'})
+
+
+class OrderFixtureMixin:
+    """One pending order and a dish to put on it."""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Mains')
+        cls.dish = Dish.objects.create(
+            name='Risotto', description='', price='12.50', category=category, preparation_time=20,
+        )
+        cls.order = Order.objects.create()
+
+
+class OrderTotalsTests(OrderFixtureMixin, APITestCase):
+    def test_totals_follow_item_writes(self):
+        item = OrderItem.objects.create(order=self.order, dish=self.dish, quantity=2)
+        OrderItem.objects.create(order=self.order, dish=self.dish, quantity=1)
+        self.order.refresh_from_db()
+        self.assertEqual((self.order.subtotal, self.order.item_count), (Decimal('37.50'), 3))
+
+        item.quantity = 4
+        item.save()
+        self.order.refresh_from_db()
+        self.assertEqual((self.order.subtotal, self.order.item_count), (Decimal('62.50'), 5))
+
+        item.delete()
+        self.order.refresh_from_db()
+        self.assertEqual((self.order.subtotal, self.order.item_count), (Decimal('12.50'), 1))
+
+    def test_stale_order_save_keeps_totals(self):
+        order = Order.objects.get(pk=self.order.pk)
+        OrderItem.objects.create(order=self.order, dish=self.dish, quantity=2)
+        order.notes = 'Window seat'
+        order.save()
+        order.refresh_from_db()
+        self.assertEqual((order.subtotal, order.item_count, order.notes), (Decimal('25.00'), 2, 'Window seat'))
+
+    def test_reconcile_repairs_drift(self):
+        OrderItem.objects.create(order=self.order, dish=self.dish, quantity=2)
+        Order.objects.filter(pk=self.order.pk).update(subtotal=0, item_count=0)
+        self.assertEqual(Order.objects.drifted().count(), 1)
+
+        call_command('reconcile_order_totals', stdout=StringIO())
+        self.order.refresh_from_db()
+        self.assertEqual((self.order.subtotal, self.order.item_count), (Decimal('25.00'), 2))
+
+    def test_add_items_inserts_valid_lines_and_reports_failures(self):
+        user = User.objects.create_user(username='runner', password='secret')
+        self.client.force_authenticate(user)
+        response = self.client.post(f'/api/orders/orders/{self.order.pk}/add_items/', {
+            'items': [
+                {'dish_id': self.dish.pk, 'quantity': 2, 'notes': 'no cheese'},
+                {'dish_id': 999999},
+                {'dish_id': self.dish.pk, 'quantity': 0},
+                {'dish_id': self.dish.pk},
+            ],
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual([e['index'] for e in response.data['errors']], [1, 2])
+        self.assertEqual(response.data['order']['item_count'], 3)
+        self.assertEqual(response.data['order']['subtotal'], '37.50')
+
+
+class OrderTransitionTests(OrderFixtureMixin, APITestCase):
+    def test_bulk_transition_only_moves_allowed_rows(self):
+        user = User.objects.create_user(username='expo', password='secret')
+        self.client.force_authenticate(user)
+        served = Order.objects.create(status='served')
+        response = self.client.post('/api/orders/orders/transition/', {
+            'ids': [self.order.pk, served.pk], 'status': 'confirmed',
+        }, format='json')
+        self.assertEqual(response.data['updated'], [self.order.pk])
+        self.assertEqual(response.data['rejected'], [{'id': served.pk, 'status': 'served'}])
+
+        items = [OrderItem.objects.create(order=self.order, dish=self.dish) for _ in range(3)]
+        with self.assertNumQueries(4):
+            moved = transition_items('preparing', order_ids=[self.order.pk], expected='pending')
+        self.assertEqual(sorted(moved), [item.pk for item in items])
+        self.assertEqual(transition_items('served', order_ids=[self.order.pk]), [])
+
+        response = self.client.patch(f'/api/orders/orders/{self.order.pk}/', {'status': 'pending'}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class PaymentIdempotencyTests(OrderFixtureMixin, APITestCase):
+    def test_payment_retry_replays_stored_response(self):
+        user = User.objects.create_user(username='cashier', password='secret')
+        self.client.force_authenticate(user)
+        OrderItem.objects.create(order=self.order, dish=self.dish, quantity=1)
+        url = f'/api/orders/orders/{self.order.pk}/make_payment/'
+        payload = {'amount': '12.50', 'method': 'card', 'transaction_id': 'tx-1'}
+
+        first = self.client.post(url, payload, format='json', HTTP_IDEMPOTENCY_KEY='abc')
+        self.assertEqual(first.status_code, 201)
+        with CaptureQueriesContext(connection) as queries:
+            retry = self.client.post(url, payload, format='json', HTTP_IDEMPOTENCY_KEY='abc')
+        self.assertFalse(any('orders_payment' in query['sql'] for query in queries))
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(Payment.objects.filter(order=self.order).count(), 1)
+
+        mismatch = self.client.post(url, dict(payload, amount='1.00'), format='json', HTTP_IDEMPOTENCY_KEY='abc')
+        self.assertEqual(mismatch.status_code, 422)
+        duplicate = self.client.post(url, payload, format='json')
+        self.assertEqual(duplicate.status_code, 400)
+
+    def test_expired_keys_are_not_replayed_and_get_purged(self):
+        user = User.objects.create_user(username='cashier', password='secret')
+        self.client.force_authenticate(user)
+        payload = {'amount': '12.50', 'method': 'card', 'transaction_id': 'tx-1'}
+        first = self.client.post(
+            f'/api/orders/orders/{self.order.pk}/make_payment/', payload, format='json', HTTP_IDEMPOTENCY_KEY='abc',
+        )
+        self.assertEqual(first.status_code, 201)
+        expired = timezone.now() - timedelta(hours=settings.IDEMPOTENCY_KEY_RETENTION_HOURS, minutes=1)
+        IdempotencyKey.objects.update(created_at=expired)
+
+        other = Order.objects.create()
+        response = self.client.post(
+            f'/api/orders/orders/{other.pk}/make_payment/', dict(payload, transaction_id='tx-2'),
+            format='json', HTTP_IDEMPOTENCY_KEY='abc',
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn('Idempotent-Replayed', response)
+        self.assertEqual(IdempotencyKey.objects.get(key='abc').response_body, response.data)
+
+        IdempotencyKey.objects.create(
+            scope='make_payment', key='old', request_fingerprint='', response_status=201, response_body={},
+        )
+        IdempotencyKey.objects.filter(key='old').update(created_at=expired)
+        out = StringIO()
+        call_command('purge_idempotency_keys', stdout=out)
+        self.assertIn('Purged 1 expired', out.getvalue())
+        self.assertEqual(list(IdempotencyKey.objects.values_list('key', flat=True)), ['abc'])
+
+
+class EventBrokerTests(TestCase):
+    def test_resume_and_eviction(self):
+        broker = EventBroker(history=3)
+        for n in range(5):
+            broker.publish({'type': 'order', 'id': n, 'status': 'pending'})
+
+        events, complete = broker.events_since(3)
+        self.assertTrue(complete)
+        self.assertEqual([e['seq'] for e in events], [4, 5])
+
+        events, complete = broker.events_since(1)
+        self.assertFalse(complete)
+        self.assertEqual([e['seq'] for e in events], [3, 4, 5])
+
+        self.assertEqual(broker.events_since(5), ([], True))
+
+    def test_sequence_from_before_restart_forces_resync(self):
+        broker = EventBroker()
+        self.assertEqual(broker.events_since(0), ([], True))
+        self.assertEqual(broker.events_since(40), ([], False))
+        broker.publish({'type': 'order', 'id': 1, 'status': 'pending'})
+        events, complete = broker.events_since(40)
+        self.assertFalse(complete)
+        self.assertEqual([e['seq'] for e in events], [1])
+
+    def test_waiters_are_woken_by_publish(self):
+        broker = EventBroker()
+
+        async def subscribe():
+            waiting = asyncio.ensure_future(broker.wait(0, timeout=5))
+            await asyncio.sleep(0)
+            await asyncio.get_running_loop().run_in_executor(
+                None, broker.publish, {'type': 'item', 'id': 1, 'status': 'ready'}
+            )
+            return await waiting
+
+        self.assertTrue(asyncio.run(subscribe()))
+
+    def test_subscription_filters(self):
+        subscription = Subscription(types={'item'}, statuses={'ready'}, stations={'2'})
+        self.assertTrue(subscription.matches({'type': 'item', 'status': 'ready', 'station': 2}))
+        self.assertFalse(subscription.matches({'type': 'item', 'status': 'pending', 'station': 2}))
+        self.assertFalse(subscription.matches({'type': 'order', 'status': 'ready'}))
+
+
+class OrderEventStreamTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.token = Token.objects.get(user=User.objects.create_user(username='screen', password='secret'))
+
+    async def read_events(self, response, count):
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        chunks = aiter(response.streaming_content)
+        self.assertEqual(await anext(chunks), b'retry: 3000\n\n')
+        events = []
+        for _ in range(count):
+            lines = (await anext(chunks)).decode().splitlines()
+            events.append(json.loads(lines[2][len('data: '):]))
+        await chunks.aclose()
+        return events
+
+    async def test_unauthenticated_stream_is_rejected(self):
+        response = await self.async_client.get('/api/orders/stream/')
+        self.assertEqual(response.status_code, 401)
+        response = await self.async_client.get('/api/orders/stream/', {'token': 'not-a-token'})
+        self.assertEqual(response.status_code, 401)
+
+    async def test_reconnect_replays_only_missed_events(self):
+        seen = broker.publish({'type': 'order', 'id': 1, 'status': 'confirmed'})['seq']
+        broker.publish({'type': 'order', 'id': 1, 'status': 'preparing'})
+        broker.publish({'type': 'item', 'id': 7, 'status': 'ready', 'station': 3})
+        response = await self.async_client.get(
+            '/api/orders/stream/', {'token': self.token.key}, headers={'Last-Event-ID': str(seen)},
+        )
+        self.assertEqual(response.status_code, 200)
+        events = await self.read_events(response, 2)
+        self.assertEqual([event['seq'] for event in events], [seen + 1, seen + 2])
+        self.assertEqual([event['status'] for event in events], ['preparing', 'ready'])
+
+        response = await self.async_client.get(
+            '/api/orders/stream/', {'token': self.token.key, 'since': seen - 1, 'station': '3'},
+        )
+        self.assertEqual([event['id'] for event in await self.read_events(response, 1)], [7])
+
+
+class OrderIndexTests(IndexUsageMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        tables = Table.objects.bulk_create(Table(number=n, capacity=4) for n in range(1, 21))
+        waiters = [User.objects.create_user(username=f'waiter{n}') for n in range(5)]
+        statuses = [choice for choice, _ in Order.STATUS_CHOICES]
+        orders = Order.objects.bulk_create(
+            Order(table=tables[n % 20], waiter=waiters[n % 5], status=statuses[n % len(statuses)])
+            for n in range(2000)
+        )
+        methods = [choice for choice, _ in Payment.METHOD_CHOICES]
+        Payment.objects.bulk_create(
+            Payment(order=order, amount='20.00', method=methods[n % 3])
+            for n, order in enumerate(orders[:1500])
+        )
+        cls.table, cls.waiter = tables[0], waiters[0]
+
+    def test_order_list_paths(self):
+        ordering = ('-created_at', '-id')
+        self.assertUsesIndex(Order.objects.order_by(*ordering)[:20])
+        self.assertUsesIndex(Order.objects.filter(status='pending').order_by(*ordering)[:20])
+        self.assertUsesIndex(Order.objects.filter(table=self.table).order_by(*ordering)[:20])
+        self.assertUsesIndex(Order.objects.filter(waiter=self.waiter).order_by(*ordering)[:20])
+
+    def test_payment_list_paths(self):
+        ordering = ('-timestamp', '-id')
+        self.assertUsesIndex(Payment.objects.order_by(*ordering)[:20])
+        self.assertUsesIndex(Payment.objects.filter(method='card').order_by(*ordering)[:20])
+
+
+class KitchenSchedulerTests(SimpleTestCase):
+    def setUp(self):
+        self.now = 0.0
+        self.kitchen = KitchenScheduler(clock=lambda: self.now)
+        self.kitchen.load([])
+
+    def fire_times(self, station=None):
+        return {
+            item['item']: item['fire_at'].timestamp()
+            for item in self.kitchen.queue(station=station)['queued']
+        }
+
+    def test_ticket_items_finish_together(self):
+        self.kitchen.add(1, 10, 'grill', 5, 20)
+        self.kitchen.add(2, 10, 'cold', 6, 5)
+        self.assertEqual(self.fire_times(), {1: 0, 2: 15 * 60})
+
+        # A slower item added later pushes the rest of the ticket back
+        self.now = 60
+        self.kitchen.add(3, 10, 'grill', 7, 30)
+        self.assertEqual(self.fire_times(), {3: 60, 1: 11 * 60, 2: 26 * 60})
+        self.assertEqual(list(self.fire_times('grill')), [3, 1])
+
+    def test_bump_and_remove(self):
+        self.kitchen.add(1, 10, 'grill', 5, 20)
+        self.kitchen.add(2, 10, 'cold', 6, 5)
+        self.kitchen.set_status(1, 'preparing')
+        queue = self.kitchen.queue()
+        self.assertEqual([item['item'] for item in queue['in_progress']], [1])
+        self.assertEqual([item['item'] for item in queue['queued']], [2])
+
+        self.kitchen.set_status(1, 'ready')
+        self.kitchen.remove_order(10)
+        self.assertEqual(self.kitchen.queue(), {'queued': [], 'in_progress': []})
+
+
+class KitchenQueueTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='expo', password='secret')
+        category = Category.objects.create(name='Grill')
+        cls.dish = Dish.objects.create(
+            name='Steak', description='', price='24.00', category=category, preparation_time=15,
+        )
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+        # The scheduler is process-wide; reload it from this test's data and drop it afterwards
+        scheduler.loaded = False
+        self.addCleanup(setattr, scheduler, 'loaded', False)
+
+    def queued_orders(self):
+        return {item['order'] for item in self.client.get('/api/orders/orders/kitchen/').data['queued']}
+
+    def test_closed_orders_leave_the_queue(self):
+        paid, cancelled, open_order = (Order.objects.create() for _ in range(3))
+        for order in (paid, cancelled, open_order):
+            OrderItem.objects.create(order=order, dish=self.dish)
+        self.assertEqual(self.queued_orders(), {paid.pk, cancelled.pk, open_order.pk})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            for order, new_status in ((paid, 'paid'), (cancelled, 'cancelled')):
+                order.status = new_status
+                order.save()
+        self.assertEqual(self.queued_orders(), {open_order.pk})
+
+    def test_negative_limit_is_rejected(self):
+        response = self.client.get('/api/orders/orders/kitchen/', {'limit': -1})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.get('/api/orders/orders/kitchen/', {'limit': 0}).status_code, 200)
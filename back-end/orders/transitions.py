@@ -0,0 +1,85 @@
+from django.db import transaction
+from django.utils import timezone
+from .events import item_delta, order_delta, publish_on_commit
+from .models import Order, OrderItem
+from .signals import order_item_status_changed, order_status_changed
+
+# Allowed status edges; an order may be settled at any point before it is cancelled
+ORDER_TRANSITIONS = {
+    'pending': ('confirmed', 'paid', 'cancelled'),
+    'confirmed': ('preparing', 'paid', 'cancelled'),
+    'preparing': ('ready', 'paid', 'cancelled'),
+    'ready': ('served', 'paid'),
+    'served': ('paid',),
+    'paid': (),
+    'cancelled': (),
+}
+
+ITEM_TRANSITIONS = {
+    'pending': ('preparing',),
+    'preparing': ('ready',),
+    'ready': ('served',),
+    'served': (),
+}
+
+
+class TransitionError(ValueError):
+    pass
+
+
+def can_transition(transitions, current, target):
+    return current == target or target in transitions.get(current, ())
+
+
+def sources_for(transitions, target):
+    return [source for source, targets in transitions.items() if target in targets]
+
+
+def _transition(queryset, transitions, target, expected, signal, to_delta, extra_updates):
+    if target not in transitions:
+        raise TransitionError(f"Unknown status '{target}'")
+    sources = sources_for(transitions, target)
+    if expected is not None:
+        if expected not in sources:
+            raise TransitionError(f"Cannot move from '{expected}' to '{target}'")
+        sources = [expected]
+
+    with transaction.atomic():
+        # Lock the candidates so the reported ids match what the UPDATE changes;
+        # the status condition on the UPDATE itself is what prevents lost updates
+        candidates = list(queryset.select_for_update(of=('self',)).filter(status__in=sources))
+        moved_ids = [row.pk for row in candidates]
+        if moved_ids:
+            queryset.model.objects.filter(pk__in=moved_ids, status__in=sources).update(
+                status=target, **extra_updates
+            )
+            previous = {}
+            for row in candidates:
+                previous[row.pk] = row.status
+                row.status = target
+            signal.send(sender=queryset.model, ids=moved_ids, status=target, previous=previous)
+            publish_on_commit(*(to_delta(row) for row in candidates))
+    return moved_ids
+
+
+def transition_orders(ids, target, expected=None):
+    """
+    Move the given orders to ``target`` with one conditional UPDATE.
+    Returns the ids that moved; the others were not in an allowed source status.
+    """
+    return _transition(
+        Order.objects.filter(pk__in=ids).only('id', 'status', 'table_id'),
+        ORDER_TRANSITIONS, target, expected, order_status_changed, order_delta,
+        {'updated_at': timezone.now()},
+    )
+
+
+def transition_items(target, ids=(), order_ids=(), expected=None):
+    """Move order items, selected by id and/or by whole ticket, to ``target``."""
+    queryset = OrderItem.objects.select_related('dish').only(
+        'id', 'status', 'order_id', 'dish__category_id'
+    )
+    return _transition(
+        queryset.filter(pk__in=ids) | queryset.filter(order_id__in=order_ids),
+        ITEM_TRANSITIONS, target, expected, order_item_status_changed, item_delta, {},
+    )
@@ -1,11 +1,13 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import OrderViewSet, PaymentViewSet
+from .streams import order_event_stream
 
 router = DefaultRouter()
 router.register(r'orders', OrderViewSet)
 router.register(r'payments', PaymentViewSet)
 
 urlpatterns = [
+    path('stream/', order_event_stream, name='order-event-stream'),
     path('', include(router.urls)),
 ]
\ No newline at end of file
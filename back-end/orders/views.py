@@ -3,19 +3,39 @@ from rest_framework.response import Response
 from rest_framework.decorators import action
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters
-from .models import Order, OrderItem, Payment
+from django.db import IntegrityError, transaction
+from menu.models import Dish
+from .models import IdempotencyKey, Order, OrderItem, Payment
 from .serializers import OrderSerializer, OrderItemSerializer, PaymentSerializer
+from .events import item_delta, publish_on_commit
+from .kitchen import get_scheduler, schedule_on_commit
+from .signals import order_items_created
+from .transitions import (
+    ORDER_TRANSITIONS, TransitionError, can_transition, transition_items, transition_orders,
+)
+from restaurant_management.pagination import LedgerCursorPagination
+from restaurant_management.prefetch import PrefetchPlanMixin
+import hashlib
+import json
 import logging
 
 logger = logging.getLogger(__name__)
 
-class OrderViewSet(viewsets.ModelViewSet):
+class OrderViewSet(PrefetchPlanMixin, viewsets.ModelViewSet):
     queryset = Order.objects.all()
     serializer_class = OrderSerializer
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = ['status', 'table', 'waiter']
+    filterset_fields = {
+        'status': ['exact'],
+        'table': ['exact'],
+        'waiter': ['exact'],
+        'subtotal': ['exact', 'gte', 'lte'],
+        'item_count': ['exact', 'gte', 'lte'],
+    }
     search_fields = ['notes']
-    ordering_fields = ['created_at', 'updated_at']
+    ordering_fields = ['created_at', 'updated_at', 'subtotal', 'item_count']
+    ordering = ('-created_at', '-id')
+    pagination_class = LedgerCursorPagination
     
     @action(detail=True, methods=['post'])
     def add_item(self, request, pk=None):
@@ -29,7 +49,6 @@ class OrderViewSet(viewsets.ModelViewSet):
                            status=status.HTTP_400_BAD_REQUEST)
         
         try:
-            from menu.models import Dish
             dish = Dish.objects.get(id=dish_id)
         except Dish.DoesNotExist:
             return Response({'error': 'Dish not found'}, 
@@ -45,6 +64,128 @@ class OrderViewSet(viewsets.ModelViewSet):
         serializer = OrderItemSerializer(order_item)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
     
+    @action(detail=True, methods=['post'])
+    def add_items(self, request, pk=None):
+        order = self.get_object()
+        lines = request.data.get('items')
+        
+        if not isinstance(lines, list) or not lines:
+            return Response({'error': 'A non-empty list of items is required'}, 
+                           status=status.HTTP_400_BAD_REQUEST)
+        
+        errors = []
+        valid_lines = []
+        for index, line in enumerate(lines):
+            if not isinstance(line, dict) or not line.get('dish_id'):
+                errors.append({'index': index, 'error': 'Dish ID is required'})
+                continue
+            try:
+                dish_id = int(line['dish_id'])
+            except (TypeError, ValueError):
+                errors.append({'index': index, 'error': 'Invalid dish ID'})
+                continue
+            try:
+                quantity = int(line.get('quantity', 1))
+            except (TypeError, ValueError):
+                quantity = 0
+            if quantity < 1:
+                errors.append({'index': index, 'error': 'Quantity must be a positive integer'})
+                continue
+            valid_lines.append((index, dish_id, quantity, line.get('notes', '')))
+        
+        # Validate every referenced dish in a single query
+        dishes = Dish.objects.in_bulk({dish_id for _, dish_id, _, _ in valid_lines})
+        new_items = []
+        for index, dish_id, quantity, notes in valid_lines:
+            dish = dishes.get(dish_id)
+            if dish is None:
+                errors.append({'index': index, 'error': 'Dish not found'})
+                continue
+            new_items.append(OrderItem(
+                order=order,
+                dish=dish,
+                quantity=quantity,
+                notes=notes
+            ))
+        
+        if not new_items:
+            return Response({'errors': sorted(errors, key=lambda e: e['index'])}, 
+                           status=status.HTTP_400_BAD_REQUEST)
+        
+        # bulk_create skips OrderItem.save and post_save, so refresh the stored
+        # totals and publish the kitchen deltas explicitly
+        with transaction.atomic():
+            OrderItem.objects.bulk_create(new_items)
+            Order.objects.filter(pk=order.pk).refresh_totals()
+            publish_on_commit(*(item_delta(item) for item in new_items))
+            schedule_on_commit(new_items)
+            order_items_created.send(sender=OrderItem, order_ids=[order.pk])
+        
+        order = self.get_queryset().get(pk=order.pk)
+        return Response({
+            'order': self.get_serializer(order).data,
+            'created': len(new_items),
+            'errors': sorted(errors, key=lambda e: e['index']),
+        }, status=status.HTTP_201_CREATED)
+    
+    @action(detail=False, methods=['post'])
+    def transition(self, request):
+        kind = request.data.get('type', 'order')
+        target = request.data.get('status')
+        expected = request.data.get('from')
+        ids = request.data.get('ids') or []
+        order_ids = request.data.get('order_ids') or []
+        
+        if kind not in ('order', 'item'):
+            return Response({'error': "Type must be 'order' or 'item'"}, 
+                           status=status.HTTP_400_BAD_REQUEST)
+        if not target:
+            return Response({'error': 'Target status is required'}, 
+                           status=status.HTTP_400_BAD_REQUEST)
+        try:
+            ids = [int(pk) for pk in ids]
+            order_ids = [int(pk) for pk in order_ids]
+        except (TypeError, ValueError):
+            ids = order_ids = []
+        if not (ids or order_ids):
+            return Response({'error': 'A list of ids is required'}, 
+                           status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            if kind == 'order':
+                moved = transition_orders(ids, target, expected=expected)
+                current = dict(Order.objects.filter(pk__in=ids).values_list('pk', 'status'))
+            else:
+                moved = transition_items(target, ids=ids, order_ids=order_ids, expected=expected)
+                current = dict(
+                    (OrderItem.objects.filter(pk__in=ids) | OrderItem.objects.filter(order_id__in=order_ids))
+                    .values_list('pk', 'status')
+                )
+        except TransitionError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        moved_set = set(moved)
+        rejected = [
+            {'id': pk, 'status': current.get(pk)}
+            for pk in sorted(set(current) | set(ids)) if pk not in moved_set
+        ]
+        return Response({'status': target, 'updated': sorted(moved), 'rejected': rejected})
+    
+    @action(detail=False, methods=['get'])
+    def kitchen(self, request):
+        station = request.query_params.get('station')
+        limit = request.query_params.get('limit')
+        try:
+            station = int(station) if station else None
+            limit = int(limit) if limit else None
+        except ValueError:
+            return Response({'error': 'Station and limit must be integers'}, 
+                           status=status.HTTP_400_BAD_REQUEST)
+        if limit is not None and limit < 0:
+            return Response({'error': 'Limit must not be negative'}, 
+                           status=status.HTTP_400_BAD_REQUEST)
+        return Response(get_scheduler().queue(station=station, limit=limit))
+    
     @action(detail=True, methods=['post'])
     def make_payment(self, request, pk=None):
         order = self.get_object()
@@ -66,29 +207,72 @@ class OrderViewSet(viewsets.ModelViewSet):
             return Response({'error': 'Transaction ID is required'}, 
                            status=status.HTTP_400_BAD_REQUEST)
         
-        # Check if payment already exists
-        if Payment.objects.filter(order=order).exists():
-            return Response({'error': 'Payment already processed for this order'}, 
-                           status=status.HTTP_400_BAD_REQUEST)
+        idempotency_key = request.headers.get('Idempotency-Key')
+        fingerprint = hashlib.sha256(
+            json.dumps([order.pk, str(amount), method, transaction_id]).encode()
+        ).hexdigest()
         
-        payment = Payment.objects.create(
-            order=order,
-            amount=amount,
-            method=method,
-            transaction_id=transaction_id
-        )
+        if idempotency_key:
+            replay = self._replay_payment(idempotency_key, fingerprint)
+            if replay is not None:
+                return replay
         
-        # Update order status to paid
-        order.status = 'paid'
-        order.save()
+        # Payment creation, the status change and the stored idempotent response
+        # commit together; the one-to-one constraint rejects a second payment
+        try:
+            with transaction.atomic():
+                order = Order.objects.select_for_update().get(pk=order.pk)
+                if order.status != 'paid' and not can_transition(ORDER_TRANSITIONS, order.status, 'paid'):
+                    return Response({'error': f"Cannot take payment for a {order.status} order"}, 
+                                   status=status.HTTP_400_BAD_REQUEST)
+                payment = Payment.objects.create(
+                    order=order,
+                    amount=amount,
+                    method=method,
+                    transaction_id=transaction_id
+                )
+                
+                # Update order status to paid
+                transition_orders([order.pk], 'paid')
+                
+                data = PaymentSerializer(payment, context=self.get_serializer_context()).data
+                if idempotency_key:
+                    # An expired key not purged yet may be reused like a fresh one
+                    IdempotencyKey.objects.expired().filter(scope='make_payment', key=idempotency_key).delete()
+                    IdempotencyKey.objects.create(
+                        scope='make_payment',
+                        key=idempotency_key,
+                        request_fingerprint=fingerprint,
+                        response_status=status.HTTP_201_CREATED,
+                        response_body=data,
+                    )
+        except IntegrityError:
+            # A concurrent retry with the same key may have won the race
+            if idempotency_key:
+                replay = self._replay_payment(idempotency_key, fingerprint)
+                if replay is not None:
+                    return replay
+            return Response({'error': 'Payment already processed for this order'}, 
+                           status=status.HTTP_400_BAD_REQUEST)
         
-        serializer = PaymentSerializer(payment)
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
+        return Response(data, status=status.HTTP_201_CREATED)
+    
+    def _replay_payment(self, idempotency_key, fingerprint):
+        stored = IdempotencyKey.objects.live().filter(scope='make_payment', key=idempotency_key).first()
+        if stored is None:
+            return None
+        if stored.request_fingerprint != fingerprint:
+            return Response({'error': 'Idempotency-Key was already used for a different request'}, 
+                           status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+        return Response(stored.response_body, status=stored.response_status, 
+                        headers={'Idempotent-Replayed': 'true'})
 
-class PaymentViewSet(viewsets.ModelViewSet):
+class PaymentViewSet(PrefetchPlanMixin, viewsets.ModelViewSet):
     queryset = Payment.objects.all()
     serializer_class = PaymentSerializer
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['order', 'method']
     search_fields = ['transaction_id']
-    ordering_fields = ['timestamp']
\ No newline at end of file
+    ordering_fields = ['timestamp']
+    ordering = ('-timestamp', '-id')
+    pagination_class = LedgerCursorPagination
\ No newline at end of file
@@ -1,15 +1,18 @@
 from rest_framework import serializers
+from restaurant_management.serializers import FlexFieldsMixin
 from .models import DailySales, PopularDish
 from menu.serializers import DishSerializer
 
-class DailySalesSerializer(serializers.ModelSerializer):
+class DailySalesSerializer(FlexFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = DailySales
         fields = '__all__'
 
-class PopularDishSerializer(serializers.ModelSerializer):
-    dish = DishSerializer(read_only=True)
-    
+class PopularDishSerializer(FlexFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = PopularDish
-        fields = '__all__'
\ No newline at end of file
+        fields = '__all__'
+        read_only_fields = ('dish',)
+        expandable_fields = {
+            'dish': (DishSerializer, {}),
+        }
\ No newline at end of file
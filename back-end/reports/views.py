@@ -2,6 +2,7 @@ from rest_framework import viewsets, filters
 from django_filters.rest_framework import DjangoFilterBackend
 from .models import DailySales, PopularDish
 from .serializers import DailySalesSerializer, PopularDishSerializer
+from restaurant_management.prefetch import PrefetchPlanMixin
 
 class DailySalesViewSet(viewsets.ModelViewSet):
     queryset = DailySales.objects.all()
@@ -10,7 +11,7 @@ class DailySalesViewSet(viewsets.ModelViewSet):
     filterset_fields = ['date']
     ordering_fields = ['date', 'total_orders', 'total_revenue']
 
-class PopularDishViewSet(viewsets.ModelViewSet):
+class PopularDishViewSet(PrefetchPlanMixin, viewsets.ModelViewSet):
     queryset = PopularDish.objects.all()
     serializer_class = PopularDishSerializer
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
@@ -0,0 +1,162 @@
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from PIL import Image, ImageOps
+from rest_framework import serializers
+
+logger = logging.getLogger(__name__)
+
+# Rendition name -> (longest edge in pixels, Pillow format, file extension)
+DEFAULT_VARIANTS = {
+    'thumbnail': (320, 'JPEG', 'jpg'),
+    'medium': (1024, 'JPEG', 'jpg'),
+    'webp': (1024, 'WEBP', 'webp'),
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_variants():
+    return getattr(settings, 'IMAGE_VARIANTS', DEFAULT_VARIANTS)
+
+
+def variant_name(name, variant):
+    """
+    Storage name of a rendition, derived from the original so it needs no
+    database column. The original's full file name is kept, extension
+    included, so ``x.jpg`` and ``x.png`` never share (and overwrite) an
+    immutably cached rendition.
+    """
+    _, _, extension = get_variants()[variant]
+    directory, filename = os.path.split(name)
+    return os.path.join('variants', directory, f'{filename}.{variant}.{extension}')
+
+
+def variant_urls(file):
+    """``{variant: url}`` for an image field file, or None when the field is empty."""
+    if not file:
+        return None
+    return {variant: file.storage.url(variant_name(file.name, variant)) for variant in get_variants()}
+
+
+def generate_variants(name, storage=default_storage, overwrite=True):
+    """
+    Render every configured variant of the stored image ``name``. Existing
+    renditions are replaced, or skipped when ``overwrite`` is False. Returns
+    the names written.
+    """
+    variants = get_variants()
+    targets = {variant: variant_name(name, variant) for variant in variants}
+    if not overwrite:
+        targets = {variant: target for variant, target in targets.items() if not storage.exists(target)}
+    if not targets:
+        return []
+
+    with storage.open(name, 'rb') as original:
+        image = ImageOps.exif_transpose(Image.open(original))
+        image.load()
+
+    written = []
+    for variant, target in targets.items():
+        size, image_format, _ = variants[variant]
+        rendition = image.copy()
+        rendition.thumbnail((size, size), Image.Resampling.LANCZOS)
+        if image_format == 'JPEG' and rendition.mode not in ('RGB', 'L'):
+            rendition = rendition.convert('RGB')
+        buffer = BytesIO()
+        rendition.save(buffer, image_format, quality=82, optimize=image_format == 'JPEG')
+        if storage.exists(target):
+            storage.delete(target)
+        written.append(storage.save(target, ContentFile(buffer.getvalue())))
+    return written
+
+
+def delete_variants(name, storage=default_storage):
+    """Remove the stored renditions of ``name``, e.g. once the original was replaced."""
+    for variant in get_variants():
+        target = variant_name(name, variant)
+        if storage.exists(target):
+            storage.delete(target)
+
+
+def get_executor():
+    """Process-wide worker pool for rendering variants outside the request cycle."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'IMAGE_VARIANT_WORKERS', 2),
+                    thread_name_prefix='image-variants',
+                )
+    return _executor
+
+
+def _generate_logged(name, storage):
+    try:
+        return generate_variants(name, storage)
+    except Exception:
+        logger.exception('Could not generate variants for %s', name)
+
+
+def generate_variants_on_commit(file):
+    """Queue variant generation for ``file`` on the worker pool once the transaction commits."""
+    name, storage = file.name, file.storage
+    if getattr(settings, 'IMAGE_VARIANTS_SYNC', False):
+        transaction.on_commit(lambda: _generate_logged(name, storage))
+    else:
+        transaction.on_commit(lambda: get_executor().submit(_generate_logged, name, storage))
+
+
+def track_image_field(model, field_name):
+    """
+    Connect signals that render variants whenever ``model.<field_name>`` gets
+    a new file, and delete the renditions of the file it replaced or of the
+    deleted instance once the transaction commits.
+    """
+    loaded_attr = f'_loaded_{field_name}'
+
+    def remember_loaded_image(sender, instance=None, **kwargs):
+        value = instance.__dict__.get(field_name)
+        setattr(instance, loaded_attr, getattr(value, 'name', value))
+
+    def queue_image_variants(sender, instance=None, **kwargs):
+        file = getattr(instance, field_name)
+        previous = getattr(instance, loaded_attr, None)
+        if file and file.name != previous:
+            generate_variants_on_commit(file)
+        if previous and previous != (file.name if file else None):
+            storage = file.storage
+            transaction.on_commit(lambda: delete_variants(previous, storage))
+        setattr(instance, loaded_attr, file.name if file else None)
+
+    def drop_image_variants(sender, instance=None, **kwargs):
+        file = getattr(instance, field_name)
+        if file:
+            name, storage = file.name, file.storage
+            transaction.on_commit(lambda: delete_variants(name, storage))
+
+    uid = f'image-variants:{model._meta.label}.{field_name}'
+    post_init.connect(remember_loaded_image, sender=model, weak=False, dispatch_uid=uid)
+    post_save.connect(queue_image_variants, sender=model, weak=False, dispatch_uid=uid)
+    post_delete.connect(drop_image_variants, sender=model, weak=False, dispatch_uid=uid)
+
+
+class ImageVariantsField(serializers.ReadOnlyField):
+    """Read-only ``{variant: url}`` for an image field, absolute when a request is in context."""
+
+    def to_representation(self, value):
+        urls = variant_urls(value)
+        request = self.context.get('request')
+        if urls and request is not None:
+            urls = {variant: request.build_absolute_uri(url) for variant, url in urls.items()}
+        return urls
@@ -0,0 +1,15 @@
+from django.conf import settings
+from django.utils.cache import patch_cache_control
+from django.views.static import serve
+
+
+def serve_media(request, path, document_root=None):
+    """
+    Development media server with the caching production should mirror.
+    Stored names are never reused (uploads get a fresh name, variants derive
+    from it), so responses are safe to cache for MEDIA_CACHE_MAX_AGE.
+    """
+    response = serve(request, path, document_root=document_root or settings.MEDIA_ROOT)
+    if response.status_code == 200:
+        patch_cache_control(response, public=True, max_age=settings.MEDIA_CACHE_MAX_AGE, immutable=True)
+    return response
@@ -0,0 +1,56 @@
+from django.db import connections
+from rest_framework.pagination import CursorPagination
+
+
+def approximate_count(queryset):
+    """
+    Row estimate for ``queryset``. PostgreSQL answers from the planner
+    statistics without scanning; other backends fall back to ``COUNT(*)``.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return queryset.count()
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class LedgerCursorPagination(CursorPagination):
+    """
+    Keyset pagination for append-only, unbounded tables.
+
+    Pages are located by the timestamp of the last row seen instead of an
+    OFFSET, and no COUNT(*) is issued, so deep pages cost the same as the
+    first one. The view's ``ordering`` provides the default order and the
+    primary key is always appended as a tie-breaker. Pass
+    ``?include_total=true`` for an approximate row count.
+    """
+    ordering = ('-id',)
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    total_query_param = 'include_total'
+
+    def get_ordering(self, request, queryset, view):
+        ordering = list(super().get_ordering(request, queryset, view))
+        if not {'id', '-id', 'pk', '-pk'} & set(ordering):
+            ordering.append('-id' if ordering[0].startswith('-') else 'id')
+        return tuple(ordering)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.total = None
+        if request.query_params.get(self.total_query_param, '').lower() in ('1', 'true', 'yes'):
+            self.total = approximate_count(queryset)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        if self.total is not None:
+            response.data['approximate_count'] = self.total
+        return response
+
+    def get_paginated_response_schema(self, schema):
+        schema = super().get_paginated_response_schema(schema)
+        schema['properties']['approximate_count'] = {'type': 'integer', 'nullable': True}
+        return schema
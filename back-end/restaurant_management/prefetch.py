@@ -0,0 +1,57 @@
+from rest_framework import serializers
+
+
+def build_prefetch_plan(serializer, prefix='', through_many=False):
+    """
+    Walk a serializer's fields and return the ``(select_related, prefetch_related)``
+    lookups needed to render it without per-row queries.
+
+    Forward relations reached only through other forward relations are joined;
+    anything below a to-many relation is prefetched.
+    """
+    select_related = []
+    prefetch_related = []
+
+    if isinstance(serializer, serializers.ListSerializer):
+        serializer = serializer.child
+
+    for field in serializer.fields.values():
+        if field.write_only or field.source == '*':
+            continue
+
+        path = prefix + '__'.join(field.source_attrs)
+
+        if isinstance(field, serializers.ListSerializer):
+            prefetch_related.append(path)
+            _, nested = build_prefetch_plan(field.child, path + '__', through_many=True)
+            prefetch_related.extend(nested)
+        elif isinstance(field, serializers.BaseSerializer):
+            if through_many:
+                prefetch_related.append(path)
+                _, nested = build_prefetch_plan(field, path + '__', through_many=True)
+                prefetch_related.extend(nested)
+            else:
+                select_related.append(path)
+                joined, nested = build_prefetch_plan(field, path + '__')
+                select_related.extend(joined)
+                prefetch_related.extend(nested)
+        elif isinstance(field, serializers.ManyRelatedField):
+            prefetch_related.append(path)
+
+    return select_related, prefetch_related
+
+
+class PrefetchPlanMixin:
+    """
+    Apply the prefetch plan of the view's serializer to ``get_queryset()`` so
+    list and retrieve render in a fixed number of queries.
+    """
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        select_related, prefetch_related = build_prefetch_plan(self.get_serializer())
+        if select_related:
+            queryset = queryset.select_related(*select_related)
+        if prefetch_related:
+            queryset = queryset.prefetch_related(*prefetch_related)
+        return queryset
@@ -0,0 +1,72 @@
+from collections import defaultdict
+
+
+def split_paths(paths):
+    """Split dotted paths into the set of top-level names and their nested remainders."""
+    top = set()
+    nested = defaultdict(list)
+    for path in paths:
+        head, _, rest = path.partition('.')
+        if not head:
+            continue
+        top.add(head)
+        if rest:
+            nested[head].append(rest)
+    return top, nested
+
+
+def query_list(request, name):
+    if request is None:
+        return None
+    value = request.query_params.get(name)
+    if value is None:
+        return None
+    return [part.strip() for part in value.split(',') if part.strip()]
+
+
+class FlexFieldsMixin:
+    """
+    ModelSerializer mixin for sparse fieldsets and on-demand expansion.
+
+    Relations listed in ``Meta.expandable_fields`` render as primary keys
+    unless they are named in ``?expand=``; ``?fields=`` limits the output to
+    the listed fields. Both accept dotted paths for nested serializers, e.g.
+    ``?expand=items.dish&fields=id,status,items.dish.name``.
+
+    ``expandable_fields`` maps a field name to ``(serializer_class, kwargs)``.
+    """
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._requested_fields = fields
+        self._requested_expand = expand
+
+    def _flex_options(self):
+        if self._requested_expand is not None:
+            return self._requested_fields, self._requested_expand
+        # Root serializer: read the shape from the query string
+        request = self.context.get('request')
+        return query_list(request, 'fields'), query_list(request, 'expand') or []
+
+    def get_fields(self):
+        fields = super().get_fields()
+        requested, expand = self._flex_options()
+        expand_names, nested_expand = split_paths(expand)
+        nested_fields = {}
+        if requested is not None:
+            requested_names, nested_fields = split_paths(requested)
+            fields = {name: field for name, field in fields.items() if name in requested_names}
+
+        expandable = getattr(self.Meta, 'expandable_fields', {})
+        for name in expand_names & set(expandable):
+            if requested is not None and name not in fields:
+                continue
+            serializer_class, options = expandable[name]
+            if issubclass(serializer_class, FlexFieldsMixin):
+                options = dict(
+                    options,
+                    fields=nested_fields.get(name) or None,
+                    expand=nested_expand.get(name, []),
+                )
+            fields[name] = serializer_class(read_only=True, **options)
+        return fields
@@ -74,6 +74,18 @@ DATABASES = {
     }
 }
 
+# Cache
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# Menu read responses are cached under a version counter bumped on every menu
+# write; use a shared backend (Redis, Memcached) when running several workers
+MENU_CACHE_ALIAS = 'default'
+MENU_CACHE_TIMEOUT = 60 * 60
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -102,6 +114,14 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# Served with Cache-Control: public, immutable; the front web server should send the same
+MEDIA_CACHE_MAX_AGE = 60 * 60 * 24 * 365
+
+# Worker threads rendering image variants on upload (restaurant_management.images);
+# IMAGE_VARIANTS overrides the rendition table there
+IMAGE_VARIANT_WORKERS = 2
+# Render variants in the committing request instead of on the worker pool (tests, one-off scripts)
+IMAGE_VARIANTS_SYNC = False
 
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
@@ -123,6 +143,8 @@ REST_FRAMEWORK = {
         'rest_framework.filters.SearchFilter',
         'rest_framework.filters.OrderingFilter',
     ],
+    # Unbounded ledgers (orders, payments, stock transactions) opt into
+    # restaurant_management.pagination.LedgerCursorPagination per viewset
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
 }
@@ -131,4 +153,26 @@ REST_FRAMEWORK = {
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
     "http://127.0.0.1:3000",
-]
\ No newline at end of file
+]
+# Order status event stream (/api/orders/stream/), served through the ASGI application
+ORDER_EVENTS_HISTORY = 1000
+ORDER_EVENTS_HEARTBEAT = 15
+# Payment retries with the same Idempotency-Key are replayed for this long;
+# purge_idempotency_keys deletes older keys
+IDEMPOTENCY_KEY_RETENTION_HOURS = 24
+# Stock ledger rows older than this are rolled into daily checkpoints by compact_stock_ledger
+STOCK_LEDGER_RETENTION_DAYS = 90
+# Reorder alert polls repeat crossings stamped this long before the watermark,
+# so transactions that commit late are not skipped
+REORDER_ALERT_GRACE_SECONDS = 60
+# Reservations hold their table for this long; availability offers slots every
+# RESERVATION_SLOT_MINUTES from opening to the last seating
+RESERVATION_SEATING_MINUTES = 120
+RESERVATION_SLOT_MINUTES = 15
+RESERVATION_HOURS = ('11:00', '22:00')
+# Waiting reservations count as no-shows this long after their time; sweep_reservations
+# closes them once their seating has ended
+RESERVATION_NO_SHOW_MINUTES = 15
+RESERVATION_SWEEP_STATUSES = {'seated': 'completed', 'confirmed': 'cancelled', 'pending': 'cancelled'}
+# The host stand floor plan (/api/tables/tables/floor/) is shared by all clients for this long
+FLOOR_CACHE_SECONDS = 3
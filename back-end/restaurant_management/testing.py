@@ -0,0 +1,55 @@
+import re
+from contextlib import contextmanager
+
+from django.db import connection, connections, transaction
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudgetMixin:
+    """
+    TestCase mixin asserting that a block stays within a fixed SQL query budget.
+
+    Unlike ``assertNumQueries`` the budget is an upper bound, so the assertion
+    only fails when an endpoint regresses into per-row queries.
+    """
+
+    @contextmanager
+    def assertQueryBudget(self, budget, using=connection):
+        with CaptureQueriesContext(using) as context:
+            yield context
+        executed = len(context.captured_queries)
+        if executed > budget:
+            queries = '\n'.join(
+                f'{i}. {query["sql"]}' for i, query in enumerate(context.captured_queries, start=1)
+            )
+            self.fail(f'{executed} queries executed, budget is {budget}:\n{queries}')
+
+
+class IndexUsageMixin:
+    """
+    TestCase mixin asserting that a queryset's plan is driven by an index.
+
+    SQLite plans must search or scan through an index without a temporary
+    sort. PostgreSQL plans are checked with sequential scans disabled, which
+    proves an index can serve the query regardless of table statistics.
+    """
+
+    def explain(self, queryset):
+        db = connections[queryset.db]
+        if db.vendor == 'postgresql':
+            with transaction.atomic(using=queryset.db), db.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+                return queryset.explain()
+        if db.vendor == 'sqlite':
+            with db.cursor() as cursor:
+                cursor.execute('ANALYZE')
+        return queryset.explain()
+
+    def assertUsesIndex(self, queryset):
+        plan = self.explain(queryset)
+        if connections[queryset.db].vendor == 'postgresql':
+            self.assertRegex(plan, r'Index (Only )?Scan|Bitmap Index Scan', plan)
+        else:
+            self.assertRegex(plan, r'USING (COVERING )?INDEX', plan)
+            self.assertNotIn('TEMP B-TREE', plan, plan)
+            self.assertIsNone(re.search(r'SCAN \w+\s*$', plan, re.MULTILINE), plan)
@@ -0,0 +1,114 @@
+import operator
+from bisect import bisect_right
+from collections import defaultdict
+from datetime import time as dt_time, timedelta
+from functools import reduce
+
+from django.conf import settings
+from django.db.models import Q
+from .models import Reservation, Table
+
+# Reservations in these statuses hold their table
+HOLDING_STATUSES = ('pending', 'confirmed', 'seated')
+DAY = 24 * 60 * 60
+
+
+def seating_seconds():
+    return getattr(settings, 'RESERVATION_SEATING_MINUTES', 120) * 60
+
+
+def to_seconds(value):
+    return value.hour * 3600 + value.minute * 60 + value.second
+
+
+def to_time(seconds):
+    return dt_time(seconds // 3600, seconds // 60 % 60, seconds % 60)
+
+
+def window(date, start, end):
+    """
+    Q matching reservations starting strictly between ``start`` and ``end``,
+    in seconds from midnight of ``date``. Bounds outside the day spill onto
+    the previous or next date, so each part is a range seek on the
+    (date, time) reservation indexes.
+    """
+    parts = []
+    same_day = Q(date=date)
+    if start < 0:
+        parts.append(Q(date=date - timedelta(days=1), time__gt=to_time(start + DAY)))
+    else:
+        same_day &= Q(time__gt=to_time(start))
+    if end < DAY:
+        same_day &= Q(time__lt=to_time(end))
+    parts.append(same_day)
+    if end > DAY:
+        parts.append(Q(date=date + timedelta(days=1), time__lt=to_time(end - DAY)))
+    return reduce(operator.or_, parts)
+
+
+def overlapping(table_id, date, time, exclude=None):
+    """Holding reservations of a table whose seating overlaps one starting at ``date`` ``time``."""
+    start, duration = to_seconds(time), seating_seconds()
+    reservations = Reservation.objects.filter(
+        window(date, start - duration, start + duration), table_id=table_id, status__in=HOLDING_STATUSES,
+    )
+    if exclude is not None:
+        reservations = reservations.exclude(pk=exclude)
+    return reservations
+
+
+class BookingIndex:
+    """
+    Interval index over the bookings around one date: per table, the sorted
+    start times (seconds from that midnight) of its holding reservations.
+    Every seating lasts the same duration, so a seating at ``t`` is free
+    exactly when no start falls in ``(t - duration, t + duration)``: one
+    bisection per table. Built from a single query, including late
+    seatings of the previous day and early ones of the next.
+    """
+
+    def __init__(self, date, duration=None):
+        self.date = date
+        self.duration = seating_seconds() if duration is None else duration
+        self.starts = defaultdict(list)
+        rows = Reservation.objects.filter(
+            window(date, -self.duration, DAY + self.duration), status__in=HOLDING_STATUSES,
+        ).values_list('table_id', 'date', 'time')
+        for table_id, day, time in rows:
+            self.starts[table_id].append(to_seconds(time) + (day - date).days * DAY)
+        for starts in self.starts.values():
+            starts.sort()
+
+    def is_free(self, table_id, start):
+        starts = self.starts.get(table_id)
+        if not starts:
+            return True
+        position = bisect_right(starts, start - self.duration)
+        return position == len(starts) or starts[position] >= start + self.duration
+
+    def free_tables(self, tables, start):
+        return [table for table in tables if self.is_free(table.pk, start)]
+
+
+def candidate_tables(party_size):
+    # Smallest fitting tables first so large tables stay free for large parties
+    return list(Table.objects.filter(capacity__gte=party_size).order_by('capacity', 'number'))
+
+
+def free_tables(date, time, party_size):
+    return BookingIndex(date).free_tables(candidate_tables(party_size), to_seconds(time))
+
+
+def free_slots(date, party_size, opening=None, last_seating=None, step=None):
+    """``[(time, [tables])]`` for every slot of the day with at least one free table."""
+    hours = getattr(settings, 'RESERVATION_HOURS', ('11:00', '22:00'))
+    opening = to_seconds(opening or dt_time.fromisoformat(hours[0]))
+    last_seating = to_seconds(last_seating or dt_time.fromisoformat(hours[1]))
+    step = (step or getattr(settings, 'RESERVATION_SLOT_MINUTES', 15)) * 60
+    index, tables = BookingIndex(date), candidate_tables(party_size)
+    slots = []
+    for start in range(opening, last_seating + 1, step):
+        free = index.free_tables(tables, start)
+        if free:
+            slots.append((to_time(start), free))
+    return slots
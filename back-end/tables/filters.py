@@ -0,0 +1,15 @@
+import django_filters
+from .models import ACTIVITY_STATES, Reservation
+
+class ReservationFilter(django_filters.FilterSet):
+    # Evaluated in SQL against the current time, e.g. ?activity=upcoming&ordering=date,time
+    activity = django_filters.ChoiceFilter(
+        choices=[(state, state) for state in ACTIVITY_STATES], method='filter_activity',
+    )
+
+    class Meta:
+        model = Reservation
+        fields = ['table', 'status', 'date']
+
+    def filter_activity(self, queryset, name, value):
+        return queryset.activity(value)
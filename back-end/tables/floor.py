@@ -0,0 +1,84 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Exists, OuterRef, Subquery
+from django.utils import timezone
+from orders.kitchen import OPEN_ORDER_STATUSES
+from orders.models import Order
+from .availability import seating_seconds
+from .models import Reservation, Table, starts_from
+
+FLOOR_CACHE_KEY = 'tables:floor'
+UPCOMING_STATUSES = ('pending', 'confirmed')
+
+
+def floor_plan(now=None):
+    """
+    Every table with its open order, next reservation and seated state, read
+    in one query: each piece is a subquery served by the (table, created_at)
+    order index or the (table, date, time) reservation index.
+
+    A reservation stays "next" until its seating would have ended, so a late
+    party still shows against its table.
+    """
+    now = timezone.localtime(now)
+    cutoff = now - timedelta(seconds=seating_seconds())
+    open_order = Order.objects.filter(
+        table=OuterRef('pk'), status__in=OPEN_ORDER_STATUSES,
+    ).order_by('-created_at', '-id')
+    next_reservation = Reservation.objects.filter(
+        starts_from(cutoff), table=OuterRef('pk'), status__in=UPCOMING_STATUSES,
+    ).order_by('date', 'time', 'id')
+    seated = Reservation.objects.filter(
+        table=OuterRef('pk'), status='seated', date__gte=now.date() - timedelta(days=1),
+    )
+
+    annotations = {
+        f'order_{field}': Subquery(open_order.values(field)[:1])
+        for field in ('id', 'status', 'subtotal', 'created_at')
+    }
+    annotations.update({
+        f'reservation_{field}': Subquery(next_reservation.values(field)[:1])
+        for field in ('id', 'date', 'time', 'customer_name', 'party_size', 'status')
+    })
+    rows = Table.objects.annotate(**annotations, has_seated_reservation=Exists(seated)).order_by('number').values(
+        'id', 'number', 'capacity', 'location', 'has_seated_reservation', *annotations
+    )
+
+    tables = []
+    for row in rows:
+        order = None
+        if row['order_id'] is not None:
+            order = {
+                'id': row['order_id'],
+                'status': row['order_status'],
+                'total': row['order_subtotal'],
+                'created_at': row['order_created_at'],
+                'age_seconds': int((now - row['order_created_at']).total_seconds()),
+            }
+        reservation = None
+        if row['reservation_id'] is not None:
+            reservation = {
+                field: row[f'reservation_{field}']
+                for field in ('id', 'date', 'time', 'customer_name', 'party_size', 'status')
+            }
+        tables.append({
+            'id': row['id'],
+            'number': row['number'],
+            'capacity': row['capacity'],
+            'location': row['location'],
+            'seated': row['has_seated_reservation'] or order is not None,
+            'open_order': order,
+            'next_reservation': reservation,
+        })
+    return {'generated_at': now, 'tables': tables}
+
+
+def cached_floor_plan():
+    """The floor plan, shared by every host stand for FLOOR_CACHE_SECONDS."""
+    plan = cache.get(FLOOR_CACHE_KEY)
+    if plan is None:
+        plan = floor_plan()
+        cache.set(FLOOR_CACHE_KEY, plan, getattr(settings, 'FLOOR_CACHE_SECONDS', 3))
+    return plan
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from tables.models import Reservation
+
+
+class Command(BaseCommand):
+    help = 'Complete seated and cancel waiting reservations whose seating has ended; run periodically'
+
+    def handle(self, *args, **options):
+        swept = Reservation.objects.sweep_stale()
+        counts = ', '.join(f'{count} {status}' for status, count in swept.items())
+        self.stdout.write(self.style.SUCCESS(f'Swept stale reservations: {counts or "none"}'))
@@ -1,4 +1,9 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
 from django.db import models
+from django.db.models import Case, Q, Value, When
 from django.utils import timezone
 
 class Table(models.Model):
@@ -9,6 +14,67 @@ class Table(models.Model):
     def __str__(self):
         return f"Table {self.number}"
 
+# Status given by sweep_stale to reservations whose seating has ended: seated
+# parties are done, waiting ones never arrived. Override with RESERVATION_SWEEP_STATUSES
+SWEEP_STATUSES = {'seated': 'completed', 'confirmed': 'cancelled', 'pending': 'cancelled'}
+
+# What a reservation is doing right now, see ReservationQuerySet.with_activity
+ACTIVITY_STATES = ('upcoming', 'late', 'no_show', 'active', 'closed')
+
+def starts_before(moment):
+    # Reservations store local wall-clock date and time; compare column by column so (status, date, time) serves it
+    moment = timezone.localtime(moment)
+    return Q(date__lt=moment.date()) | Q(date=moment.date(), time__lt=moment.time())
+
+def starts_from(moment):
+    moment = timezone.localtime(moment)
+    return Q(date__gt=moment.date()) | Q(date=moment.date(), time__gte=moment.time())
+
+class ReservationQuerySet(models.QuerySet):
+    @staticmethod
+    def _activity_conditions(now=None):
+        now = now or timezone.now()
+        no_show_after = now - timedelta(minutes=getattr(settings, 'RESERVATION_NO_SHOW_MINUTES', 15))
+        waiting = Q(status__in=('pending', 'confirmed'))
+        return {
+            'upcoming': waiting & starts_from(now),
+            'late': waiting & starts_before(now) & starts_from(no_show_after),
+            'no_show': waiting & starts_before(no_show_after),
+            'active': Q(status='seated'),
+            'closed': Q(status__in=('completed', 'cancelled')),
+        }
+    
+    def with_activity(self, now=None):
+        """
+        Annotate ``activity``: pending or confirmed reservations are upcoming
+        until their time, late for RESERVATION_NO_SHOW_MINUTES after it and
+        no_show from then on; seated ones are active, the rest closed.
+        """
+        conditions = self._activity_conditions(now)
+        return self.annotate(activity=Case(
+            *(When(condition, then=Value(state)) for state, condition in conditions.items()),
+            output_field=models.CharField(),
+        ))
+    
+    def activity(self, state, now=None):
+        return self.filter(self._activity_conditions(now)[state])
+    
+    def sweep_stale(self, now=None):
+        """
+        Close reservations whose seating has ended, moving each status to the
+        one RESERVATION_SWEEP_STATUSES maps it to (SWEEP_STATUSES by default),
+        one UPDATE per new status. Returns ``{new_status: count}``.
+        """
+        now = now or timezone.now()
+        ended = starts_before(now - timedelta(minutes=getattr(settings, 'RESERVATION_SEATING_MINUTES', 120)))
+        sources = defaultdict(list)
+        for status, new_status in getattr(settings, 'RESERVATION_SWEEP_STATUSES', SWEEP_STATUSES).items():
+            sources[new_status].append(status)
+        return {
+            new_status: self.filter(ended, status__in=statuses).update(status=new_status)
+            for new_status, statuses in sources.items()
+        }
+
 class Reservation(models.Model):
     STATUS_CHOICES = (
         ('pending', 'Pending'),
@@ -29,13 +95,14 @@ class Reservation(models.Model):
     notes = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     
+    objects = ReservationQuerySet.as_manager()
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['date', 'time'], name='reservation_date_time_idx'),
+            models.Index(fields=['table', 'date', 'time'], name='reservation_table_date_idx'),
+            models.Index(fields=['status', 'date', 'time'], name='reservation_status_date_idx'),
+        ]
+    
     def __str__(self):
-        return f"{self.customer_name} - {self.date} at {self.time}"
-    
-    @property
-    def is_active(self):
-        now = timezone.now()
-        reservation_datetime = timezone.make_aware(
-            timezone.datetime.combine(self.date, self.time)
-        )
-        return reservation_datetime >= now
\ No newline at end of file
+        return f"{self.customer_name} - {self.date} at {self.time}"
\ No newline at end of file
@@ -1,12 +1,46 @@
 from rest_framework import serializers
+from .availability import HOLDING_STATUSES, overlapping
 from .models import Table, Reservation
 
+# Changing any of these can make a reservation collide with another
+BOOKING_FIELDS = ('table', 'date', 'time', 'status')
+
 class TableSerializer(serializers.ModelSerializer):
     class Meta:
         model = Table
         fields = '__all__'
 
 class ReservationSerializer(serializers.ModelSerializer):
+    activity = serializers.SerializerMethodField()
+    
     class Meta:
         model = Reservation
-        fields = '__all__'
\ No newline at end of file
+        fields = '__all__'
+    
+    def get_activity(self, obj):
+        # Annotated by ReservationViewSet.get_queryset; freshly written instances are looked up
+        if hasattr(obj, 'activity'):
+            return obj.activity
+        return Reservation.objects.with_activity().values_list('activity', flat=True).get(pk=obj.pk)
+    
+    def validate(self, attrs):
+        def current(field):
+            return attrs.get(field, getattr(self.instance, field, None))
+        
+        table, party_size = current('table'), current('party_size')
+        if party_size > table.capacity:
+            raise serializers.ValidationError({'party_size': f'{table} seats at most {table.capacity}'})
+        
+        # Edits that leave the booking where it is skip the lock and the overlap check
+        status = current('status') or 'pending'
+        moved = self.instance is None or any(
+            field in attrs and attrs[field] != getattr(self.instance, field) for field in BOOKING_FIELDS
+        )
+        if moved and status in HOLDING_STATUSES:
+            # Locks the table row (where supported) until the view's transaction commits,
+            # so two overlapping bookings cannot both pass this check
+            list(Table.objects.select_for_update().filter(pk=table.pk).values_list('pk'))
+            exclude = self.instance.pk if self.instance else None
+            if overlapping(table.pk, current('date'), current('time'), exclude=exclude).exists():
+                raise serializers.ValidationError({'time': f'{table} is already booked around that time'})
+        return attrs
@@ -1,3 +1,222 @@
-from django.test import TestCase
+import datetime
+from io import StringIO
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from orders.models import Order
+from restaurant_management.testing import IndexUsageMixin
+from .availability import BookingIndex, overlapping
+from .floor import floor_plan
+from .models import Table, Reservation
+
+User = get_user_model()
+
+
+class ReservationIndexTests(IndexUsageMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        tables = Table.objects.bulk_create(Table(number=n, capacity=4) for n in range(1, 31))
+        statuses = [choice for choice, _ in Reservation.STATUS_CHOICES]
+        start = datetime.date(2026, 1, 1)
+        Reservation.objects.bulk_create(
+            Reservation(
+                table=tables[n % 30], customer_name='Guest', customer_phone='555',
+                date=start + datetime.timedelta(days=n % 60),
+                time=datetime.time(17 + n % 5, 15 * (n % 4)),
+                party_size=2, status=statuses[n % len(statuses)],
+            )
+            for n in range(3000)
+        )
+        cls.table, cls.date = tables[0], start
+
+    def test_reservation_list_paths(self):
+        self.assertUsesIndex(Reservation.objects.filter(date=self.date).order_by('time'))
+        self.assertUsesIndex(Reservation.objects.filter(table=self.table, date=self.date).order_by('time'))
+        self.assertUsesIndex(Reservation.objects.filter(status='confirmed', date=self.date).order_by('time'))
+        self.assertUsesIndex(Reservation.objects.filter(table=self.table).order_by('date', 'time'))
+
+
+@override_settings(RESERVATION_SEATING_MINUTES=120, RESERVATION_SLOT_MINUTES=30, RESERVATION_HOURS=('18:00', '23:00'))
+class ReservationAvailabilityTests(IndexUsageMixin, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='host', password='secret')
+        cls.two, cls.four, cls.six = (
+            Table.objects.create(number=number, capacity=capacity) for number, capacity in ((1, 2), (2, 4), (3, 6))
+        )
+        cls.date = datetime.date(2026, 3, 14)
+        book = lambda table, date, time, status='confirmed': Reservation.objects.create(
+            table=table, customer_name='Guest', customer_phone='555', date=date, time=time,
+            party_size=2, status=status,
+        )
+        book(cls.four, cls.date, datetime.time(19, 0))
+        book(cls.six, cls.date, datetime.time(19, 0), status='cancelled')
+        # Late seating the night before still holds the table just after midnight
+        book(cls.two, cls.date - datetime.timedelta(days=1), datetime.time(23, 30))
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def availability(self, **params):
+        return self.client.get('/api/tables/reservations/availability/', {'date': '2026-03-14', **params})
+
+    def test_free_tables_at_a_time(self):
+        response = self.availability(party_size=3, time='20:30')
+        self.assertEqual([t['number'] for t in response.data['tables']], [3])
+        response = self.availability(party_size=3, time='21:00')
+        self.assertEqual([t['number'] for t in response.data['tables']], [2, 3])
+
+        index = BookingIndex(self.date)
+        self.assertFalse(index.is_free(self.two.pk, 60 * 60))
+        self.assertTrue(index.is_free(self.two.pk, 90 * 60))
+        self.assertEqual(self.availability(party_size=0).status_code, 400)
+
+    def test_slots_for_the_day(self):
+        response = self.availability(party_size=4)
+        slots = {slot['time'].strftime('%H:%M'): slot['tables'] for slot in response.data['slots']}
+        self.assertEqual(len(slots), 11)
+        self.assertEqual(slots['18:00'], [self.six.pk])
+        self.assertEqual(slots['21:00'], [self.four.pk, self.six.pk])
+
+    def test_create_rejects_overlap_and_oversized_party(self):
+        reservation = {
+            'table': self.four.pk, 'customer_name': 'Ada', 'customer_phone': '555',
+            'date': '2026-03-14', 'time': '20:45', 'party_size': 4,
+        }
+        response = self.client.post('/api/tables/reservations/', reservation, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('time', response.data)
+        response = self.client.post('/api/tables/reservations/', {**reservation, 'time': '21:00'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        response = self.client.post('/api/tables/reservations/', {
+            **reservation, 'table': self.two.pk, 'time': '12:00',
+        }, format='json')
+        self.assertIn('party_size', response.data)
+
+        self.assertUsesIndex(overlapping(self.four.pk, self.date, datetime.time(0, 30)))
+
+    def test_update_checks_overlap_only_when_the_booking_moves(self):
+        # An overlapping booking taken before the check existed can still have its details edited
+        legacy = Reservation.objects.create(
+            table=self.four, customer_name='Lin', customer_phone='555', date=self.date,
+            time=datetime.time(20, 0), party_size=2, status='confirmed',
+        )
+        url = f'/api/tables/reservations/{legacy.pk}/'
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(url, {'notes': 'Birthday', 'party_size': 3}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse([q for q in queries if q['sql'].startswith('SELECT 1 AS "a" FROM "tables_reservation"')])
+        response = self.client.patch(url, {'time': '20:15'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('time', response.data)
+
+
+class FloorPlanTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='host', password='secret')
+        cls.tables = Table.objects.bulk_create(Table(number=n, capacity=4) for n in range(1, 6))
+        Order.objects.create(table=cls.tables[0], status='paid')
+        cls.order = Order.objects.create(table=cls.tables[0], status='preparing')
+        Order.objects.create(table=cls.tables[1], status='cancelled')
+        tomorrow = timezone.localdate() + datetime.timedelta(days=1)
+        for time, status in ((datetime.time(20, 0), 'confirmed'), (datetime.time(19, 0), 'pending'),
+                             (datetime.time(18, 0), 'cancelled')):
+            Reservation.objects.create(
+                table=cls.tables[1], customer_name='Grace', customer_phone='555',
+                date=tomorrow, time=time, party_size=2, status=status,
+            )
+        Reservation.objects.create(
+            table=cls.tables[2], customer_name='Alan', customer_phone='555',
+            date=timezone.localdate(), time=datetime.time(0, 0), party_size=3, status='seated',
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.user)
+
+    def test_floor_plan_in_one_query(self):
+        with self.assertNumQueries(1):
+            plan = floor_plan()
+        first, second, third, fourth = plan['tables'][:4]
+        self.assertEqual((first['open_order']['id'], first['open_order']['status']), (self.order.pk, 'preparing'))
+        self.assertTrue(first['seated'])
+        self.assertIsNone(second['open_order'])
+        self.assertEqual((second['next_reservation']['time'], second['seated']), (datetime.time(19, 0), False))
+        self.assertTrue(third['seated'])
+        self.assertEqual((fourth['open_order'], fourth['next_reservation'], fourth['seated']), (None, None, False))
+
+    def test_floor_endpoint_is_cached_briefly(self):
+        self.assertEqual(len(self.client.get('/api/tables/tables/floor/').data['tables']), 5)
+        Table.objects.create(number=6, capacity=2)
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/tables/tables/floor/')
+        self.assertEqual(len(response.data['tables']), 5)
+
+
+@override_settings(RESERVATION_NO_SHOW_MINUTES=15, RESERVATION_SEATING_MINUTES=120)
+class ReservationActivityTests(IndexUsageMixin, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='host', password='secret')
+        table = Table.objects.create(number=1, capacity=4)
+        now = timezone.localtime()
+        cls.reservations = {}
+        for name, offset, status in (
+            ('upcoming', datetime.timedelta(days=1), 'confirmed'),
+            ('late', -datetime.timedelta(minutes=5), 'pending'),
+            ('no_show', -datetime.timedelta(minutes=60), 'confirmed'),
+            ('active', -datetime.timedelta(minutes=30), 'seated'),
+            ('closed', -datetime.timedelta(days=1), 'cancelled'),
+            ('stale_confirmed', -datetime.timedelta(days=3), 'confirmed'),
+            ('stale_pending', -datetime.timedelta(days=3), 'pending'),
+            ('stale_seated', -datetime.timedelta(days=3), 'seated'),
+        ):
+            start = now + offset
+            cls.reservations[name] = Reservation.objects.create(
+                table=table, customer_name=name, customer_phone='555', date=start.date(), time=start.time(),
+                party_size=2, status=status,
+            )
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def test_activity_annotation_and_filter(self):
+        activity = dict(Reservation.objects.with_activity().values_list('customer_name', 'activity'))
+        self.assertEqual(activity, {
+            'upcoming': 'upcoming', 'late': 'late', 'no_show': 'no_show', 'active': 'active', 'closed': 'closed',
+            'stale_confirmed': 'no_show', 'stale_pending': 'no_show', 'stale_seated': 'active',
+        })
+        response = self.client.get('/api/tables/reservations/', {'activity': 'late'})
+        self.assertEqual([(r['customer_name'], r['activity']) for r in response.data['results']], [('late', 'late')])
+        self.assertEqual(self.client.get('/api/tables/reservations/', {'activity': 'soon'}).status_code, 400)
+        self.assertUsesIndex(Reservation.objects.activity('upcoming').order_by('date', 'time'))
+
+    def test_sweeper_closes_stale_reservations_in_bulk(self):
+        with self.assertNumQueries(2):
+            swept = Reservation.objects.sweep_stale()
+        self.assertEqual(swept, {'completed': 1, 'cancelled': 2})
+        statuses = dict(Reservation.objects.values_list('customer_name', 'status'))
+        # Only the party that was seated counts as completed; the others never arrived
+        self.assertEqual(
+            (statuses['stale_seated'], statuses['stale_confirmed'], statuses['stale_pending']),
+            ('completed', 'cancelled', 'cancelled'),
+        )
+        self.assertEqual((statuses['no_show'], statuses['late'], statuses['active']), ('confirmed', 'pending', 'seated'))
+
+        out = StringIO()
+        call_command('sweep_reservations', stdout=out)
+        self.assertIn('0 completed, 0 cancelled', out.getvalue())
+
+    def test_sweep_mapping_is_configurable(self):
+        with self.settings(RESERVATION_SWEEP_STATUSES={'confirmed': 'completed'}):
+            self.assertEqual(Reservation.objects.sweep_stale(), {'completed': 1})
+        self.assertEqual(Reservation.objects.get(customer_name='stale_confirmed').status, 'completed')
+        self.assertEqual(Reservation.objects.get(customer_name='stale_seated').status, 'seated')
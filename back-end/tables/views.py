@@ -1,6 +1,13 @@
-from rest_framework import viewsets
+from rest_framework import viewsets, status
+from rest_framework.response import Response
+from rest_framework.decorators import action
+from django.db import transaction
+from django.utils.dateparse import parse_date, parse_time
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters
+from .availability import free_slots, free_tables
+from .filters import ReservationFilter
+from .floor import cached_floor_plan
 from .models import Table, Reservation
 from .serializers import TableSerializer, ReservationSerializer
 
@@ -10,11 +17,70 @@ class TableViewSet(viewsets.ModelViewSet):
     filter_backends = [DjangoFilterBackend, filters.SearchFilter]
     filterset_fields = ['number', 'capacity']
     search_fields = ['location']
+    
+    @action(detail=False, methods=['get'])
+    def floor(self, request):
+        # Live floor plan for host stands: open order, next reservation and seated state of every table
+        return Response(cached_floor_plan())
 
 class ReservationViewSet(viewsets.ModelViewSet):
     queryset = Reservation.objects.all()
     serializer_class = ReservationSerializer
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = ['table', 'status', 'date']
+    filterset_class = ReservationFilter
     search_fields = ['customer_name', 'customer_phone', 'notes']
-    ordering_fields = ['date', 'time', 'created_at']
\ No newline at end of file
+    ordering_fields = ['date', 'time', 'created_at']
+    
+    def get_queryset(self):
+        return super().get_queryset().with_activity()
+    
+    # Validation checks for overlapping bookings; the transaction keeps that check and the write together
+    def create(self, request, *args, **kwargs):
+        with transaction.atomic():
+            return super().create(request, *args, **kwargs)
+    
+    def update(self, request, *args, **kwargs):
+        with transaction.atomic():
+            return super().update(request, *args, **kwargs)
+    
+    @action(detail=False, methods=['get'])
+    def availability(self, request):
+        # Free tables for ?party_size= on ?date= at ?time=, or every bookable slot of the day when time is omitted
+        try:
+            date = parse_date(request.query_params.get('date') or '')
+        except ValueError:
+            date = None
+        if date is None:
+            return Response({'error': 'date must be YYYY-MM-DD'},
+                           status=status.HTTP_400_BAD_REQUEST)
+        try:
+            party_size = int(request.query_params.get('party_size', ''))
+        except ValueError:
+            party_size = 0
+        if party_size < 1:
+            return Response({'error': 'party_size must be a positive integer'},
+                           status=status.HTTP_400_BAD_REQUEST)
+        
+        time = request.query_params.get('time')
+        if time:
+            try:
+                time = parse_time(time)
+            except ValueError:
+                time = None
+            if time is None:
+                return Response({'error': 'time must be HH:MM'},
+                               status=status.HTTP_400_BAD_REQUEST)
+            tables = free_tables(date, time, party_size)
+            return Response({
+                'date': date,
+                'time': time,
+                'tables': TableSerializer(tables, many=True).data,
+            })
+        
+        return Response({
+            'date': date,
+            'slots': [
+                {'time': slot, 'tables': [table.pk for table in tables]}
+                for slot, tables in free_slots(date, party_size)
+            ],
+        })
\ No newline at end of file
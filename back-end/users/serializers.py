@@ -1,15 +1,18 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from django.contrib.auth.password_validation import validate_password
+from restaurant_management.images import ImageVariantsField
 
 User = get_user_model()
 
 class UserSerializer(serializers.ModelSerializer):
+    profile_image_variants = ImageVariantsField(source='profile_image')
+    
     class Meta:
         model = User
         fields = ('id', 'username', 'email', 'first_name', 'last_name', 
-                 'role', 'phone', 'date_joined')
-        read_only_fields = ('date_joined',)
+                 'role', 'phone', 'profile_image', 'profile_image_variants', 'date_joined')
+        read_only_fields = ('profile_image', 'date_joined')
 
 class UserRegistrationSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, validators=[validate_password])
@@ -2,9 +2,12 @@ from django.db.models.signals import post_save
 from django.dispatch import receiver
 from django.contrib.auth import get_user_model
 from rest_framework.authtoken.models import Token
+from restaurant_management.images import track_image_field
 
 User = get_user_model()
 
+track_image_field(User, 'profile_image')
+
 @receiver(post_save, sender=User)
 def create_auth_token(sender, instance=None, created=False, **kwargs):
     if created:
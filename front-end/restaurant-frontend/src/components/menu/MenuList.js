@@ -61,7 +61,9 @@ const MenuList = () => {
   const fetchDishes = async () => {
     setLoading(true);
     try {
-      const response = await api.get('menu/dishes/');
+      const response = await api.get('menu/dishes/', {
+        params: { expand: 'category,ingredients' },
+      });
       if (Array.isArray(response.data)) {
         setDishes(response.data);
       } else if (response.data && Array.isArray(response.data.results)) {
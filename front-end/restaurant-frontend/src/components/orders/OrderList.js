@@ -25,7 +25,10 @@ const OrderList = () => {
   const fetchOrders = async () => {
     setLoading(true);
     try {
-      const response = await api.get('orders/orders/');
+      const response = await api.get('orders/orders/', {
+        // Relations come back as ids unless expanded; the list, detail and edit views read them nested
+        params: { expand: 'table,waiter,items.dish' },
+      });
       console.log('Orders response:', response.data);
       setOrders(response.data.results || response.data || []);
     } catch (error) {
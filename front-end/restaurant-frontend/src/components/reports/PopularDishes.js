@@ -17,9 +17,9 @@ const PopularDishes = () => {
   const fetchPopularDishes = async (startDate = null, endDate = null) => {
     setLoading(true);
     try {
-      let url = 'reports/popular-dishes/';
+      let url = 'reports/popular-dishes/?expand=dish';
       if (startDate && endDate) {
-        url += `?start_date=${startDate.format('YYYY-MM-DD')}&end_date=${endDate.format('YYYY-MM-DD')}`;
+        url += `&start_date=${startDate.format('YYYY-MM-DD')}&end_date=${endDate.format('YYYY-MM-DD')}`;
       }
       
       const response = await fetch(`http://localhost:8000/api/${url}`);
@@ -19,7 +19,9 @@ const Dashboard = () => {
       try {
         // In a real app, you would have a dedicated dashboard endpoint
         // For now, we'll fetch from multiple endpoints
-        const ordersResponse = await api.get('orders/orders/');
+        const ordersResponse = await api.get('orders/orders/', {
+          params: { expand: 'items.dish' },
+        });
         const orders = ordersResponse.data;
         
         const totalOrders = orders.length;
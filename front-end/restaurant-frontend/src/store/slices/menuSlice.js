@@ -4,7 +4,9 @@ import api from '../../services/api';
 export const fetchMenu = createAsyncThunk(
   'menu/fetchMenu',
   async () => {
-    const response = await api.get('menu/dishes/');
+    const response = await api.get('menu/dishes/', {
+      params: { expand: 'category' },
+    });
     return response.data;
   }
 );